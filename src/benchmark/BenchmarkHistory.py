@@ -0,0 +1,123 @@
+"""Definition of the history of benchmark runs and the comparison of two runs."""
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import pandas as pd
+
+# metrics compared between runs and whether a higher value is better
+METRICS = {
+    'wall_time_s': False,
+    'peak_memory_mb': False,
+    'rows_per_s': True,
+}
+
+
+@dataclass
+class BenchmarkHistory:
+    """Benchmark runs appended to a json file, oldest first.
+
+    Every run records its label, time, commit, synthetic input configuration and the
+    measurements of every pipeline stage and impact calculator.
+
+    Attr:
+        path (Path): file path of the history json
+    """
+    path: Path
+
+    def load(self) -> list:
+        """Read every run of the history, an empty list if there is no history yet."""
+        if not self.path.exists():
+            return []
+        with open(self.path, mode='r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def append(self, run: dict) -> None:
+        """Add a run to the end of the history.
+
+        Args:
+            run (dict): record of a benchmark run
+        """
+        runs = self.load()
+        runs.append(run)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, mode='w', encoding='utf-8') as file:
+            json.dump(runs, file, indent=1)
+
+    def find(self, selector) -> dict:
+        """Find a run by position, e.g. -1 for the latest run, or by label.
+
+        Args:
+            selector (int | str): position in the history, or label of the run. The latest run
+                with the label is used.
+
+        Raises:
+            KeyError: Raised if no run matches selector
+
+        Returns:
+            dict: record of the run
+        """
+        runs = self.load()
+        if isinstance(selector, int):
+            try:
+                return runs[selector]
+            except IndexError as ie:
+                raise KeyError(f'History holds {len(runs)} runs, no run {selector}') from ie
+        for run in reversed(runs):
+            if run.get('label') == selector:
+                return run
+        raise KeyError(f'No run labelled {selector}')
+
+
+def compare_runs(baseline: dict, candidate: dict, threshold: float = 0.1,
+                 min_wall_time: float = 0.1) -> pd.DataFrame:
+    """Compare the measurements of two runs and flag regressions.
+
+    Args:
+        baseline (dict): record of the reference run
+        candidate (dict): record of the run to check
+        threshold (float, optional): relative change in the worse direction that counts as a
+            regression. Defaults to 0.1.
+        min_wall_time (float, optional): timings and rates of steps shorter than this many
+            seconds in both runs are too noisy to flag. Defaults to 0.1.
+
+    Raises:
+        ValueError: Raised if the runs benchmarked different synthetic inputs
+
+    Returns:
+        pd.DataFrame: section, name, metric, baseline and candidate values, relative change and
+            regression flag of every metric measured in both runs
+    """
+    if baseline['config'] != candidate['config']:
+        raise ValueError(
+            f'Runs benchmarked different inputs: {baseline["config"]} and {candidate["config"]}'
+        )
+    rows = []
+    for section in ['stages', 'calculators']:
+        for name, candidate_measurements in candidate.get(section, {}).items():
+            baseline_measurements = baseline.get(section, {}).get(name, {})
+            # timings and the rates derived from them are noise below min_wall_time
+            too_short = max(
+                baseline_measurements.get('wall_time_s') or 0,
+                candidate_measurements.get('wall_time_s') or 0
+            ) < min_wall_time
+            for metric, higher_is_better in METRICS.items():
+                baseline_value = baseline_measurements.get(metric)
+                candidate_value = candidate_measurements.get(metric)
+                if not baseline_value or candidate_value is None:
+                    continue
+                change = candidate_value / baseline_value - 1
+                worse = -change if higher_is_better else change
+                noisy = metric != 'peak_memory_mb' and too_short
+                rows.append({
+                    'section': section,
+                    'name': name,
+                    'metric': metric,
+                    'baseline': baseline_value,
+                    'candidate': candidate_value,
+                    'change': change,
+                    'regression': worse > threshold and not noisy,
+                })
+    return pd.DataFrame(
+        rows,
+        columns=['section', 'name', 'metric', 'baseline', 'candidate', 'change', 'regression']
+    )
@@ -0,0 +1,222 @@
+"""Definition of the synthetic pipeline inputs used to benchmark the workflow at any size."""
+from dataclasses import dataclass
+import math
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.impact_calculator.TransportEngine import TRANSPORT_MODES
+
+# sheet of raw_boms.xlsx, option prefix and Omniclass hierarchy of every building system
+RAW_BOM_SHEETS = {
+    'Structure': ('STR', '21-01 10 10', 'Substructure', 'Foundations', 'Standard Foundations'),
+    'Enclosure - Opaque': ('ENCO', '21-02 20 10', 'Shell', 'Vertical Enclosure',
+                           'Exterior Walls'),
+    'Enclosure - Translucent': ('ENCT', '21-02 20 20', 'Shell', 'Vertical Enclosure',
+                                'Exterior Windows'),
+    'Enclosure - Roofing': ('ENCR', '21-02 30 10', 'Shell', 'Horizontal Enclosure', 'Roofing'),
+}
+# background dataset column prefixes of the impact categories
+IMPACT_COLUMNS = ['GWPf', 'GWPb', 'GWP-LULUC', 'stored_carbon', 'acp', 'eup', 'smg', 'odp']
+SERVICE_LIVES = [15, 20, 25, 30, 40, 50, 60, 75, 100]
+STRUCTURAL_MATERIALS = ['Steel', 'Concrete', 'Mass timber']
+# output directories of every template model
+TEMPLATE_MODEL_DIRECTORIES = ['bom', 'impacts', 'prebuilt_scenarios']
+
+
+@dataclass
+class SyntheticInputs:
+    """Raw bill of materials, background datasets and project metadata of a synthetic project.
+
+    Files follow the layout and columns of the real inputs, so every pipeline stage runs on
+    them unchanged. Template models combine one structure and one opaque enclosure option with
+    a single translucent enclosure and roofing option.
+
+    Attr:
+        n_models (int): number of template models
+        rows_per_bom (int): number of elements in the bill of materials of every template model
+        n_materials (int): number of Tally materials in the background datasets
+        seed (int): seed of the random number generator
+    """
+    n_models: int = 180
+    rows_per_bom: int = 25
+    n_materials: int = 288
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.rows_per_bom < 4:
+            raise ValueError('A bill of materials needs at least one row per building system')
+        if self.n_models < 1 or self.n_materials < 1:
+            raise ValueError('n_models and n_materials must be positive')
+
+    @property
+    def n_structure_options(self) -> int:
+        """Number of structure options, the opaque enclosure options make up the rest."""
+        return math.ceil(math.sqrt(self.n_models))
+
+    @property
+    def template_models(self) -> list:
+        """Names of the synthetic template models."""
+        n_enclosure_options = math.ceil(self.n_models / self.n_structure_options)
+        return [
+            f'STR{structure}_ENCO{enclosure}_ENCT1_ENCR1'
+            for structure in range(1, self.n_structure_options + 1)
+            for enclosure in range(1, n_enclosure_options + 1)
+        ][:self.n_models]
+
+    @property
+    def tally_materials(self) -> list:
+        """Names of the synthetic Tally materials, every tenth one a ready-mix concrete."""
+        return [
+            f'Structural concrete, synthetic {position}' if position % 10 == 0
+            else f'Synthetic material {position}'
+            for position in range(self.n_materials)
+        ]
+
+    @property
+    def assemblies(self) -> list:
+        """Names of the synthetic assemblies."""
+        return [f'Assembly {position}' for position in range(max(4, self.n_materials // 5))]
+
+    def raw_bom_sheets(self, rng: np.random.Generator) -> dict:
+        """Generate the option rows of every sheet of the raw bill of materials.
+
+        Returns:
+            dict: DataFrame of every sheet keyed by sheet name
+        """
+        n_options = {
+            'Structure': self.n_structure_options,
+            'Enclosure - Opaque': math.ceil(self.n_models / self.n_structure_options),
+            'Enclosure - Translucent': 1,
+            'Enclosure - Roofing': 1,
+        }
+        structure_rows = (self.rows_per_bom - 2) // 2
+        rows_per_option = {
+            'Structure': structure_rows,
+            'Enclosure - Opaque': self.rows_per_bom - 2 - structure_rows,
+            'Enclosure - Translucent': 1,
+            'Enclosure - Roofing': 1,
+        }
+        sheets = {}
+        for sheet_name, (prefix, omniclass, l1, l2, l3) in RAW_BOM_SHEETS.items():
+            n_rows = n_options[sheet_name] * rows_per_option[sheet_name]
+            material_positions = rng.integers(0, self.n_materials, n_rows)
+            sheets[sheet_name] = pd.DataFrame({
+                'Building Type': 'Commercial',
+                'Omiclass': omniclass,
+                'L1': l1,
+                'L2': l2,
+                'L3': l3,
+                'Option': np.repeat(
+                    [f'{prefix}{option}' for option in range(1, n_options[sheet_name] + 1)],
+                    rows_per_option[sheet_name]
+                ),
+                'Assembly': rng.choice(self.assemblies, n_rows),
+                'Component': [f'Component {position}' for position in material_positions],
+                'Building Material_name': [
+                    f'Building material {position}' for position in material_positions
+                ],
+                'Tally material': np.array(self.tally_materials)[material_positions],
+                'Weight (kg)': np.round(rng.lognormal(8, 2, n_rows)),
+                'Data Source (Material Quantities)': 'Synthetic',
+            })
+        return sheets
+
+    def background_datasets(self, rng: np.random.Generator) -> dict:
+        """Generate every background dataset read by the impact calculators.
+
+        Returns:
+            dict: DataFrame of every background workbook keyed by file name
+        """
+        n_materials = self.n_materials
+        n_assemblies = len(self.assemblies)
+        materials = {'Name_Tally Material': self.tally_materials}
+        service_lives = rng.choice(SERVICE_LIVES, n_assemblies)
+        wastage = rng.uniform(0.01, 0.1, n_materials)
+        truck_distances = rng.integers(0, 2000, n_materials)
+        return {
+            'a1-a3.xlsx': pd.DataFrame({
+                **materials,
+                **{f'{column}_mfg': rng.lognormal(0, 1, n_materials) for column in IMPACT_COLUMNS},
+            }),
+            'a4_distances.xlsx': pd.DataFrame({
+                **materials,
+                'Tally dist_truck': truck_distances,
+                # about half of the materials also travel by rail
+                'Tally dist_rail': rng.integers(0, 2, n_materials)
+                * rng.integers(0, 1500, n_materials),
+                'Tally dist_barge': np.zeros(n_materials, dtype=int),
+                'Tally dist_container_ship': np.zeros(n_materials, dtype=int),
+                'R dist CA_truck': np.round(truck_distances * 0.75),
+                'R dist CA dist_rail': np.zeros(n_materials, dtype=int),
+            }),
+            'a4_emissions.xlsx': pd.DataFrame({
+                'Product system name': list(TRANSPORT_MODES.values()),
+                **{column: rng.uniform(0, 0.05, len(TRANSPORT_MODES)) for column in IMPACT_COLUMNS},
+                'Reference Unit': '1 tkm',
+            }),
+            'a5_wastage.xlsx': pd.DataFrame({
+                'Building Material_name': [
+                    f'Building material {position}' for position in range(n_materials)
+                ],
+                'wastage': wastage,
+                'enhanced wastage': wastage * 0.8,
+            }),
+            'b2-b5.xlsx': pd.DataFrame({
+                'Assembly': self.assemblies,
+                'service_lives': service_lives,
+            }),
+            'c2-c4.xlsx': pd.DataFrame({
+                **materials,
+                **{f'{column}_eol': rng.lognormal(-3, 1, n_materials) for column in IMPACT_COLUMNS},
+            }),
+            'RICS_service_life.xlsx': pd.DataFrame({
+                'id': np.arange(1, n_assemblies + 1),
+                'Assembly': self.assemblies,
+                'type': 'synthetic',
+                'service_lives': rng.choice(SERVICE_LIVES, n_assemblies),
+            }),
+        }
+
+    def project_metadata(self) -> pd.DataFrame:
+        """Generate the project metadata of the template models."""
+        return pd.DataFrame({
+            'template_model': self.template_models,
+            'structural_material': [
+                STRUCTURAL_MATERIALS[(int(name.split('_')[0][3:]) - 1) % len(STRUCTURAL_MATERIALS)]
+                for name in self.template_models
+            ],
+        })
+
+    def write(self, root_directory: Path) -> None:
+        """Write the synthetic inputs into the data and references directories of a project.
+
+        The directories of every template model are created as in the repository, which is
+        how the pipeline stages find the template models to process.
+
+        Args:
+            root_directory (Path): project directory, laid out like the repository
+        """
+        rng = np.random.default_rng(self.seed)
+
+        raw_directory = root_directory.joinpath('data/raw')
+        raw_directory.mkdir(parents=True, exist_ok=True)
+        with pd.ExcelWriter(raw_directory.joinpath('raw_boms.xlsx')) as writer:
+            for sheet_name, sheet in self.raw_bom_sheets(rng).items():
+                sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        background_directory = root_directory.joinpath('references/background_data')
+        background_directory.mkdir(parents=True, exist_ok=True)
+        for file_name, dataset in self.background_datasets(rng).items():
+            dataset.to_excel(background_directory.joinpath(file_name), index=False)
+
+        frontend_directory = root_directory.joinpath('data/frontend')
+        frontend_directory.mkdir(parents=True, exist_ok=True)
+        self.project_metadata().to_csv(
+            frontend_directory.joinpath('project_metadata.csv'),
+            index=False
+        )
+        for template_model in self.template_models:
+            for output_directory in TEMPLATE_MODEL_DIRECTORIES:
+                root_directory.joinpath(
+                    f'data/template_models/{template_model}/{output_directory}'
+                ).mkdir(parents=True, exist_ok=True)
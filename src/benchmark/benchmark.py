@@ -0,0 +1,226 @@
+import argparse
+from dataclasses import asdict
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from src.benchmark.BenchmarkHistory import BenchmarkHistory, compare_runs
+from src.benchmark.SyntheticInputs import SyntheticInputs
+
+MAIN_DIRECTORY = Path(__file__).parents[2]
+HISTORY_PATH = MAIN_DIRECTORY.joinpath('reports/benchmarks/history.json')
+# combined datasets whose rows are counted for the combine stage
+COMBINED_DATASETS = ['combined_bom', 'combined_impacts', 'combined_prebuilt_scenarios']
+
+
+def pipeline_stages(workers: int) -> dict:
+    """Module, arguments and output files of every benchmarked pipeline stage, in run order.
+
+    Outputs are globs relative to the project directory whose csv rows are the rows produced
+    by the stage, None for stages without row outputs.
+    """
+    return {
+        'cache': (['src.utils.columnar_cache'], None),
+        'extract': (['src.tm_extractor.extract'], 'data/template_models/*/bom/*.csv'),
+        'calc_impacts': (
+            ['src.impact_calculator.calc_impacts', '--workers', str(workers)],
+            'data/template_models/*/impacts/*.csv'
+        ),
+        'build_prebuilt_scenarios': (
+            ['src.p_scenario_builder.build_prebuilt_scenarios', '--workers', str(workers)],
+            'data/template_models/*/prebuilt_scenarios/*.csv'
+        ),
+        'combine': (['src.combine.combine', '--streaming'], None),
+    }
+
+
+def count_csv_rows(root_directory: Path, pattern: str) -> int:
+    """Count the data rows of every csv file matching a glob pattern."""
+    rows = 0
+    for file_path in root_directory.glob(pattern):
+        with open(file_path, mode='rb') as file:
+            rows += sum(1 for _ in file) - 1
+    return rows
+
+
+def count_combined_rows(root_directory: Path) -> int:
+    """Count the rows of the combined datasets from their _dataset.json files."""
+    rows = 0
+    for name in COMBINED_DATASETS:
+        with open(root_directory.joinpath(f'data/frontend/{name}/_dataset.json'),
+                  mode='r', encoding='utf-8') as file:
+            rows += json.load(file)['rows']
+    return rows
+
+
+def _measure(root_directory: Path, measure_args: list) -> dict:
+    """Run src.benchmark.measure in the project directory and read its measurements."""
+    result_path = root_directory.joinpath('measurement.json')
+    completed = subprocess.run(
+        [sys.executable, '-m', 'src.benchmark.measure', '--result', str(result_path)]
+        + measure_args,
+        cwd=root_directory,
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'Benchmark of {measure_args} failed:\n{completed.stderr}')
+    with open(result_path, mode='r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _git_commit() -> str:
+    """Find the commit of the benchmarked code, None outside of a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=MAIN_DIRECTORY,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(inputs: SyntheticInputs, workers: int = 1, label: str = None,
+                  keep_directory: Path = None) -> dict:
+    """Run the pipeline on synthetic inputs and measure every stage and impact calculator.
+
+    The pipeline runs on a copy of the source tree in a separate project directory, so the
+    data of the repository is never touched. Every stage runs in its own process.
+
+    Args:
+        inputs (SyntheticInputs): size of the synthetic project
+        workers (int, optional): number of worker processes of the template model stages.
+            Defaults to 1.
+        label (str, optional): label of the run, e.g. a branch name. Defaults to None.
+        keep_directory (Path, optional): project directory to run in and keep for inspection.
+            Defaults to a temporary directory.
+
+    Raises:
+        ValueError: Raised if keep_directory is or contains the repository, whose source tree
+            and inputs the run would overwrite
+
+    Returns:
+        dict: record of the run, see BenchmarkHistory
+    """
+    if keep_directory is not None:
+        resolved_directory = Path(keep_directory).resolve()
+        main_directory = MAIN_DIRECTORY.resolve()
+        if resolved_directory == main_directory or resolved_directory in main_directory.parents:
+            raise ValueError(
+                f'Cannot run the benchmark in {keep_directory}, it would overwrite the source '
+                f'tree and inputs of {main_directory}'
+            )
+    with tempfile.TemporaryDirectory(prefix='pod_lca_benchmark_') as temp_directory:
+        root_directory = Path(keep_directory or temp_directory)
+        if root_directory.joinpath('src').exists():
+            shutil.rmtree(root_directory.joinpath('src'))
+        shutil.copytree(
+            MAIN_DIRECTORY.joinpath('src'),
+            root_directory.joinpath('src'),
+            ignore=shutil.ignore_patterns('__pycache__')
+        )
+        inputs.write(root_directory)
+
+        stages = {}
+        for stage_name, (module_args, output_pattern) in pipeline_stages(workers).items():
+            measurements = _measure(root_directory, module_args)
+            if stage_name == 'combine':
+                measurements['rows'] = count_combined_rows(root_directory)
+            elif output_pattern is not None:
+                measurements['rows'] = count_csv_rows(root_directory, output_pattern)
+            stages[stage_name] = measurements
+
+        calculators = _measure(root_directory, ['--calculators'])
+
+    for measurements in list(stages.values()) + list(calculators.values()):
+        if measurements.get('rows') is not None and measurements['wall_time_s'] > 0:
+            measurements['rows_per_s'] = measurements['rows'] / measurements['wall_time_s']
+    return {
+        'label': label,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'config': {**asdict(inputs), 'workers': workers},
+        'stages': stages,
+        'calculators': calculators,
+    }
+
+
+def _run_selector(value: str):
+    """Read a run selector as a position in the history when it is an integer."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--history',
+        type=Path,
+        default=HISTORY_PATH,
+        help='json file holding the benchmark runs'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='benchmark the pipeline on synthetic inputs')
+    run_parser.add_argument('--models', type=int, default=180, help='number of template models')
+    run_parser.add_argument('--rows-per-bom', type=int, default=25,
+                            help='number of elements per bill of materials')
+    run_parser.add_argument('--materials', type=int, default=288,
+                            help='number of Tally materials')
+    run_parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic inputs')
+    run_parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    run_parser.add_argument('--label', default=None, help='label of the run')
+    run_parser.add_argument('--keep', type=Path, default=None,
+                            help='project directory to run in and keep')
+
+    compare_parser = subparsers.add_parser('compare', help='flag regressions between two runs')
+    compare_parser.add_argument('--baseline', type=_run_selector, default=-2,
+                                help='position or label of the reference run')
+    compare_parser.add_argument('--candidate', type=_run_selector, default=-1,
+                                help='position or label of the run to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='relative change counted as a regression')
+
+    args = parser.parse_args()
+    history = BenchmarkHistory(args.history)
+    if args.command == 'run':
+        benchmark_run = run_benchmark(
+            SyntheticInputs(
+                n_models=args.models,
+                rows_per_bom=args.rows_per_bom,
+                n_materials=args.materials,
+                seed=args.seed
+            ),
+            workers=args.workers,
+            label=args.label,
+            keep_directory=args.keep
+        )
+        history.append(benchmark_run)
+        for section in ['stages', 'calculators']:
+            for name, measurements in benchmark_run[section].items():
+                print(f'{name}: ' + ', '.join(
+                    f'{metric} {value:.3f}' for metric, value in measurements.items()
+                    if value is not None
+                ))
+    else:
+        comparison = compare_runs(
+            history.find(args.baseline),
+            history.find(args.candidate),
+            threshold=args.threshold
+        )
+        print(comparison.to_string(index=False))
+        regressions = comparison[comparison['regression']]
+        if not regressions.empty:
+            print(f'{len(regressions)} regressions above {args.threshold:.0%}')
+            sys.exit(1)
@@ -0,0 +1,145 @@
+"""Check the branch and bound design search against a brute force search of the design space.
+
+Every value of every constraint column is searched both ways, once as the metadata value and
+once as the string given on the command line, without and with a maximum number of
+replacements. Both searches have to find the same impacts, and every template model found
+has to meet the constraints.
+"""
+import argparse
+from itertools import product
+import sys
+import numpy as np
+from src.impact_calculator.DesignSpace import load_design_space
+from src.query.DesignSearch import DesignSearch, load_design_search, option_attributes
+from src.query.search_designs import parse_constraints
+
+
+def combination_values(design_search: DesignSearch, column: str) -> np.ndarray:
+    """Find the metadata value of a column for every combination of the design space.
+
+    Values are compared as strings, independently of how the search reads constraints.
+
+    Args:
+        design_search (DesignSearch): search of the design space
+        column (str): metadata column, e.g. 'structural_material'
+
+    Returns:
+        np.ndarray: value of every combination as a string, None for options without metadata
+    """
+    design_space = design_search.design_space
+    subsystem, option_values = option_attributes(
+        design_search.project_metadata, design_space
+    )[column]
+    position = design_space.subsystems.index(subsystem)
+    return np.array([
+        None if options[position] not in option_values else str(option_values[options[position]])
+        for options in product(*design_space.options.values())
+    ], dtype=object)
+
+
+def combination_replacements(design_search: DesignSearch) -> np.ndarray:
+    """Add up the number of replacements of the options of every combination."""
+    design_space = design_search.design_space
+    if design_space.option_replacements is None:
+        return np.zeros(design_space.n_combinations)
+    return np.array([
+        sum(replacements)
+        for replacements in product(*design_space.option_replacements.values())
+    ])
+
+
+def brute_force_top_k(totals: np.ndarray, feasible: np.ndarray, k: int) -> np.ndarray:
+    """Find the impacts of the k lowest impact feasible combinations.
+
+    Args:
+        totals (np.ndarray): impact of every combination, in order of the design space
+        feasible (np.ndarray): whether every combination meets the constraints
+        k (int): number of combinations to find
+
+    Returns:
+        np.ndarray: impacts of the k lowest impact feasible combinations, lowest first
+    """
+    return np.sort(totals[feasible])[:k]
+
+
+def check_design_search(k: int = 10,
+                        impact_category: str = 'Global Warming Potential_fossil') -> tuple:
+    """Compare the design search with the brute force search for every constraint value.
+
+    Args:
+        k (int, optional): number of combinations to find. Defaults to 10.
+        impact_category (str, optional): impact category to minimize. Defaults to
+            'Global Warming Potential_fossil'.
+
+    Returns:
+        tuple: number of cases checked, list of mismatches
+    """
+    design_search = load_design_search(load_design_space())
+    design_space = design_search.design_space
+    totals = design_space.totals(impact_category).ravel()
+    combination_positions = {
+        template_model: position
+        for position, template_model in enumerate(design_space.template_models)
+    }
+    replacements = combination_replacements(design_search)
+    max_replacements_cases = [None, float(np.median(replacements))]
+
+    cases = 0
+    mismatches = []
+    for column in design_search.constraint_columns:
+        values = combination_values(design_search, column)
+        for value in design_search.project_metadata[column].dropna().unique():
+            value = value.item() if isinstance(value, np.generic) else value
+            for constraints, max_replacements in product(
+                [{column: value}, parse_constraints([f'{column}={value}'])],
+                max_replacements_cases
+            ):
+                cases += 1
+                found = design_search.top_k(
+                    k,
+                    impact_category=impact_category,
+                    max_replacements=max_replacements,
+                    **constraints
+                )
+                feasible = values == str(value)
+                if max_replacements is not None:
+                    feasible &= replacements <= max_replacements
+                expected = brute_force_top_k(totals, feasible, k)
+                found_impacts = found[impact_category].to_numpy(dtype=float)
+                found_positions = [
+                    combination_positions[template_model]
+                    for template_model in found['template_model']
+                ]
+                if (
+                    len(found_impacts) != len(expected)
+                    or not np.allclose(found_impacts, expected, rtol=1e-12, atol=1e-9)
+                    or not np.allclose(found_impacts, totals[found_positions],
+                                       rtol=1e-12, atol=1e-9)
+                    or not feasible[found_positions].all()
+                ):
+                    mismatches.append(
+                        f'{constraints} max_replacements={max_replacements}: found '
+                        f'{found_impacts.tolist()}, brute force {expected.tolist()}'
+                    )
+    return cases, mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--k',
+        type=int,
+        default=10,
+        help='number of lowest impact template models to find'
+    )
+    parser.add_argument(
+        '--category',
+        default='Global Warming Potential_fossil',
+        help='impact category to minimize'
+    )
+    args = parser.parse_args()
+    checked_cases, search_mismatches = check_design_search(args.k, args.category)
+    for mismatch in search_mismatches:
+        print(mismatch)
+    print(f'{checked_cases} cases, {len(search_mismatches)} mismatches')
+    sys.exit(1 if search_mismatches else 0)
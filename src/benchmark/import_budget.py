@@ -0,0 +1,116 @@
+"""Check the cold start cost of the read-only query entry modules against a budget.
+
+Every module is imported in a fresh interpreter with -X importtime. Its import time beyond the
+import of pandas, which every entry module needs, has to stay under the budget, and none of the
+dependencies that are only imported on first use may be loaded by the import.
+"""
+import argparse
+from pathlib import Path
+import subprocess
+import sys
+
+MAIN_DIRECTORY = Path(__file__).parents[2]
+# read-only query paths served to the frontend
+QUERY_MODULES = [
+    'src.query.ImpactCubes',
+    'src.query.ImpactTensor',
+    'src.query.DataService',
+    'src.p_scenario_builder.CustomScenario',
+]
+# heavy dependencies imported on first use only
+LAZY_DEPENDENCIES = ['openpyxl', 'pandera', 'plotly', 'yaml', 'pyarrow.dataset']
+
+
+def measure_import(module: str) -> tuple:
+    """Import a module in a fresh interpreter.
+
+    Args:
+        module (str): module to import, e.g. 'src.query.ImpactCubes'
+
+    Raises:
+        RuntimeError: Raised if the module cannot be imported
+
+    Returns:
+        tuple: cumulative import time of the module in ms, set of every module imported
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=MAIN_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{completed.stderr}')
+    import_time_ms = None
+    imported_modules = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        imported_modules.add(name.strip())
+        if name.strip() == module:
+            import_time_ms = int(cumulative_us) / 1000
+    return import_time_ms, imported_modules
+
+
+def check_import_budget(modules: list = None, budget_ms: float = 100,
+                        repeats: int = 3) -> list:
+    """Check the import of every module against the budget.
+
+    The fastest of several imports is compared, as a single cold import is noisy.
+
+    Args:
+        modules (list, optional): modules to check. Defaults to QUERY_MODULES.
+        budget_ms (float, optional): import time allowed on top of the import of pandas, in ms.
+            Defaults to 100.
+        repeats (int, optional): number of imports of every module. Defaults to 3.
+
+    Returns:
+        list: violations of the budget, empty if every module is within budget
+    """
+    pandas_ms = min(measure_import('pandas')[0] for _ in range(repeats))
+    print(f'pandas: {pandas_ms:.0f} ms')
+    violations = []
+    for module in modules or QUERY_MODULES:
+        measurements = [measure_import(module) for _ in range(repeats)]
+        import_time_ms = min(import_time for import_time, _ in measurements)
+        overhead_ms = import_time_ms - pandas_ms
+        print(f'{module}: {import_time_ms:.0f} ms, {overhead_ms:+.0f} ms over pandas')
+        if overhead_ms > budget_ms:
+            violations.append(
+                f'{module} takes {overhead_ms:.0f} ms over pandas, budget is {budget_ms:.0f} ms'
+            )
+        eager_dependencies = [
+            dependency for dependency in LAZY_DEPENDENCIES
+            if dependency in measurements[0][1]
+        ]
+        if eager_dependencies:
+            violations.append(f'{module} imports {eager_dependencies} at import time')
+    return violations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--budget-ms',
+        type=float,
+        default=100,
+        help='import time allowed on top of the import of pandas, in ms'
+    )
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=3,
+        help='number of imports of every module, the fastest one is compared'
+    )
+    parser.add_argument(
+        'modules',
+        nargs='*',
+        help='modules to check, the read-only query modules by default'
+    )
+    args = parser.parse_args()
+    budget_violations = check_import_budget(args.modules, args.budget_ms, args.repeats)
+    for violation in budget_violations:
+        print(violation)
+    sys.exit(1 if budget_violations else 0)
@@ -0,0 +1,104 @@
+"""Run one pipeline stage, or the impact calculators one by one, and record what it cost.
+
+Started by the benchmark harness in a separate process, so the peak memory of every stage is
+measured on its own. Worker processes of a stage are not included in its peak memory.
+"""
+import argparse
+from collections import defaultdict
+import json
+from pathlib import Path
+import runpy
+import sys
+import time
+import src.utils.general as gen
+
+
+def measure_stage(module: str, module_args: list) -> dict:
+    """Run the __main__ block of a pipeline module and measure it.
+
+    Args:
+        module (str): module to run, e.g. 'src.impact_calculator.calc_impacts'
+        module_args (list): command line arguments of the module
+
+    Returns:
+        dict: wall_time_s and peak_memory_mb of the stage
+    """
+    sys.argv = [module] + module_args
+    start = time.perf_counter()
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+    return {
+        'wall_time_s': time.perf_counter() - start,
+        'peak_memory_mb': gen.peak_memory_mb(),
+    }
+
+
+def measure_calculators() -> dict:
+    """Time every impact calculator and scenario builder over all template models.
+
+    Calculators run one stage at a time in dependency order, with the impacts of the upstream
+    stages handed over in memory, so only the calculation of the stage itself is timed.
+    Prebuilt scenarios build on the template model impacts written by calc_impacts.
+
+    Returns:
+        dict: wall_time_s and rows of every calculator class, keyed by class name
+    """
+    # imported here so that import time is not charged to the calculators
+    from src.impact_calculator.calc_impacts import IMPACT_STAGE_GRAPH
+    import src.impact_calculator.ImpactCalculator as ic
+    from src.p_scenario_builder.build_prebuilt_scenarios import PREBUILT_SCENARIO_STAGE_GRAPH
+
+    tm_directory = Path(__file__).parents[2].joinpath('data/template_models')
+    template_model_list = [
+        temp_model.name for temp_model in tm_directory.glob("*")
+        if '.gitkeep' not in temp_model.name
+    ]
+    calculators = defaultdict(lambda: {'wall_time_s': 0.0, 'rows': 0})
+    for template_model in template_model_list:
+        bom_loader = ic.ImpactCalculator(template_model)
+        bom_loader.load_bill_of_materials()
+        for stage_graph in [IMPACT_STAGE_GRAPH, PREBUILT_SCENARIO_STAGE_GRAPH]:
+            results = {}
+            for stage in stage_graph.ordered_stages():
+                start = time.perf_counter()
+                results.update(stage_graph.run(
+                    template_model,
+                    bill_of_materials=bom_loader.bill_of_materials,
+                    upstream_impacts=results if stage_graph.chain_stages else None,
+                    stage_names=[stage.name]
+                ))
+                calculator = calculators[stage.calculator.__name__]
+                calculator['wall_time_s'] += time.perf_counter() - start
+                calculator['rows'] += len(results[stage.name])
+    return dict(calculators)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--result',
+        type=Path,
+        required=True,
+        help='json file the measurements are written to'
+    )
+    parser.add_argument(
+        '--calculators',
+        action='store_true',
+        help='time the impact calculators instead of running a module'
+    )
+    parser.add_argument(
+        'module',
+        nargs='?',
+        help='pipeline module to run'
+    )
+    parser.add_argument(
+        'module_args',
+        nargs=argparse.REMAINDER,
+        help='command line arguments of the module'
+    )
+    args = parser.parse_args()
+    if args.calculators:
+        measurements = measure_calculators()
+    else:
+        measurements = measure_stage(args.module, args.module_args)
+    with open(args.result, mode='w', encoding='utf-8') as file:
+        json.dump(measurements, file, indent=1)
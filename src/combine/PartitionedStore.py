@@ -0,0 +1,263 @@
+"""Definition of the partitioned columnar store holding the combined frontend datasets."""
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+def dictionary_encode(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert string columns to categoricals, written as dictionary-encoded columns.
+
+    Args:
+        df (pd.DataFrame): DataFrame to encode
+
+    Returns:
+        pd.DataFrame: DataFrame with every object column converted to a categorical
+    """
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        # mixed value types, e.g. '242?' next to 239, are stored as strings
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str)).astype('category')
+    return df
+
+
+def to_table(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Table:
+    """Convert a DataFrame into a dictionary-encoded table.
+
+    Args:
+        df (pd.DataFrame): DataFrame to convert
+        schema (pa.Schema, optional): schema the table has to follow, e.g. the schema of
+            batches already written. Columns missing from df are filled with nulls.
+
+    Raises:
+        ValueError: Raised if df has columns outside of schema, or values that do not fit it
+
+    Returns:
+        pa.Table: table without pandas metadata
+    """
+    # pandas metadata would be repeated in the footer of every partition file
+    table = pa.Table.from_pandas(
+        dictionary_encode(df),
+        preserve_index=False
+    ).replace_schema_metadata(None)
+    if schema is None:
+        return table
+
+    extra_columns = [name for name in table.column_names if name not in schema.names]
+    if extra_columns:
+        raise ValueError(f'Columns {extra_columns} are not in the dataset schema')
+    for schema_field in schema:
+        if schema_field.name not in table.column_names:
+            table = table.append_column(
+                schema_field,
+                pa.nulls(len(table), type=schema_field.type)
+            )
+    try:
+        return table.select(schema.names).cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as error:
+        raise ValueError(f'Batch does not match the dataset schema: {error}') from error
+
+
+def dataset_schema(table: pa.Table) -> pa.Schema:
+    """Derive the schema of a dataset from its first batch.
+
+    Dictionary indices are widened to int32, so later batches with more categories still fit.
+
+    Args:
+        table (pa.Table): first batch of the dataset
+
+    Returns:
+        pa.Schema: schema every batch of the dataset is cast to
+    """
+    return pa.schema([
+        pa.field(
+            schema_field.name,
+            pa.dictionary(pa.int32(), schema_field.type.value_type)
+        ) if pa.types.is_dictionary(schema_field.type) else schema_field
+        for schema_field in table.schema
+    ])
+
+
+@dataclass
+class PartitionedStore:
+    """Parquet dataset split into one directory per combination of partition values.
+
+    Partitions are stored as hive directories, e.g.
+    template_model=STR1_ENCO1_ENCT1_ENCR1/life_cycle_stage=A1-A3%3A%20Product, so readers can
+    load only the partitions and columns they need. String columns are dictionary-encoded and
+    read back as categoricals. A _dataset.json file, skipped by parquet readers, is written once
+    the dataset is complete.
+
+    Attr:
+        directory (Path): directory of the dataset
+        partition_columns (list): columns the dataset is partitioned by, in directory order
+    """
+    directory: Path
+    partition_columns: list = field(default_factory=lambda: ['template_model'])
+
+    @property
+    def dataset_info_path(self) -> Path:
+        """File path of the dataset json, only present once the dataset is complete."""
+        return self.directory.joinpath('_dataset.json')
+
+    def open_writer(self, batch_rows: int = 10000) -> 'PartitionedStoreWriter':
+        """Start replacing the dataset batch by batch.
+
+        Args:
+            batch_rows (int, optional): number of buffered rows that triggers a write.
+                Defaults to 10000.
+
+        Returns:
+            PartitionedStoreWriter: writer of the new dataset
+        """
+        return PartitionedStoreWriter(self, batch_rows=batch_rows)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Replace the dataset with a DataFrame.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the partition columns
+        """
+        with self.open_writer() as writer:
+            writer.write(df)
+
+    def dataset(self) -> ds.Dataset:
+        """Open the dataset without reading it.
+
+        Returns:
+            ds.Dataset: pyarrow dataset with dictionary-encoded partition columns
+        """
+        return ds.dataset(
+            self.directory,
+            format='parquet',
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True)
+        )
+
+    def read(self, columns: list = None, filters: dict = None) -> pd.DataFrame:
+        """Read the dataset, or only some of its columns and partitions.
+
+        Args:
+            columns (list, optional): columns to read. Defaults to all columns.
+            filters (dict, optional): value, or list of values, to keep for a column,
+                e.g. {'template_model': ['STR1_ENCO1_ENCT1_ENCR1']}. Filters on partition
+                columns skip the other partitions entirely.
+
+        Returns:
+            pd.DataFrame: requested columns and rows of the dataset
+        """
+        expression = None
+        for column, values in (filters or {}).items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            column_expression = ds.field(column).isin(list(values))
+            expression = column_expression if expression is None else expression & column_expression
+        return self.dataset().to_table(columns=columns, filter=expression).to_pandas()
+
+
+@dataclass
+class PartitionedStoreWriter:
+    """Writer replacing a partitioned store one batch at a time.
+
+    Batches are buffered until they hold batch_rows rows and then written to parquet, so memory
+    is bounded by batch_rows plus the largest batch rather than by the whole dataset. The new
+    dataset is written next to the current one and swapped in on close. Use as a context
+    manager to discard the new dataset on errors.
+
+    Attr:
+        store (PartitionedStore): store to replace
+        batch_rows (int): number of buffered rows that triggers a write
+        schema (pa.Schema): schema of the dataset, taken from the first batch
+        rows_written (int): number of rows written so far
+        writes (int): number of buffer writes so far
+    """
+    store: PartitionedStore
+    batch_rows: int = 10000
+    schema: pa.Schema = None
+    rows_written: int = 0
+    writes: int = 0
+    buffer: list = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        if self.temp_directory.exists():
+            shutil.rmtree(self.temp_directory)
+        self.temp_directory.mkdir(parents=True)
+
+    def __enter__(self) -> 'PartitionedStoreWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            shutil.rmtree(self.temp_directory, ignore_errors=True)
+
+    @property
+    def temp_directory(self) -> Path:
+        """Directory the new dataset is written to until it is complete."""
+        return self.store.directory.with_name(f'{self.store.directory.name}.tmp')
+
+    @property
+    def buffered_rows(self) -> int:
+        """Number of rows received but not written yet."""
+        return sum(len(df) for df in self.buffer)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append a batch to the dataset.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the partition columns
+
+        """
+        if df.empty:
+            return
+        self.buffer.append(df)
+        if self.buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered batches to parquet.
+
+        Raises:
+            ValueError: Raised if the batches do not match the schema of the first batch
+        """
+        if not self.buffer:
+            return
+        df = pd.concat(self.buffer, ignore_index=True)
+        self.buffer = []
+        table = to_table(df, self.schema)
+        if self.schema is None:
+            self.schema = dataset_schema(table)
+            table = table.cast(self.schema)
+        ds.write_dataset(
+            table,
+            self.temp_directory,
+            format='parquet',
+            partitioning=self.store.partition_columns,
+            partitioning_flavor='hive',
+            basename_template=f'part-{self.writes}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_partitions=max(len(df[self.store.partition_columns].drop_duplicates()), 1)
+        )
+        self.rows_written += len(table)
+        self.writes += 1
+
+    def close(self) -> None:
+        """Write the remaining batches, mark the new dataset as complete and swap it in."""
+        self.flush()
+        with open(self.temp_directory.joinpath('_dataset.json'), mode='w',
+                  encoding='utf-8') as file:
+            json.dump(
+                {
+                    'partition_columns': self.store.partition_columns,
+                    'columns': [] if self.schema is None else self.schema.names,
+                    'rows': self.rows_written,
+                },
+                file,
+                indent=1
+            )
+        if self.store.directory.exists():
+            shutil.rmtree(self.store.directory)
+        self.temp_directory.rename(self.store.directory)
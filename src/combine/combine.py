@@ -1,11 +1,191 @@
+import argparse
+from contextlib import ExitStack
 from pathlib import Path
 import pandas as pd
+from src.combine.PartitionedStore import PartitionedStore
+from src.impact_calculator.SparseImpacts import SparseImpacts
+from src.query.ImpactCubes import ImpactCubes, template_model_rollup
+from src.query.ImpactTensor import ImpactTensor
 import src.utils.general as gen
+from src.utils.profiling import span
+import src.utils.schema as sch
 
+# template model sub-directory and partition columns of every combined frontend dataset
+FRONTEND_DATASETS = {
+    'combined_bom': {
+        'directory': 'bom',
+        'partition_columns': ['template_model'],
+    },
+    'combined_impacts': {
+        'directory': 'impacts',
+        'partition_columns': ['template_model', 'life_cycle_stage'],
+    },
+    'combined_prebuilt_scenarios': {
+        'directory': 'prebuilt_scenarios',
+        'partition_columns': ['template_model', 'life_cycle_stage'],
+    },
+}
 
-def create_data_for_frontend():
+
+def frontend_store(name: str, frontend_directory: Path) -> PartitionedStore:
+    """Find the partitioned store of a combined frontend dataset.
+
+    Args:
+        name (str): name of combined dataset, e.g. 'combined_impacts'
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Returns:
+        PartitionedStore: store of the combined dataset
+    """
+    return PartitionedStore(
+        directory=frontend_directory.joinpath(name),
+        partition_columns=FRONTEND_DATASETS[name]['partition_columns']
+    )
+
+
+# combined datasets also laid out as memory-mapped impact tensors
+TENSOR_DATASETS = ['combined_impacts', 'combined_prebuilt_scenarios']
+# combined datasets also stored as sparse impacts, combined from those of the template models
+SPARSE_DATASETS = ['combined_impacts', 'combined_prebuilt_scenarios']
+
+
+def impact_cubes_directory(frontend_directory: Path) -> Path:
+    """Find the directory of the impact rollup cubes built from combined_impacts."""
+    return frontend_directory.joinpath('impact_cubes')
+
+
+def write_impact_cubes(rollups: list, frontend_directory: Path) -> int:
+    """Build the impact rollup cubes and write them next to the combined datasets.
+
+    Args:
+        rollups (list): finest rollups of the template models, see template_model_rollup
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Returns:
+        int: number of rows written over all cubes
+    """
+    cubes = ImpactCubes.from_rollup(
+        pd.concat(rollups, ignore_index=True),
+        gen.read_csv(sch.PROJECT_METADATA_PATH, apply_schema=True)
+    )
+    cubes.write(impact_cubes_directory(frontend_directory))
+    return sum(len(cube) for cube in cubes.cubes.values())
+
+
+def impact_tensor_directory(frontend_directory: Path) -> Path:
+    """Find the directory of the memory-mapped impact tensors."""
+    return frontend_directory.joinpath('impact_tensor')
+
+
+def write_impact_tensors(rollups: dict, frontend_directory: Path) -> int:
+    """Lay the combined datasets out as impact tensors and write them next to the datasets.
+
+    Args:
+        rollups (dict): finest rollups of the template models, see template_model_rollup,
+            keyed by combined dataset name
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Returns:
+        int: number of values written over all tensors
+    """
+    values_written = 0
+    for name, dataset_rollups in rollups.items():
+        if not dataset_rollups:
+            continue
+        tensor = ImpactTensor.from_rollup(pd.concat(dataset_rollups, ignore_index=True))
+        tensor.write(impact_tensor_directory(frontend_directory), name)
+        values_written += tensor.values.size
+    return values_written
+
+
+def sparse_impacts_directory(frontend_directory: Path) -> Path:
+    """Find the directory of the combined sparse impacts."""
+    return frontend_directory.joinpath('sparse_impacts')
+
+
+def write_sparse_impacts(template_model_list: list, tm_directory: Path,
+                         frontend_directory: Path) -> int:
+    """Combine the sparse impacts of the template models and write them next to the datasets.
+
+    Args:
+        template_model_list (list): names of template models
+        tm_directory (Path): directory holding the template model directories
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Template models with stage csvs but no sparse impacts, e.g. in a fresh clone, where sparse
+    impacts are not tracked, have their sparse impacts built from the csvs and written first.
+
+    Returns:
+        int: number of values written over all sparse impacts
+    """
+    values_written = 0
+    for name in SPARSE_DATASETS:
+        directory_name = FRONTEND_DATASETS[name]['directory']
+        template_model_impacts = {}
+        for template_model in template_model_list:
+            directory = tm_directory.joinpath(f'{template_model}/{directory_name}')
+            sparse_name = f'{template_model}_{directory_name}'
+            sparse_impacts = SparseImpacts.read(directory, sparse_name)
+            stage_files = sorted(directory.glob('*.csv'))
+            if sparse_impacts is None and stage_files:
+                sparse_impacts = SparseImpacts.from_impacts([
+                    gen.read_csv(file, apply_schema=True, float_precision='round_trip')
+                    for file in stage_files
+                ])
+                sparse_impacts.write(directory, sparse_name)
+            if sparse_impacts is not None:
+                template_model_impacts[template_model] = sparse_impacts
+        if not template_model_impacts:
+            continue
+        combined_impacts = SparseImpacts.concat(template_model_impacts)
+        combined_impacts.write(sparse_impacts_directory(frontend_directory), name)
+        values_written += len(combined_impacts.values)
+    return values_written
+
+
+def read_template_model_dataset(template_model: str, name: str,
+                                tm_directory: Path) -> pd.DataFrame:
+    """Read the files of one template model that belong to a combined frontend dataset.
+
+    Args:
+        template_model (str): name of template model
+        name (str): name of combined dataset, e.g. 'combined_impacts'
+        tm_directory (Path): directory holding the template model directories
+
+    Returns:
+        pd.DataFrame: rows of the template model, None if it has no files for the dataset
+    """
+    directory = tm_directory.joinpath(f'{template_model}/{FRONTEND_DATASETS[name]["directory"]}')
+    with span('template_model', template_model=template_model, task=name):
+        dfs_to_combine = []
+        for file in directory.glob("*.csv"):
+            # the schema is applied once to the rows of the template model rather than per file
+            temp_df = gen.read_csv(file)
+            temp_df['template_model'] = template_model
+            dfs_to_combine.append(temp_df)
+        if not dfs_to_combine:
+            return None
+        return sch.apply_schema(pd.concat(dfs_to_combine, ignore_index=True))
+
+
+def create_data_for_frontend(streaming: bool = False, batch_rows: int = 10000) -> dict:
     """
-    Implementation of TemplateModelExtractor for creation of bill of materials.
+    Implementation of PartitionedStore for creation of the combined frontend datasets.
+
+    In streaming mode the files of one template model at a time are read and appended to the
+    stores, which write them in batches of batch_rows rows. Memory is then bounded by
+    batch_rows and the largest template model instead of the whole dataset. The impact rollup
+    cubes and the impact tensors are built from rollups of the template models in both modes.
+
+    Args:
+        streaming (bool, optional): append template models to the stores one at a time.
+            Defaults to False.
+        batch_rows (int, optional): number of rows written at once in streaming mode.
+            Defaults to 10000.
+
+    Returns:
+        dict: number of rows written to every combined dataset and to the impact cubes, and
+            number of values written to the impact tensors and to the sparse impacts
     """
     main_directory = Path(__file__).parents[2]
     tm_directory = main_directory.joinpath('data/template_models')
@@ -16,54 +196,76 @@ def create_data_for_frontend():
         if '.gitkeep' not in temp_model.name:
             template_model_list.append(temp_model.name)
 
-    bill_of_materials_to_combine = []
-    impacts_to_combine = []
-    prebuilt_scenarios_to_combine = []
-
-    lists_for_combining = {
-        'bill_of_materials_to_combine': bill_of_materials_to_combine,
-        'impacts_to_combine': impacts_to_combine,
-        'prebuilt_scenarios_to_combine': prebuilt_scenarios_to_combine
-    }
-
-    for template_model in template_model_list:
-        directories_per_tm = {
-            'bill_of_materials_to_combine': main_directory.joinpath(f'data/template_models/{template_model}/bom'),
-            'impacts_to_combine': main_directory.joinpath(f'data/template_models/{template_model}/impacts'),
-            'prebuilt_scenarios_to_combine': main_directory.joinpath(f'data/template_models/{template_model}/prebuilt_scenarios')
-        }
-
-        for list_for_dfs, directory in directories_per_tm.items():
-            for file in directory.glob("*.csv"):
-                temp_df = gen.read_csv(file)
-                temp_df = temp_df.set_index('element_index')
-                temp_df['template_model'] = template_model
-                lists_for_combining.get(list_for_dfs).append(temp_df)
-
-    combined_bom = pd.concat(bill_of_materials_to_combine)
-    combined_impacts = pd.concat(impacts_to_combine)
-    combined_prebuilt_scenarios = pd.concat(prebuilt_scenarios_to_combine)
-
-    files_to_write = {
-        'combined_bom': combined_bom,
-        'combined_impacts': combined_impacts,
-        'combined_prebuilt_scenarios': combined_prebuilt_scenarios
-    }
-
-    for name, df in files_to_write.items():
-        gen.write_to_pickle(
-            df=df,
-            write_directory=frontend_directory,
-            file_name=name
+    rollups = {name: [] for name in TENSOR_DATASETS}
+    if streaming:
+        with ExitStack() as writer_stack:
+            writers = {
+                name: writer_stack.enter_context(
+                    frontend_store(name, frontend_directory).open_writer(batch_rows)
+                )
+                for name in FRONTEND_DATASETS
+            }
+            for template_model in template_model_list:
+                for name, writer in writers.items():
+                    template_model_df = read_template_model_dataset(
+                        template_model, name, tm_directory
+                    )
+                    if template_model_df is not None:
+                        writer.write(template_model_df)
+                        if name in rollups:
+                            rollups[name].append(template_model_rollup(template_model_df))
+        rows_written = {name: writer.rows_written for name, writer in writers.items()}
+        rows_written['impact_cubes'] = write_impact_cubes(
+            rollups['combined_impacts'], frontend_directory
         )
-
-    for name, df in files_to_write.items():
-        gen.write_to_csv(
-            df=df,
-            write_directory=frontend_directory,
-            file_name=name
+        rows_written['impact_tensor'] = write_impact_tensors(rollups, frontend_directory)
+        rows_written['sparse_impacts'] = write_sparse_impacts(
+            template_model_list, tm_directory, frontend_directory
         )
+        return rows_written
+
+    rows_written = {}
+    for name in FRONTEND_DATASETS:
+        dfs_to_combine = [
+            read_template_model_dataset(template_model, name, tm_directory)
+            for template_model in template_model_list
+        ]
+        combined_df = sch.apply_schema(pd.concat(dfs_to_combine, ignore_index=True), validate=True)
+        frontend_store(name, frontend_directory).write(combined_df)
+        rows_written[name] = len(combined_df)
+        if name in rollups:
+            rollups[name].append(template_model_rollup(combined_df))
+    rows_written['impact_cubes'] = write_impact_cubes(
+        rollups['combined_impacts'], frontend_directory
+    )
+    rows_written['impact_tensor'] = write_impact_tensors(rollups, frontend_directory)
+    rows_written['sparse_impacts'] = write_sparse_impacts(
+        template_model_list, tm_directory, frontend_directory
+    )
+    return rows_written
 
 
 if __name__ == '__main__':
-    create_data_for_frontend()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='append template models to the combined datasets one at a time'
+    )
+    parser.add_argument(
+        '--batch-rows',
+        type=int,
+        default=10000,
+        help='number of rows written at once in streaming mode'
+    )
+    args = parser.parse_args()
+    frontend_rows = create_data_for_frontend(
+        streaming=args.streaming,
+        batch_rows=args.batch_rows
+    )
+    for dataset_name, rows in frontend_rows.items():
+        unit = 'values' if dataset_name in ['impact_tensor', 'sparse_impacts'] else 'rows'
+        print(f'{dataset_name}: {rows} {unit} written')
+    peak_memory = gen.peak_memory_mb()
+    if peak_memory is not None:
+        print(f'Peak memory: {peak_memory:.1f} MB')
@@ -0,0 +1,268 @@
+"""Definition of the design space of every combination of building system options.
+
+Bill of materials driven impacts are additive over elements, and the bill of materials of a
+template model is the union of the rows of its four options. The impacts of a combination are
+therefore the sum of the impacts of its options, each computed once, so the whole Cartesian
+space of options can be ranked without extracting a bill of materials per combination.
+"""
+from dataclasses import dataclass, field
+from itertools import product
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.impact_calculator.ElementVectors import ELEMENT_STAGES, load_element_vectors
+from src.tm_extractor.TemplateModelExtractor import TemplateModelExtractor
+
+# option prefix of every subsystem, in the order of the parts of template model names
+SUBSYSTEMS = {
+    'Structure': 'STR',
+    'Enclosure - Opaque': 'ENCO',
+    'Enclosure - Translucent': 'ENCT',
+    'Enclosure - Roofing': 'ENCR',
+}
+
+
+@dataclass
+class DesignSpace:
+    """Impacts of the options of every subsystem, composed into template models on demand.
+
+    Operational energy does not depend on the bill of materials and is not included, see
+    ElementVectors.
+
+    Attr:
+        options (dict): option names of every subsystem, keyed by subsystem
+        option_impacts (dict): options x stages x impact categories array of the summed element
+            impacts of every option of a subsystem, keyed by subsystem
+        impact_categories (list): impact category names, in order of the last axis
+        stages (list): life cycle stage names, in order of the stage axis
+        option_replacements (dict): number of element replacements within the reference study
+            period of every option of a subsystem, keyed by subsystem
+    """
+    options: dict
+    option_impacts: dict
+    impact_categories: list
+    stages: list = field(default_factory=lambda: list(ELEMENT_STAGES))
+    option_replacements: dict = None
+    _option_positions: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._option_positions = {
+            subsystem: {option: position for position, option in enumerate(options)}
+            for subsystem, options in self.options.items()
+        }
+
+    @property
+    def subsystems(self) -> list:
+        """Subsystems in the order of the parts of template model names."""
+        return list(self.options.keys())
+
+    @property
+    def shape(self) -> tuple:
+        """Number of options of every subsystem."""
+        return tuple(len(options) for options in self.options.values())
+
+    @property
+    def n_combinations(self) -> int:
+        """Number of template models in the design space."""
+        return int(np.prod(self.shape))
+
+    @property
+    def template_models(self) -> list:
+        """Names of every template model of the design space, in order of the totals."""
+        return ['_'.join(options) for options in product(*self.options.values())]
+
+    def option_positions(self, template_models: list) -> np.ndarray:
+        """Find the option position of every subsystem of a list of template models.
+
+        Args:
+            template_models (list): template model names, e.g. STR1_ENCO1_ENCT1_ENCR1
+
+        Raises:
+            KeyError: Raised if a template model uses an option outside of the design space
+
+        Returns:
+            np.ndarray: template models x subsystems option positions
+        """
+        positions = np.empty((len(template_models), len(self.subsystems)), dtype=np.intp)
+        for row, template_model in enumerate(template_models):
+            option_names = template_model.split('_')[:len(self.subsystems)]
+            for column, (subsystem, option_name) in enumerate(zip(self.subsystems, option_names)):
+                try:
+                    positions[row, column] = self._option_positions[subsystem][option_name]
+                except KeyError as ke:
+                    raise KeyError(
+                        f'{template_model} uses {option_name}, which is not a {subsystem} option'
+                    ) from ke
+        return positions
+
+    def evaluate(self, template_models: list) -> np.ndarray:
+        """Compose the impacts of a list of template models from the impacts of their options.
+
+        Args:
+            template_models (list): template model names, e.g. STR1_ENCO1_ENCT1_ENCR1
+
+        Returns:
+            np.ndarray: template models x stages x impact categories impacts
+        """
+        positions = self.option_positions(template_models)
+        return sum(
+            self.option_impacts[subsystem][positions[:, column]]
+            for column, subsystem in enumerate(self.subsystems)
+        )
+
+    def subsystem_totals(self, impact_category: str, stages: list = None) -> dict:
+        """Add up the impacts of one category over life cycle stages for every option.
+
+        Args:
+            impact_category (str): impact category name, e.g. 'Global Warming Potential_fossil'
+            stages (list, optional): life cycle stages to add up. Defaults to every stage.
+
+        Returns:
+            dict: impact of every option of a subsystem, keyed by subsystem
+        """
+        category_position = self.impact_categories.index(impact_category)
+        stage_positions = [self.stages.index(stage) for stage in (stages or self.stages)]
+        return {
+            subsystem: subsystem_impacts[:, stage_positions, category_position].sum(axis=1)
+            for subsystem, subsystem_impacts in self.option_impacts.items()
+        }
+
+    def totals(self, impact_category: str, stages: list = None) -> np.ndarray:
+        """Compose the impacts of one category for every template model of the design space.
+
+        Options are broadcast against each other, so no combination is built one at a time.
+
+        Args:
+            impact_category (str): impact category name, e.g. 'Global Warming Potential_fossil'
+            stages (list, optional): life cycle stages to add up. Defaults to every stage.
+
+        Returns:
+            np.ndarray: array of the shape of the design space, one axis per subsystem
+        """
+        n_subsystems = len(self.subsystems)
+        totals = np.zeros(self.shape)
+        for axis, option_totals in enumerate(
+            self.subsystem_totals(impact_category, stages).values()
+        ):
+            broadcast_shape = [1] * n_subsystems
+            broadcast_shape[axis] = len(option_totals)
+            totals = totals + option_totals.reshape(broadcast_shape)
+        return totals
+
+    def rank(self, impact_category: str = 'Global Warming Potential_fossil',
+             stages: list = None, top: int = None) -> pd.DataFrame:
+        """Rank every template model of the design space by one impact category.
+
+        Args:
+            impact_category (str, optional): impact category to rank by. Defaults to
+                'Global Warming Potential_fossil'.
+            stages (list, optional): life cycle stages to add up. Defaults to every stage.
+            top (int, optional): number of lowest impact template models to return. Defaults
+                to every template model.
+
+        Returns:
+            pd.DataFrame: template_model and impact of the template models, lowest impact first
+        """
+        totals = self.totals(impact_category, stages).ravel()
+        if top is not None and top < len(totals):
+            selected = np.argpartition(totals, top)[:top]
+        else:
+            selected = np.arange(len(totals))
+        selected = selected[np.argsort(totals[selected], kind='stable')]
+        option_positions = np.unravel_index(selected, self.shape)
+        return pd.DataFrame({
+            'template_model': [
+                '_'.join(options) for options in zip(*[
+                    np.asarray(self.options[subsystem])[positions]
+                    for subsystem, positions in zip(self.subsystems, option_positions)
+                ])
+            ],
+            impact_category: totals[selected],
+        })
+
+    def to_frame(self, template_models: list) -> pd.DataFrame:
+        """Compose the impacts of a list of template models as a long DataFrame.
+
+        Args:
+            template_models (list): template model names, e.g. STR1_ENCO1_ENCT1_ENCR1
+
+        Returns:
+            pd.DataFrame: impact categories indexed by template_model and life cycle stage
+        """
+        impacts = self.evaluate(template_models)
+        return pd.DataFrame(
+            impacts.reshape(-1, len(self.impact_categories)),
+            index=pd.MultiIndex.from_product(
+                [template_models, self.stages],
+                names=['template_model', 'life_cycle_stage']
+            ),
+            columns=self.impact_categories
+        )
+
+
+def option_impacts(option_name: str, Extractor: TemplateModelExtractor) -> tuple:
+    """Compute the summed element impacts of one option, as if it were a template model.
+
+    Args:
+        option_name (str): option name, e.g. STR1
+        Extractor (TemplateModelExtractor): extractor with grouped raw bill of materials
+
+    Returns:
+        tuple: impact categories of the option indexed by life cycle stage, number of element
+            replacements of the option
+    """
+    element_vectors = load_element_vectors(
+        option_name,
+        Extractor.get_bill_of_materials(option_name).reset_index()
+    )
+    stage_impacts = element_vectors.stage_impacts()
+    impacts = pd.DataFrame(
+        [stage_impacts[stage].sum(axis=0) for stage in ELEMENT_STAGES],
+        index=ELEMENT_STAGES,
+        columns=element_vectors.impact_categories
+    )
+    return impacts, float(element_vectors.number_of_replacements().sum())
+
+
+def load_design_space(raw_bom_path: Path = None) -> DesignSpace:
+    """Compute the impacts of every option of the raw bill of materials once.
+
+    Args:
+        raw_bom_path (Path, optional): file path of raw bill of materials workbook. Defaults
+            to data/raw/raw_boms.xlsx.
+
+    Returns:
+        DesignSpace: impacts of every option, keyed by subsystem
+    """
+    if raw_bom_path is None:
+        raw_bom_path = Path(__file__).parents[2].joinpath('data/raw/raw_boms.xlsx')
+    Extractor = TemplateModelExtractor()
+    Extractor.load_template_model(file_path=raw_bom_path)
+    Extractor.group_options()
+
+    subsystem_boms = dict(zip(SUBSYSTEMS, [
+        Extractor.all_str_bom,
+        Extractor.all_enc_o_bom,
+        Extractor.all_enc_t_bom,
+        Extractor.all_enc_r_bom,
+    ]))
+    options = {}
+    impacts = {}
+    replacements = {}
+    for subsystem, subsystem_bom in subsystem_boms.items():
+        options[subsystem] = [str(option) for option in pd.unique(subsystem_bom['Option'])]
+        impacts[subsystem], replacements[subsystem] = zip(*[
+            option_impacts(option_name, Extractor) for option_name in options[subsystem]
+        ])
+    return DesignSpace(
+        options=options,
+        option_impacts={
+            subsystem: np.stack([impacts_df.to_numpy() for impacts_df in subsystem_impacts])
+            for subsystem, subsystem_impacts in impacts.items()
+        },
+        impact_categories=list(impacts['Structure'][0].columns),
+        option_replacements={
+            subsystem: np.array(subsystem_replacements)
+            for subsystem, subsystem_replacements in replacements.items()
+        }
+    )
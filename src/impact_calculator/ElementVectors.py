@@ -0,0 +1,225 @@
+"""Definition of the element vectors holding the base arrays of a template model's impacts."""
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import src.impact_calculator.ImpactCalculator as ic
+import src.impact_calculator.TransportEngine as te
+import src.utils.background_data as bgd
+
+# life cycle stages driven by the bill of materials, in evaluation order
+ELEMENT_STAGES = ['product', 'transportation', 'end-of-life', 'construction', 'replacement']
+
+
+@dataclass
+class ElementVectors:
+    """Base arrays of the bill of materials driven life cycle stages of a template model.
+
+    Stages are evaluated with numpy broadcasting, so every parameter may carry leading sample
+    axes, e.g. samples x elements x modes distances, and the impacts follow with shape
+    samples x elements x impact categories. Operational energy does not depend on the bill of
+    materials and is not included.
+
+    Attr:
+        template_model_name (str): name of template model
+        element_index (pd.Index): element_index of every element
+        impact_categories (list): impact category names, in column order of impacts
+        tally_materials (pd.Series): Tally material of every element
+        building_materials (pd.Series): Building Material_name of every element
+        assemblies (pd.Series): Assembly of every element
+        product_impacts (np.ndarray): elements x impact categories A1-A3 impacts
+        end_of_life_impacts (np.ndarray): elements x impact categories C2-C4 impacts
+        tonnes (np.ndarray): mass of every element in tonnes
+        distances (np.ndarray): elements x modes array of distances in miles
+        emission_factors (np.ndarray): modes x impact categories emission factors per tkm
+        wastage (np.ndarray): construction wastage rate of every element
+        service_lives (np.ndarray): service life of every element in years
+        transport_engine (te.TransportEngine): engine evaluating the return factor rules
+        RSP (int): Reference Study Period
+    """
+    template_model_name: str
+    element_index: pd.Index
+    impact_categories: list
+    tally_materials: pd.Series
+    building_materials: pd.Series
+    assemblies: pd.Series
+    product_impacts: np.ndarray
+    end_of_life_impacts: np.ndarray
+    tonnes: np.ndarray
+    distances: np.ndarray
+    emission_factors: np.ndarray
+    wastage: np.ndarray
+    service_lives: np.ndarray
+    transport_engine: te.TransportEngine
+    RSP: int = ic.ReplacementImpactCalculator.RSP
+
+    @property
+    def transport_modes(self) -> list:
+        """Transport modes in column order of distances."""
+        return list(self.transport_engine.distance_columns)
+
+    def transportation_impacts(self, distances: np.ndarray = None,
+                               emission_factors: np.ndarray = None) -> np.ndarray:
+        """Calculate the A4 impacts of every element.
+
+        Args:
+            distances (np.ndarray, optional): [samples x] elements x modes distances in miles.
+                Defaults to the base distances.
+            emission_factors (np.ndarray, optional): [samples x] modes x impact categories
+                emission factors. Defaults to the base emission factors.
+
+        Returns:
+            np.ndarray: [samples x] elements x impact categories impacts
+        """
+        if distances is None:
+            distances = self.distances
+        if emission_factors is None:
+            emission_factors = self.emission_factors
+        tonne_kilometers = self.transport_engine.tonne_kilometers(
+            self.tally_materials,
+            self.tonnes,
+            distances
+        )
+        return np.matmul(tonne_kilometers, emission_factors)
+
+    def number_of_replacements(self, service_lives: np.ndarray = None,
+                               RSP: int = None) -> np.ndarray:
+        """Count the replacements of every element within the reference study period.
+
+        Args:
+            service_lives (np.ndarray, optional): [samples x] elements service lives in years.
+                Defaults to the base service lives.
+            RSP (int, optional): Reference Study Period. Defaults to the base RSP.
+
+        Returns:
+            np.ndarray: number of replacements in the shape of service_lives
+        """
+        if service_lives is None:
+            service_lives = self.service_lives
+        if RSP is None:
+            RSP = self.RSP
+        return ic.count_replacements(service_lives, RSP)
+
+    def construction_impacts(self, impacts: dict, wastage: np.ndarray = None) -> np.ndarray:
+        """Calculate the A5 impacts of every element from the impacts of its upstream stages.
+
+        Args:
+            impacts (dict): [samples x] elements x impact categories impacts of the product,
+                transportation and end-of-life stages
+            wastage (np.ndarray, optional): [samples x] elements construction wastage rates.
+                Defaults to the base wastage.
+
+        Returns:
+            np.ndarray: [samples x] elements x impact categories impacts
+        """
+        if wastage is None:
+            wastage = self.wastage
+        # upstream impacts are added in the order of the calculators' upstream_stages
+        return (
+            impacts['product'] + impacts['transportation'] + impacts['end-of-life']
+        ) * wastage[..., np.newaxis]
+
+    def replacement_impacts(self, impacts: dict, service_lives: np.ndarray = None,
+                            RSP: int = None) -> np.ndarray:
+        """Calculate the B2-B5 impacts of every element from the impacts of its upstream stages.
+
+        Args:
+            impacts (dict): [samples x] elements x impact categories impacts of the product,
+                transportation, construction and end-of-life stages
+            service_lives (np.ndarray, optional): [samples x] elements service lives in years.
+                Defaults to the base service lives.
+            RSP (int, optional): Reference Study Period. Defaults to the base RSP.
+
+        Returns:
+            np.ndarray: [samples x] elements x impact categories impacts
+        """
+        return (
+            impacts['product'] + impacts['transportation']
+            + impacts['construction'] + impacts['end-of-life']
+        ) * self.number_of_replacements(service_lives, RSP)[..., np.newaxis]
+
+    def stage_impacts(self, distances: np.ndarray = None, emission_factors: np.ndarray = None,
+                      wastage: np.ndarray = None, service_lives: np.ndarray = None,
+                      RSP: int = None) -> dict:
+        """Evaluate the impacts of every element driven life cycle stage.
+
+        Parameters that are not provided keep their base values. Parameters with leading
+        sample axes must share them.
+
+        Args:
+            distances (np.ndarray, optional): [samples x] elements x modes distances in miles
+            emission_factors (np.ndarray, optional): [samples x] modes x impact categories
+                emission factors per tkm
+            wastage (np.ndarray, optional): [samples x] elements construction wastage rates
+            service_lives (np.ndarray, optional): [samples x] elements service lives in years
+            RSP (int, optional): Reference Study Period
+
+        Returns:
+            dict: [samples x] elements x impact categories impacts, keyed by stage name
+        """
+        impacts = {
+            'product': self.product_impacts,
+            'transportation': self.transportation_impacts(distances, emission_factors),
+            'end-of-life': self.end_of_life_impacts,
+        }
+        impacts['construction'] = self.construction_impacts(impacts, wastage)
+        impacts['replacement'] = self.replacement_impacts(impacts, service_lives, RSP)
+        return impacts
+
+
+def load_element_vectors(template_model_name: str,
+                         bill_of_materials: pd.DataFrame = None) -> ElementVectors:
+    """Load the base arrays of a template model from the impact calculators.
+
+    Args:
+        template_model_name (str): name of template model
+        bill_of_materials (pd.DataFrame, optional): bill of materials of template model.
+            Read from the template model directory when not provided.
+
+    Returns:
+        ElementVectors: base arrays of the template model
+    """
+    if bill_of_materials is None:
+        bom_loader = ic.ImpactCalculator(template_model_name)
+        bom_loader.load_bill_of_materials()
+        bill_of_materials = bom_loader.bill_of_materials
+
+    product = ic.ProductImpactCalculator(
+        template_model_name,
+        bill_of_materials=bill_of_materials.copy()
+    )
+    product.calculate_impacts()
+    end_of_life = ic.EndOfLifeImpactCalculator(
+        template_model_name,
+        bill_of_materials=bill_of_materials.copy()
+    )
+    end_of_life.calculate_impacts()
+    transport_engine = ic.TransportationImpactCalculator(
+        template_model_name,
+        bill_of_materials=bill_of_materials
+    ).load_transport_engine()
+    impact_categories = list(product.impacts_map.keys())
+
+    wastage = bgd.load_background_dataset(
+        bgd.BACKGROUND_DATA_DIRECTORY.joinpath('a5_wastage.xlsx')
+    ).drop_duplicates('Building Material_name').set_index('Building Material_name')['wastage']
+    service_lives = bgd.load_background_dataset(
+        bgd.BACKGROUND_DATA_DIRECTORY.joinpath('b2-b5.xlsx')
+    ).drop_duplicates('Assembly').set_index('Assembly')['service_lives']
+
+    tally_materials = bill_of_materials['Tally material']
+    return ElementVectors(
+        template_model_name=template_model_name,
+        element_index=pd.Index(bill_of_materials['element_index']),
+        impact_categories=impact_categories,
+        tally_materials=tally_materials,
+        building_materials=bill_of_materials['Building Material_name'],
+        assemblies=bill_of_materials['Assembly'],
+        product_impacts=product.impacts[impact_categories].to_numpy(dtype=float),
+        end_of_life_impacts=end_of_life.impacts[impact_categories].to_numpy(dtype=float),
+        tonnes=bill_of_materials['Weight (kg)'].to_numpy(dtype=float) / 1000,
+        distances=transport_engine.element_distances(tally_materials),
+        emission_factors=transport_engine.emission_factors(),
+        wastage=bill_of_materials['Building Material_name'].map(wastage).to_numpy(dtype=float),
+        service_lives=bill_of_materials['Assembly'].map(service_lives).to_numpy(dtype=float),
+        transport_engine=transport_engine
+    )
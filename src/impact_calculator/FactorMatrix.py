@@ -0,0 +1,103 @@
+"""Definition of the dense material by impact category matrix of background impact factors."""
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import src.utils.background_data as bgd
+import src.utils.schema as sch
+
+
+@dataclass
+class FactorMatrix:
+    """Impact factors per kg of material, one row per Tally material.
+
+    The factors hold one extra row of NaN after the last material, so the code -1 that is
+    given to materials missing from the background data gathers NaN impacts, like a left merge.
+
+    Attr:
+        materials (pd.Index): Tally material names, in row order of factors
+        impact_categories (list): impact category names, in column order of factors
+        factors (np.ndarray): (materials + 1) x impact categories array of impact factors
+    """
+    materials: pd.Index
+    impact_categories: list
+    factors: np.ndarray
+
+    def material_codes(self, tally_materials: pd.Series) -> np.ndarray:
+        """Convert Tally material names into row positions of the factor matrix.
+
+        Args:
+            tally_materials (pd.Series): Tally material of every element
+
+        Returns:
+            np.ndarray: row position of every element, -1 for unknown materials
+        """
+        return sch.lookup_positions(self.materials, tally_materials)
+
+    def gather_impacts(self, bill_of_materials: pd.DataFrame) -> pd.DataFrame:
+        """Calculate impacts of every element with one indexed gather and one multiply.
+
+        Works on any bill of materials, including the concatenated bills of materials of many
+        template models.
+
+        Args:
+            bill_of_materials (pd.DataFrame): bill of materials with Tally material and
+                Weight (kg) columns
+
+        Returns:
+            pd.DataFrame: impacts of every element by impact category, on the bill of
+                materials index
+        """
+        material_codes = self.material_codes(bill_of_materials['Tally material'])
+        weights = bill_of_materials['Weight (kg)'].to_numpy(dtype=float)
+        return pd.DataFrame(
+            self.factors[material_codes] * weights[:, np.newaxis],
+            index=bill_of_materials.index,
+            columns=self.impact_categories
+        )
+
+
+def build_factor_matrix(background_dataset: pd.DataFrame, impacts_map: dict,
+                        factor_suffix: str) -> FactorMatrix:
+    """Build a factor matrix from a background dataset.
+
+    Args:
+        background_dataset (pd.DataFrame): background dataset with a Name_Tally Material column
+            and one factor column per impact category
+        impacts_map (dict): impact category names mapped to background dataset column prefixes
+        factor_suffix (str): suffix of factor columns, e.g. '_mfg'
+
+    Returns:
+        FactorMatrix: factor matrix of the background dataset
+    """
+    # duplicated materials would otherwise duplicate elements, the first entry is used
+    background_dataset = background_dataset.drop_duplicates('Name_Tally Material')
+    factor_columns = [column + factor_suffix for column in impacts_map.values()]
+    factors = background_dataset[factor_columns].to_numpy(dtype=float)
+    return FactorMatrix(
+        materials=pd.Index(background_dataset['Name_Tally Material']),
+        impact_categories=list(impacts_map.keys()),
+        factors=np.vstack([factors, np.full((1, len(factor_columns)), np.nan)])
+    )
+
+
+def load_factor_matrix(file_path: Path, impacts_map: dict, factor_suffix: str) -> FactorMatrix:
+    """Load the factor matrix of a background workbook, built once per process.
+
+    Args:
+        file_path (Path): file path of background workbook
+        impacts_map (dict): impact category names mapped to background dataset column prefixes
+        factor_suffix (str): suffix of factor columns, e.g. '_mfg'
+
+    Returns:
+        FactorMatrix: shared factor matrix of the background workbook
+    """
+    return bgd.registry.derive(
+        file_path,
+        f'factor_matrix{factor_suffix}',
+        lambda background_dataset: build_factor_matrix(
+            background_dataset,
+            impacts_map,
+            factor_suffix
+        )
+    )
@@ -2,19 +2,55 @@
 from dataclasses import dataclass, field
 from abc import abstractmethod
 from pathlib import Path
+from typing import ClassVar
+import numpy as np
 import pandas as pd
+from src.impact_calculator.FactorMatrix import load_factor_matrix
+import src.impact_calculator.TransportEngine as te
+import src.utils.background_data as bgd
 import src.utils.general as gen
+from src.utils.profiling import profiled
+import src.utils.schema as sch
+
+
+def count_replacements(service_lives, RSP):
+    """Count the replacements of elements within the Reference Study Period.
+
+    Service lives and RSP broadcast against each other, e.g. an RSPs x 1 array against an
+    elements array gives an RSPs x elements array.
+
+    Args:
+        service_lives (np.ndarray | pd.Series): service lives in years
+        RSP (int | np.ndarray): Reference Study Period
+
+    Returns:
+        np.ndarray: number of replacements, NaN for unknown service lives
+    """
+    number_of_replacements = np.floor_divide(RSP, service_lives)
+    # an element lasting exactly the reference study period is not replaced, but 60 // 60 = 1
+    return np.where(service_lives == RSP, 0, number_of_replacements)
 
 
 @dataclass
 class ImpactCalculator:
-    """Abstract class for impact calculators."""
+    """Abstract class for impact calculators.
+
+    Attr:
+        upstream_impacts (dict): impacts of upstream life cycle stages keyed by stage name,
+            e.g. 'product'. Stages that are missing are read from the template model impacts.
+        upstream_stages (list): life cycle stages whose impacts this calculator builds on
+        background_datasets (list): background workbooks this calculator reads, relative to
+            references/background_data
+    """
     template_model_name: str
     bill_of_materials: pd.DataFrame = field(default=None)
     background_dataset: pd.DataFrame = field(default=None)
     impacts: pd.DataFrame = field(default=None)
+    upstream_impacts: dict = field(default=None)
     impacts_map: dict = field(init=False)
     lcs_map: dict = field(init=False)
+    upstream_stages: ClassVar[list] = []
+    background_datasets: ClassVar[list] = []
 
     def __post_init__(self):
         self.impacts_map = {
@@ -36,6 +72,7 @@ class ImpactCalculator:
             'eol': 'C2-C4: End-of-life'
         }
 
+    @profiled()
     def load_bill_of_materials(self) -> None:
         """_summary_
 
@@ -54,22 +91,71 @@ class ImpactCalculator:
         assert len(bom_file_path) == 1, 'There should only be one bill of materials \
 in bill of materials directory'
         # read bom file
-        bom_df = gen.read_csv(bom_file_path[0])
+        bom_df = gen.read_csv(bom_file_path[0], apply_schema=True)
         self.bill_of_materials = bom_df
 
+    @profiled()
     def load_background_dataset(self, file_path: Path) -> None:
         """_summary_
 
         Args:
             file_path (Path): _description_
         """
-        background_df = gen.read_excel(file_path)
+        background_df = bgd.load_background_dataset(file_path)
         self.background_dataset = background_df
 
+    @profiled()
+    def load_upstream_impacts(self) -> dict:
+        """Collect the impacts of the upstream life cycle stages of this calculator.
+
+        Impacts handed over in upstream_impacts are used as they are, any other upstream stage
+        is read from the impacts csv previously written for the template model.
+
+        Returns:
+            dict: upstream impacts indexed by element_index, keyed by life cycle stage
+        """
+        main_directory = Path(__file__).parents[2]
+        impact_directory = main_directory.joinpath(
+            f'data/template_models/{self.template_model_name}/impacts'
+        )
+        upstream = {}
+        for stage in self.upstream_stages:
+            if self.upstream_impacts is not None and stage in self.upstream_impacts:
+                upstream_df = self.upstream_impacts[stage]
+            else:
+                # only the impact columns are used, so the categorical columns are left as read.
+                # Floats are read back exactly, so impacts built on the csv of an upstream stage
+                # match impacts built on the frame it was written from
+                upstream_df = gen.read_csv(
+                    impact_directory.joinpath(f'{self.template_model_name}_{stage}_impacts.csv'),
+                    float_precision='round_trip'
+                )
+            upstream[stage] = upstream_df.set_index('element_index')
+        return upstream
+
+    def sum_upstream_impacts(self) -> pd.DataFrame:
+        """Add up the impacts of all upstream life cycle stages, element by element.
+
+        Returns:
+            pd.DataFrame: summed impact categories indexed by element_index
+        """
+        upstream = self.load_upstream_impacts()
+        impact_names = list(self.impacts_map.keys())
+        summed_impacts = None
+        for stage in self.upstream_stages:
+            stage_impacts = upstream[stage][impact_names]
+            summed_impacts = stage_impacts if summed_impacts is None else summed_impacts + stage_impacts
+        return summed_impacts
+
     @abstractmethod
     def calculate_impacts(self):
         """Abstract method for calculating impacts."""
 
+    def apply_schema(self) -> None:
+        """Convert the categorical columns of the impacts to the category sets of the schema."""
+        self.impacts = sch.apply_schema(self.impacts)
+
+    @profiled()
     def write_impacts_to_csv(self, file_path: Path, impacts_name: str) -> None:
         """_summary_
 
@@ -88,50 +174,54 @@ in bill of materials directory'
 @dataclass
 class ProductImpactCalculator(ImpactCalculator):
     """Calculation of product impacts from bill of materials."""
+    background_datasets: ClassVar[list] = ['a1-a3.xlsx']
+
     def calculate_impacts(self):
 
         main_directory = Path(__file__).parents[2]
         product_impact_data_file = main_directory.joinpath('references/background_data/a1-a3.xlsx')
         self.load_background_dataset(product_impact_data_file)
-
-        self.impacts = pd.merge(
-            self.bill_of_materials,
-            self.background_dataset[['Name_Tally Material'] + [impact_cat + '_mfg' for impact_cat in self.impacts_map.values()]],
-            left_on='Tally material',
-            right_on='Name_Tally Material',
-            how='left'
-        ).drop(
-            "Name_Tally Material",
+        factor_matrix = load_factor_matrix(product_impact_data_file, self.impacts_map, '_mfg')
+
+        self.impacts = pd.concat(
+            [
+                self.bill_of_materials.assign(
+                    life_cycle_stage=self.lcs_map.get('product')
+                ),
+                factor_matrix.gather_impacts(self.bill_of_materials)
+            ],
             axis=1
-        ).assign(
-            life_cycle_stage=self.lcs_map.get('product')
         )
 
-        for impact_name, impact_df_name in self.impacts_map.items():
-            self.impacts[impact_name] = \
-                self.impacts[impact_df_name + '_mfg'] * self.impacts['Weight (kg)']
-            self.impacts.drop(impact_df_name + '_mfg', axis=1, inplace=True)
-
 
 @dataclass
 class TransportationImpactCalculator(ImpactCalculator):
-    """Calculation of transportation impacts from bill of materials."""
+    """Calculation of transportation impacts from bill of materials.
+
+    Attr:
+        distance_columns (dict): a4_distances column of every transport mode to include
+    """
     background_distances: pd.DataFrame = field(default=None)
+    background_datasets: ClassVar[list] = ['a4_emissions.xlsx', 'a4_distances.xlsx']
+    distance_columns: ClassVar[dict] = te.TALLY_DISTANCE_COLUMNS
 
+    @profiled()
     def load_background_distances(self, file_path: Path) -> None:
         """_summary_
 
         Args:
             file_path (Path): _description_
         """
-        background_df = gen.read_excel(file_path)
+        background_df = bgd.load_background_dataset(file_path)
         self.background_distances = background_df
 
-    def calculate_impacts(self):
-        # emission = mass of product * emission factor * distance * return factor
-        # currently only does truck transport, but this can be fixed in the future.
-        # It is a straightforward calc, it just requires a lot of complicated
-        # combinations that are not worth the time for current 0's.
+    @profiled()
+    def load_transport_engine(self) -> te.TransportEngine:
+        """Load the transport engine over the modes in distance_columns.
+
+        Returns:
+            te.TransportEngine: transport engine of the background datasets
+        """
         main_directory = Path(__file__).parents[2]
         transporation_emissions_file = main_directory.joinpath(
             'references/background_data/a4_emissions.xlsx'
@@ -142,50 +232,32 @@ class TransportationImpactCalculator(ImpactCalculator):
 
         self.load_background_dataset(transporation_emissions_file)
         self.load_background_distances(transportation_distances_file)
-        mi_to_km_conversion = 1.60934
-
-        truck_emissions_name = 'Transport, combination truck, average fuel mix'
-        truck_distance_column = 'Tally dist_truck'
-
-        trans_emissions = self.background_dataset.set_index('Product system name')
-        trans_distances = self.background_distances[
-            ['Name_Tally Material', truck_distance_column]
-        ]
-        # emission = mass of product * emission factor * distance * return factor
-        temp_df = self.bill_of_materials.merge(
-            trans_distances,
-            left_on='Tally material',
-            right_on='Name_Tally Material',
-            how='left'
-        ).assign(
-            life_cycle_stage=self.lcs_map.get('trans')
+
+        return te.TransportEngine(
+            emissions=self.background_dataset,
+            distances=self.background_distances,
+            impacts_map=self.impacts_map,
+            distance_columns=self.distance_columns
         )
 
-        for name, col_name in self.impacts_map.items():
-            # emission = mass of product * emission factor * distance
-            temp_df[name] = (
-                (temp_df['Weight (kg)'] / 1000)
-                * trans_emissions.loc[truck_emissions_name, col_name]
-                * (temp_df[truck_distance_column] * mi_to_km_conversion)
-            )
-
-            # if distance is LESS THAN!! than 500 mi, then return factor = 1.5
-            temp_df.loc[temp_df[truck_distance_column] < 500, name] = (
-                1.5
-                * (temp_df['Weight (kg)'] / 1000)
-                * trans_emissions.loc[truck_emissions_name, col_name]
-                * (temp_df[truck_distance_column] * mi_to_km_conversion)
-            )
-            
-            ## TODO return factor of 2 for concrete values
-
-        temp_df = temp_df.drop(
-            columns=[
-                'Tally dist_truck',
-                "Name_Tally Material",
-            ]
+    def calculate_transportation_impacts(self) -> pd.DataFrame:
+        """Calculate transportation impacts of every element over the modes in distance_columns.
+
+        Returns:
+            pd.DataFrame: impacts of every element by impact category
+        """
+        return self.load_transport_engine().calculate(self.bill_of_materials)
+
+    def calculate_impacts(self):
+        self.impacts = pd.concat(
+            [
+                self.bill_of_materials.assign(
+                    life_cycle_stage=self.lcs_map.get('trans')
+                ),
+                self.calculate_transportation_impacts()
+            ],
+            axis=1
         )
-        self.impacts = temp_df
 
 
 @dataclass
@@ -193,29 +265,17 @@ class ConstructionImpactCalculator(ImpactCalculator):
     """Calculation of construction impacts from WASTAGE ONLY. No construction activities.
 
     """
+    upstream_stages: ClassVar[list] = ['product', 'transportation', 'end-of-life']
+    background_datasets: ClassVar[list] = ['a5_wastage.xlsx']
+
     def calculate_impacts(self):
 
-        model_name = self.template_model_name
         main_directory = Path(__file__).parents[2]
         construction_impact_data_file = main_directory.joinpath(
             'references/background_data/a5_wastage.xlsx'
         )
         self.load_background_dataset(construction_impact_data_file)
 
-        a1a3_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_product_impacts.csv'
-        )
-        a4_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_transportation_impacts.csv'
-        )
-        c1_c4_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_end-of-life_impacts.csv'
-        )
-
-        a1a3_impact_data = gen.read_csv(a1a3_impact_data_file).set_index('element_index')
-        a4_impact_data = gen.read_csv(a4_impact_data_file).set_index('element_index')
-        c1c4_impact_data = gen.read_csv(c1_c4_impact_data_file).set_index('element_index')
-
         temp_replacement_df = self.bill_of_materials.copy()
         temp_replacement_df = temp_replacement_df.set_index('Building Material_name')
         temp_replacement_df = temp_replacement_df.merge(
@@ -227,11 +287,7 @@ class ConstructionImpactCalculator(ImpactCalculator):
             life_cycle_stage=self.lcs_map.get('constr')
         ).set_index('element_index')
 
-        a5_impacts = (
-            a1a3_impact_data[list(self.impacts_map.keys())]
-            + a4_impact_data[list(self.impacts_map.keys())]
-            + c1c4_impact_data[list(self.impacts_map.keys())]
-        ).mul(temp_replacement_df['wastage'], axis=0)
+        a5_impacts = self.sum_upstream_impacts().mul(temp_replacement_df['wastage'], axis=0)
         self.impacts = pd.merge(
             left=temp_replacement_df,
             right=a5_impacts,
@@ -253,34 +309,17 @@ class ReplacementImpactCalculator(ImpactCalculator):
         RSP (int): Reference Study Period
     """
     RSP: int = 60
+    upstream_stages: ClassVar[list] = ['product', 'transportation', 'construction', 'end-of-life']
+    background_datasets: ClassVar[list] = ['b2-b5.xlsx']
 
     def calculate_impacts(self):
 
-        model_name = self.template_model_name
         main_directory = Path(__file__).parents[2]
         replacement_impact_data_file = main_directory.joinpath(
             'references/background_data/b2-b5.xlsx'
         )
         self.load_background_dataset(replacement_impact_data_file)
 
-        a1a3_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_product_impacts.csv'
-        )
-        a4_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_transportation_impacts.csv'
-        )
-        a5_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_construction_impacts.csv'
-        )
-        c1_c4_impact_data_file = main_directory.joinpath(
-            f'data/template_models/{model_name}/impacts/{model_name}_end-of-life_impacts.csv'
-        )
-
-        a1a3_impact_data = gen.read_csv(a1a3_impact_data_file).set_index('element_index')
-        a4_impact_data = gen.read_csv(a4_impact_data_file).set_index('element_index')
-        a5_impact_data = gen.read_csv(a5_impact_data_file).set_index('element_index')
-        c1c4_impact_data = gen.read_csv(c1_c4_impact_data_file).set_index('element_index')
-
         temp_replacement_df = self.bill_of_materials.copy()
         temp_replacement_df = temp_replacement_df.set_index('Assembly')
         temp_replacement_df = temp_replacement_df.merge(
@@ -302,12 +341,10 @@ class ReplacementImpactCalculator(ImpactCalculator):
             'number_of_replacements'
         ] = 0
 
-        b4_impacts = (
-            a1a3_impact_data[list(self.impacts_map.keys())]
-            + a4_impact_data[list(self.impacts_map.keys())]
-            + a5_impact_data[list(self.impacts_map.keys())]
-            + c1c4_impact_data[list(self.impacts_map.keys())]
-        ).mul(temp_replacement_df['number_of_replacements'], axis=0)
+        b4_impacts = self.sum_upstream_impacts().mul(
+            temp_replacement_df['number_of_replacements'],
+            axis=0
+        )
         self.impacts = pd.merge(
             left=temp_replacement_df,
             right=b4_impacts,
@@ -321,6 +358,53 @@ class ReplacementImpactCalculator(ImpactCalculator):
             ]
         ).reset_index()
 
+    def sweep_impacts(self, RSPs: list) -> pd.DataFrame:
+        """Calculate the replacement impacts of every element for several Reference Study Periods.
+
+        All RSPs are evaluated in one broadcast RSPs x elements x impact categories array
+        instead of one calculation per RSP.
+
+        Args:
+            RSPs (list): Reference Study Periods to evaluate, e.g. range(30, 101)
+
+        Returns:
+            pd.DataFrame: long format impacts with one row per RSP, element and impact category
+                and columns element_index, Assembly, service_lives, RSP,
+                number_of_replacements, impact_category and impact
+        """
+        # service lives of b2-b5.xlsx, or of the workbook a scenario builder replaces it with
+        self.load_background_dataset(
+            bgd.BACKGROUND_DATA_DIRECTORY.joinpath(self.background_datasets[0])
+        )
+        elements = self.bill_of_materials.set_index('Assembly').merge(
+            self.background_dataset[['Assembly', 'service_lives']],
+            left_index=True,
+            right_on='Assembly',
+            how='left',
+        ).set_index('element_index')
+        impact_names = list(self.impacts_map.keys())
+        upstream_impacts = self.sum_upstream_impacts().reindex(elements.index)[impact_names]
+
+        RSPs = np.asarray(RSPs)
+        service_lives = elements['service_lives'].to_numpy(dtype=float)
+        number_of_replacements = count_replacements(
+            service_lives[np.newaxis, :],
+            RSPs[:, np.newaxis]
+        )
+        impacts = number_of_replacements[:, :, np.newaxis] \
+            * upstream_impacts.to_numpy(dtype=float)[np.newaxis, :, :]
+
+        n_rsps, n_elements, n_categories = impacts.shape
+        return pd.DataFrame({
+            'element_index': np.tile(np.repeat(elements.index, n_categories), n_rsps),
+            'Assembly': np.tile(np.repeat(elements['Assembly'], n_categories), n_rsps),
+            'service_lives': np.tile(np.repeat(service_lives, n_categories), n_rsps),
+            'RSP': np.repeat(RSPs, n_elements * n_categories),
+            'number_of_replacements': np.repeat(number_of_replacements.ravel(), n_categories),
+            'impact_category': np.tile(impact_names, n_rsps * n_elements),
+            'impact': impacts.ravel(),
+        })
+
 
 @dataclass
 class OperationalImpactCalculator(ImpactCalculator):
@@ -375,30 +459,25 @@ class OperationalImpactCalculator(ImpactCalculator):
 @dataclass
 class EndOfLifeImpactCalculator(ImpactCalculator):
     """Calculation of end-of-life impacts from bill of materials."""
+    background_datasets: ClassVar[list] = ['c2-c4.xlsx']
+
     def calculate_impacts(self):
 
         main_directory = Path(__file__).parents[2]
         eol_impact_data_file = main_directory.joinpath('references/background_data/c2-c4.xlsx')
         self.load_background_dataset(eol_impact_data_file)
-
-        self.impacts = pd.merge(
-            self.bill_of_materials,
-            self.background_dataset[['Name_Tally Material'] + [impact_cat + '_eol' for impact_cat in self.impacts_map.values()]],
-            left_on='Tally material',
-            right_on='Name_Tally Material',
-            how='left'
-        ).drop(
-            "Name_Tally Material",
+        factor_matrix = load_factor_matrix(eol_impact_data_file, self.impacts_map, '_eol')
+
+        self.impacts = pd.concat(
+            [
+                self.bill_of_materials.assign(
+                    life_cycle_stage=self.lcs_map.get('eol')
+                ),
+                factor_matrix.gather_impacts(self.bill_of_materials)
+            ],
             axis=1
-        ).assign(
-            life_cycle_stage=self.lcs_map.get('eol')
         )
 
-        for impact_name, impact_df_name in self.impacts_map.items():
-            self.impacts[impact_name] = \
-                self.impacts[impact_df_name + '_eol'] * self.impacts['Weight (kg)']
-            self.impacts.drop(impact_df_name + '_eol', axis=1, inplace=True)
-
 
 @dataclass
 class ModuleDImpactCalculator(ImpactCalculator):
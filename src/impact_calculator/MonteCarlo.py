@@ -0,0 +1,223 @@
+"""Definition of the batched Monte Carlo simulation of template model impacts.
+
+Uncertain parameters are sampled as multipliers of their base values and all samples of a
+chunk are evaluated at once as a samples x elements x impact categories array. Every parameter
+draws from its own random stream in sample order, so chunks only bound memory and the samples
+are the same for any chunk size.
+"""
+from dataclasses import dataclass, field
+import zlib
+import numpy as np
+import pandas as pd
+from src.impact_calculator.ElementVectors import ELEMENT_STAGES, ElementVectors
+
+
+@dataclass
+class ParameterUncertainty:
+    """Distribution of the multiplier of an uncertain parameter, centred on 1.
+
+    Attr:
+        distribution (str): 'lognormal', 'uniform' or 'triangular'
+        spread (float): standard deviation of the log for 'lognormal', half width for
+            'uniform' and 'triangular'
+    """
+    distribution: str
+    spread: float
+
+    def __post_init__(self):
+        if self.distribution not in ['lognormal', 'uniform', 'triangular']:
+            raise ValueError(f'Unknown distribution {self.distribution}')
+        if self.distribution != 'lognormal' and not 0 <= self.spread < 1:
+            raise ValueError(
+                f'Spread of a {self.distribution} multiplier must be in [0, 1), '
+                f'got {self.spread}'
+            )
+
+    def sample(self, rng: np.random.Generator, size: tuple) -> np.ndarray:
+        """Draw multipliers.
+
+        Args:
+            rng (np.random.Generator): random number generator
+            size (tuple): shape of the drawn multipliers
+
+        Returns:
+            np.ndarray: positive multipliers
+        """
+        if self.distribution == 'lognormal':
+            return rng.lognormal(mean=0, sigma=self.spread, size=size)
+        if self.distribution == 'uniform':
+            return rng.uniform(1 - self.spread, 1 + self.spread, size=size)
+        if self.spread == 0:
+            return np.ones(size)
+        return rng.triangular(1 - self.spread, 1, 1 + self.spread, size=size)
+
+
+# multipliers are drawn per Tally material and mode for distances, per mode for emission factors,
+# per Building Material_name for wastage and per Assembly for service lives
+DEFAULT_UNCERTAINTY = {
+    'distances': ParameterUncertainty('lognormal', 0.3),
+    'emission_factors': ParameterUncertainty('lognormal', 0.1),
+    'wastage': ParameterUncertainty('triangular', 0.5),
+    'service_lives': ParameterUncertainty('lognormal', 0.2),
+}
+
+
+@dataclass
+class MonteCarloSimulator:
+    """Monte Carlo simulation of the element driven life cycle stages of template models.
+
+    Samples are evaluated in chunks, so memory is bounded by
+    chunk_size x elements x impact categories regardless of n_samples. Only the template model
+    totals of every sample are kept to compute the summary statistics.
+
+    Attr:
+        n_samples (int): number of samples per template model
+        chunk_size (int): number of samples evaluated at once
+        seed (int): seed of the random number generators, None for fresh entropy. Every
+            template model draws from its own streams derived from the seed and its name, so
+            results only depend on the seed, not on chunk_size or the order template models
+            are run in.
+        percentiles (list): percentiles reported in the summary
+        uncertainty (dict): ParameterUncertainty of every sampled parameter, see
+            DEFAULT_UNCERTAINTY. Parameters that are left out keep their base values.
+    """
+    n_samples: int = 1000
+    chunk_size: int = 1000
+    seed: int = None
+    percentiles: list = field(default_factory=lambda: [5, 50, 95])
+    uncertainty: dict = field(default_factory=lambda: dict(DEFAULT_UNCERTAINTY))
+
+    def __post_init__(self):
+        unknown_parameters = set(self.uncertainty) - set(DEFAULT_UNCERTAINTY)
+        if unknown_parameters:
+            raise ValueError(f'Unknown uncertain parameters {sorted(unknown_parameters)}')
+
+    def random_generators(self, template_model_name: str) -> dict:
+        """Create the random number generator of every uncertain parameter of a template model.
+
+        Streams are spawned for every parameter of DEFAULT_UNCERTAINTY, so leaving a parameter
+        out does not change the samples of the others.
+
+        Args:
+            template_model_name (str): name of template model
+
+        Returns:
+            dict: np.random.Generator keyed by parameter name
+        """
+        if self.seed is None:
+            seed_sequence = np.random.SeedSequence()
+        else:
+            seed_sequence = np.random.SeedSequence(
+                [self.seed, zlib.crc32(template_model_name.encode())]
+            )
+        return {
+            parameter: np.random.default_rng(parameter_seed_sequence)
+            for parameter, parameter_seed_sequence in zip(
+                DEFAULT_UNCERTAINTY,
+                seed_sequence.spawn(len(DEFAULT_UNCERTAINTY))
+            )
+        }
+
+    def _grouped_multipliers(self, parameter: str, rngs: dict, n_samples: int,
+                             groups: pd.Series, trailing_shape: tuple = ()) -> np.ndarray:
+        """Draw multipliers per group and spread them over the elements of every group."""
+        group_codes, group_names = pd.factorize(groups, use_na_sentinel=False)
+        multipliers = self.uncertainty[parameter].sample(
+            rngs[parameter],
+            (n_samples, len(group_names)) + trailing_shape
+        )
+        return multipliers[:, group_codes]
+
+    def sample_parameters(self, vectors: ElementVectors, rngs: dict, n_samples: int) -> dict:
+        """Draw the uncertain parameters of one chunk of samples.
+
+        Multipliers are drawn with a leading samples axis, so consecutive chunks continue the
+        stream of every parameter where the previous chunk left it.
+
+        Args:
+            vectors (ElementVectors): base arrays of template model
+            rngs (dict): random number generator of every parameter, see random_generators
+            n_samples (int): number of samples to draw
+
+        Returns:
+            dict: sampled parameters with a leading samples axis, keyed by the parameter names
+                of ElementVectors.stage_impacts
+        """
+        parameters = {}
+        if 'distances' in self.uncertainty:
+            parameters['distances'] = vectors.distances * self._grouped_multipliers(
+                'distances', rngs, n_samples, vectors.tally_materials,
+                (len(vectors.transport_modes),)
+            )
+        if 'emission_factors' in self.uncertainty:
+            parameters['emission_factors'] = vectors.emission_factors * self.uncertainty[
+                'emission_factors'
+            ].sample(rngs['emission_factors'], (n_samples, len(vectors.transport_modes), 1))
+        if 'wastage' in self.uncertainty:
+            parameters['wastage'] = vectors.wastage * self._grouped_multipliers(
+                'wastage', rngs, n_samples, vectors.building_materials
+            )
+        if 'service_lives' in self.uncertainty:
+            parameters['service_lives'] = vectors.service_lives * self._grouped_multipliers(
+                'service_lives', rngs, n_samples, vectors.assemblies
+            )
+        return parameters
+
+    def simulate(self, vectors: ElementVectors) -> np.ndarray:
+        """Simulate the template model totals of every sample.
+
+        Args:
+            vectors (ElementVectors): base arrays of template model
+
+        Returns:
+            np.ndarray: samples x stages x impact categories template model totals, with the
+                stages of ELEMENT_STAGES. Elements with unknown materials are skipped.
+        """
+        rngs = self.random_generators(vectors.template_model_name)
+        totals = np.empty((self.n_samples, len(ELEMENT_STAGES), len(vectors.impact_categories)))
+        for chunk_start in range(0, self.n_samples, self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, self.n_samples)
+            stage_impacts = vectors.stage_impacts(
+                **self.sample_parameters(vectors, rngs, chunk_stop - chunk_start)
+            )
+            for stage_position, stage in enumerate(ELEMENT_STAGES):
+                # stages without sampled parameters broadcast over the samples axis
+                totals[chunk_start:chunk_stop, stage_position] = np.nansum(
+                    stage_impacts[stage],
+                    axis=-2
+                )
+        return totals
+
+    def summarize(self, vectors: ElementVectors) -> pd.DataFrame:
+        """Simulate a template model and summarize the distribution of its totals.
+
+        Args:
+            vectors (ElementVectors): base arrays of template model
+
+        Returns:
+            pd.DataFrame: mean, standard deviation and percentiles of every life cycle stage,
+                and of their sum as stage 'total', by impact category
+        """
+        totals = self.simulate(vectors)
+        totals = np.concatenate([totals, totals.sum(axis=1, keepdims=True)], axis=1)
+        stages = ELEMENT_STAGES + ['total']
+
+        statistics = {
+            'mean': totals.mean(axis=0),
+            'std': totals.std(axis=0, ddof=1) if self.n_samples > 1 else np.zeros(totals.shape[1:]),
+        }
+        for percentile, values in zip(
+            self.percentiles,
+            np.percentile(totals, self.percentiles, axis=0)
+        ):
+            statistics[f'p{percentile:g}'] = values
+
+        summary = pd.DataFrame({
+            'template_model': vectors.template_model_name,
+            'life_cycle_stage': np.repeat(stages, len(vectors.impact_categories)),
+            'impact_category': np.tile(vectors.impact_categories, len(stages)),
+        })
+        for name, values in statistics.items():
+            summary[name] = values.ravel()
+        summary['samples'] = self.n_samples
+        return summary
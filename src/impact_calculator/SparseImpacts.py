@@ -0,0 +1,196 @@
+"""Definition of the normalized, sparse representation of element impacts.
+
+Every stage impacts frame repeats the bill of materials metadata of its elements next to the
+impact categories, and many of the impacts are 0 or NaN: operational energy is a single row,
+and most materials have no rail or water transport. The sparse representation stores the
+metadata of every element once, and the impacts as a long (element, life cycle stage, impact
+category) -> value table holding only the nonzero values.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.query.ImpactCubes import IMPACT_CATEGORIES
+import src.utils.schema as sch
+
+# columns identifying impacts of the same element, besides the impact category
+VALUE_KEY_COLUMNS = ['life_cycle_stage', 'scenario']
+
+
+@dataclass
+class SparseImpacts:
+    """Element metadata stored once, and the nonzero impacts of every element.
+
+    NaN impacts are dropped along with zeros, as every aggregation of impacts adds them up as 0.
+
+    Attr:
+        elements (pd.DataFrame): metadata of every element, e.g. bill of materials columns,
+            with an element_id column numbering the elements
+        values (pd.DataFrame): columns element_id, VALUE_KEY_COLUMNS present in the impacts,
+            impact_category and value, one row per nonzero impact
+    """
+    elements: pd.DataFrame
+    values: pd.DataFrame
+
+    @classmethod
+    def from_impacts(cls, impacts: list) -> 'SparseImpacts':
+        """Normalize the impacts frames written by the calculators of a template model.
+
+        Rows of different frames with the same metadata are the same element, so an element
+        in every life cycle stage is stored once. Rows with metadata of their own, e.g. the
+        operational energy row, are elements of their own.
+
+        Args:
+            impacts (list): impacts DataFrames of the life cycle stages, e.g. the values of
+                the results of StageGraph.run
+
+        Returns:
+            SparseImpacts: elements and nonzero impacts of the frames
+        """
+        stacked = pd.concat(impacts, ignore_index=True)
+        key_columns = [column for column in VALUE_KEY_COLUMNS if column in stacked.columns]
+        metadata_columns = [
+            column for column in stacked.columns
+            if column not in key_columns and column not in IMPACT_CATEGORIES
+        ]
+        element_ids = stacked.groupby(
+            metadata_columns, dropna=False, sort=False, observed=True
+        ).ngroup().to_numpy(dtype=np.int32)
+
+        elements = stacked.loc[~pd.Series(element_ids).duplicated().to_numpy(), metadata_columns]
+        elements.insert(0, 'element_id', element_ids[elements.index])
+
+        # placeholder stages, e.g. module D, have no impact columns
+        impact_values = stacked.reindex(columns=IMPACT_CATEGORIES).to_numpy(dtype=float)
+        rows, categories = np.nonzero(np.nan_to_num(impact_values))
+        values = pd.DataFrame({'element_id': element_ids[rows]})
+        for column in key_columns:
+            values[column] = stacked[column].iloc[rows].reset_index(drop=True)
+        values['impact_category'] = pd.Categorical.from_codes(categories, IMPACT_CATEGORIES)
+        values['value'] = impact_values[rows, categories]
+        return cls(elements.reset_index(drop=True), values)
+
+    @classmethod
+    def concat(cls, template_model_impacts: dict) -> 'SparseImpacts':
+        """Combine the sparse impacts of several template models.
+
+        Element ids are renumbered to stay unique, and the template model of every element is
+        added to its metadata.
+
+        Args:
+            template_model_impacts (dict): SparseImpacts of every template model, keyed by
+                template model name
+
+        Returns:
+            SparseImpacts: elements and nonzero impacts of every template model
+        """
+        elements_to_combine = []
+        values_to_combine = []
+        first_element_id = 0
+        for template_model, sparse_impacts in template_model_impacts.items():
+            elements = sparse_impacts.elements.assign(
+                element_id=sparse_impacts.elements['element_id'] + first_element_id,
+                template_model=template_model
+            )
+            values = sparse_impacts.values.assign(
+                element_id=sparse_impacts.values['element_id'] + first_element_id
+            )
+            elements_to_combine.append(elements)
+            values_to_combine.append(values)
+            first_element_id += len(elements)
+        values = sch.apply_schema(pd.concat(values_to_combine, ignore_index=True))
+        values['impact_category'] = values['impact_category'].astype(
+            pd.CategoricalDtype(IMPACT_CATEGORIES)
+        )
+        return cls(
+            sch.apply_schema(pd.concat(elements_to_combine, ignore_index=True)),
+            values
+        )
+
+    @staticmethod
+    def paths(directory: Path, name: str) -> tuple:
+        """Find the elements and values file paths of sparse impacts.
+
+        Args:
+            directory (Path): directory holding the sparse impacts
+            name (str): name of sparse impacts, e.g. 'STR1_ENCO1_ENCT1_ENCR1_impacts'
+
+        Returns:
+            tuple: file path of elements parquet, file path of values parquet
+        """
+        return (
+            directory.joinpath(f'{name}_elements.parquet'),
+            directory.joinpath(f'{name}_values.parquet'),
+        )
+
+    def write(self, directory: Path, name: str) -> None:
+        """Write elements and values to parquet, replacing each file only once it is written.
+
+        Args:
+            directory (Path): directory to write the sparse impacts to
+            name (str): name of sparse impacts, e.g. 'STR1_ENCO1_ENCT1_ENCR1_impacts'
+        """
+        # pyarrow is imported on first use, as for the impact cubes
+        import pyarrow.parquet as pq
+        from src.combine.PartitionedStore import to_table
+
+        directory.mkdir(parents=True, exist_ok=True)
+        for df, file_path in zip([self.elements, self.values], self.paths(directory, name)):
+            temp_path = file_path.with_name(f'{file_path.name}.tmp')
+            pq.write_table(to_table(df), temp_path)
+            temp_path.replace(file_path)
+
+    @classmethod
+    def read(cls, directory: Path, name: str) -> 'SparseImpacts':
+        """Read sparse impacts written by SparseImpacts.write.
+
+        Args:
+            directory (Path): directory holding the sparse impacts
+            name (str): name of sparse impacts, e.g. 'STR1_ENCO1_ENCT1_ENCR1_impacts'
+
+        Returns:
+            SparseImpacts: elements and nonzero impacts, None if they have not been written
+        """
+        import pyarrow.parquet as pq
+
+        elements_path, values_path = cls.paths(directory, name)
+        if not elements_path.exists() or not values_path.exists():
+            return None
+        return cls(
+            pq.read_table(elements_path).to_pandas(),
+            pq.read_table(values_path).to_pandas()
+        )
+
+    def totals(self, by: list) -> pd.DataFrame:
+        """Add up the impacts by element metadata and value key columns.
+
+        Args:
+            by (list): columns of elements or values to group by, e.g.
+                ['template_model', 'life_cycle_stage']
+
+        Returns:
+            pd.DataFrame: impact categories indexed by the by columns, 0 for missing impacts
+        """
+        element_columns = [column for column in by if column not in self.values.columns]
+        values = self.values.merge(
+            self.elements[['element_id'] + element_columns],
+            on='element_id',
+            how='left'
+        )
+        return values.groupby(
+            by + ['impact_category'], observed=True
+        )['value'].sum().unstack('impact_category').reindex(
+            columns=IMPACT_CATEGORIES, fill_value=0
+        ).fillna(0)
+
+    def to_wide(self) -> pd.DataFrame:
+        """Expand the sparse impacts back into impacts frames with metadata on every row.
+
+        Returns:
+            pd.DataFrame: elements metadata, value key columns and impact categories, one row
+                per element and value keys with any nonzero impact
+        """
+        key_columns = [column for column in VALUE_KEY_COLUMNS if column in self.values.columns]
+        wide = self.totals(['element_id'] + key_columns).reset_index()
+        wide.columns.name = None
+        return self.elements.merge(wide, on='element_id').drop(columns='element_id')
@@ -0,0 +1,198 @@
+"""Definition of the stage graph computing all life cycle stages of a template model in memory."""
+from dataclasses import dataclass, field
+from pathlib import Path
+import pandas as pd
+import src.impact_calculator.ImpactCalculator as ic
+from src.impact_calculator.SparseImpacts import SparseImpacts
+import src.utils.general as gen
+from src.utils.profiling import span
+
+
+@dataclass
+class LifeCycleStage:
+    """Life cycle stage of a stage graph.
+
+    Attr:
+        name (str): stage name used in file names, e.g. 'end-of-life'
+        calculator (type): ImpactCalculator subclass computing the stage
+    """
+    name: str
+    calculator: type
+
+    @property
+    def dependencies(self) -> list:
+        """Upstream life cycle stages the calculator builds on."""
+        return self.calculator.upstream_stages
+
+
+@dataclass
+class StageGraph:
+    """Compute the life cycle stages of a template model in a single in-memory pass.
+
+    The bill of materials is read once and every stage receives the impacts of its upstream
+    stages as DataFrames. Csv files are only written as final artifacts.
+
+    Attr:
+        stages (list): LifeCycleStage objects of the graph, in any order
+        chain_stages (bool): hand the results of stages in this graph to their dependents.
+            When False, every stage builds on the impacts passed to run, or on the impacts
+            written to disk, e.g. prebuilt scenarios building on the template model impacts.
+        output_directory_name (str): template model sub-directory the impacts are written to
+        file_suffix (str): suffix of written impacts file names
+    """
+    stages: list = field(default_factory=list)
+    chain_stages: bool = True
+    output_directory_name: str = 'impacts'
+    file_suffix: str = 'impacts'
+
+    def ordered_stages(self) -> list:
+        """Order the stages of the graph so that every stage follows its upstream stages.
+
+        Raises:
+            ValueError: Raised if the stages depend on each other in a cycle
+
+        Returns:
+            list: LifeCycleStage objects in computation order
+        """
+        if not self.chain_stages:
+            return list(self.stages)
+
+        stage_names = {stage.name for stage in self.stages}
+        ordered = []
+        remaining = list(self.stages)
+        while remaining:
+            ordered_names = {stage.name for stage in ordered}
+            ready = [
+                stage for stage in remaining
+                if all(
+                    dependency in ordered_names or dependency not in stage_names
+                    for dependency in stage.dependencies
+                )
+            ]
+            if not ready:
+                raise ValueError(
+                    f'Stages {[stage.name for stage in remaining]} depend on each other in a cycle'
+                )
+            ordered.extend(ready)
+            remaining = [stage for stage in remaining if stage not in ready]
+        return ordered
+
+    def run(self, template_model_name: str, bill_of_materials: pd.DataFrame = None,
+            upstream_impacts: dict = None, stage_names: list = None) -> dict:
+        """Compute the impacts of the stages of the graph for a template model.
+
+        Args:
+            template_model_name (str): name of template model
+            bill_of_materials (pd.DataFrame, optional): bill of materials of template model.
+                Read from the template model directory when not provided.
+            upstream_impacts (dict, optional): impacts of stages outside of this graph, keyed
+                by stage name. Stages that are missing are read from disk by the calculators.
+            stage_names (list, optional): names of the stages to compute, all stages when not
+                provided. Upstream stages that are not computed are read from disk.
+
+        Returns:
+            dict: impacts DataFrame of every computed stage, keyed by stage name
+        """
+        if bill_of_materials is None:
+            bom_loader = ic.ImpactCalculator(template_model_name)
+            bom_loader.load_bill_of_materials()
+            bill_of_materials = bom_loader.bill_of_materials
+
+        results = {}
+        for stage in self.ordered_stages():
+            if stage_names is not None and stage.name not in stage_names:
+                continue
+            stage_upstream_impacts = dict(upstream_impacts or {})
+            if self.chain_stages:
+                stage_upstream_impacts.update(
+                    {name: impacts for name, impacts in results.items()
+                     if name in stage.dependencies}
+                )
+            calculator = stage.calculator(
+                template_model_name,
+                bill_of_materials=bill_of_materials.copy(),
+                upstream_impacts=stage_upstream_impacts
+            )
+            with span(f'{stage.calculator.__name__}.calculate_impacts',
+                      template_model=template_model_name, stage=stage.name):
+                calculator.calculate_impacts()
+                calculator.apply_schema()
+            results[stage.name] = calculator.impacts
+        return results
+
+    def output_path(self, template_model_name: str, stage_name: str,
+                    tm_directory: Path) -> Path:
+        """Find the csv file the impacts of a stage are written to.
+
+        Args:
+            template_model_name (str): name of template model
+            stage_name (str): name of stage
+            tm_directory (Path): directory holding the template model directories
+
+        Returns:
+            Path: file path of stage impacts csv
+        """
+        return tm_directory.joinpath(
+            f'{template_model_name}/{self.output_directory_name}/'
+            f'{template_model_name}_{stage_name}_{self.file_suffix}.csv'
+        )
+
+    def sparse_paths(self, template_model_name: str, tm_directory: Path) -> tuple:
+        """Find the elements and values files the sparse impacts of the graph are written to.
+
+        Args:
+            template_model_name (str): name of template model
+            tm_directory (Path): directory holding the template model directories
+
+        Returns:
+            tuple: file path of elements parquet, file path of values parquet
+        """
+        return SparseImpacts.paths(
+            tm_directory.joinpath(f'{template_model_name}/{self.output_directory_name}'),
+            f'{template_model_name}_{self.file_suffix}'
+        )
+
+    def write(self, template_model_name: str, results: dict, tm_directory: Path) -> None:
+        """Write the impacts of every stage to csv, and to the sparse impacts of the template model.
+
+        Args:
+            template_model_name (str): name of template model
+            results (dict): impacts DataFrame of every stage, keyed by stage name
+            tm_directory (Path): directory holding the template model directories
+        """
+        write_directory = tm_directory.joinpath(
+            f'{template_model_name}/{self.output_directory_name}'
+        )
+        for stage_name, impacts in results.items():
+            gen.write_to_csv(
+                df=impacts.set_index('element_index'),
+                write_directory=write_directory,
+                file_name=f'{template_model_name}_{stage_name}_{self.file_suffix}'
+            )
+        if results:
+            self.write_sparse(template_model_name, results, tm_directory)
+
+    def write_sparse(self, template_model_name: str, results: dict, tm_directory: Path) -> None:
+        """Write the impacts of every stage of the graph as the sparse impacts of the template model.
+
+        Stages missing from results, e.g. fresh stages of an incremental rebuild, are read from
+        their csv files, so the sparse impacts always hold every stage written.
+
+        Args:
+            template_model_name (str): name of template model
+            results (dict): impacts DataFrame of computed stages, keyed by stage name
+            tm_directory (Path): directory holding the template model directories
+        """
+        stage_impacts = dict(results)
+        for stage in self.stages:
+            output_path = self.output_path(template_model_name, stage.name, tm_directory)
+            if stage.name not in stage_impacts and output_path.exists():
+                stage_impacts[stage.name] = gen.read_csv(
+                    output_path, apply_schema=True, float_precision='round_trip'
+                )
+        if not stage_impacts:
+            return
+        SparseImpacts.from_impacts(list(stage_impacts.values())).write(
+            tm_directory.joinpath(f'{template_model_name}/{self.output_directory_name}'),
+            f'{template_model_name}_{self.file_suffix}'
+        )
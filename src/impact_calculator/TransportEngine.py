@@ -0,0 +1,183 @@
+"""Definition of the vectorized multi-mode transportation impact engine.
+
+emission = mass of product * emission factor * distance * return factor, summed over modes
+"""
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+import src.utils.schema as sch
+
+MI_TO_KM_CONVERSION = 1.60934
+
+# product system of a4_emissions.xlsx for every transport mode
+TRANSPORT_MODES = {
+    'truck': 'Transport, combination truck, average fuel mix',
+    'rail': 'Transport, train, diesel powered',
+    'barge': 'Transport, barge, average fuel mix',
+    'ocean': 'Transport, ocean freighter, average fuel mix',
+}
+
+# distance columns of a4_distances.xlsx, in miles, for every transport mode
+TALLY_DISTANCE_COLUMNS = {
+    'truck': 'Tally dist_truck',
+    'rail': 'Tally dist_rail',
+    'barge': 'Tally dist_barge',
+    'ocean': 'Tally dist_container_ship',
+}
+# California barge and container ship distances are not available yet
+REGIONAL_CA_DISTANCE_COLUMNS = {
+    'truck': 'R dist CA_truck',
+    'rail': 'R dist CA dist_rail',
+}
+
+# The first rule matching an element and mode sets its return factor, otherwise it is 1.
+#   modes: modes the rule applies to, None for all modes
+#   material_pattern: regular expression matched against Tally material, None for all materials
+#   max_distance: rule applies to distances LESS THAN this many miles
+RETURN_FACTOR_RULES = [
+    # ready-mix trucks return empty
+    {
+        'modes': ['truck'],
+        'material_pattern': r'^(?:Structural|Lightweight) concrete',
+        'max_distance': np.inf,
+        'return_factor': 2.0
+    },
+    {
+        'modes': None,
+        'material_pattern': None,
+        'max_distance': 500,
+        'return_factor': 1.5
+    },
+]
+
+
+@dataclass
+class TransportEngine:
+    """Calculate transportation impacts of all modes and impact categories in one pass.
+
+    Attr:
+        emissions (pd.DataFrame): a4_emissions background dataset
+        distances (pd.DataFrame): a4_distances background dataset
+        impacts_map (dict): impact category names mapped to emissions column names
+        distance_columns (dict): distances column of every mode to include
+        return_factor_rules (list): return factor rules, see RETURN_FACTOR_RULES
+    """
+    emissions: pd.DataFrame
+    distances: pd.DataFrame
+    impacts_map: dict
+    distance_columns: dict = field(default_factory=lambda: dict(TALLY_DISTANCE_COLUMNS))
+    return_factor_rules: list = field(default_factory=lambda: list(RETURN_FACTOR_RULES))
+
+    def emission_factors(self) -> np.ndarray:
+        """Look up the emission factors of every mode.
+
+        Returns:
+            np.ndarray: modes x impact categories array of emission factors per tkm
+        """
+        product_systems = [TRANSPORT_MODES[mode] for mode in self.distance_columns]
+        return self.emissions.set_index('Product system name').loc[
+            product_systems,
+            list(self.impacts_map.values())
+        ].to_numpy(dtype=float)
+
+    def element_distances(self, tally_materials: pd.Series) -> np.ndarray:
+        """Look up the distance of every element by every mode.
+
+        Args:
+            tally_materials (pd.Series): Tally material of every element
+
+        Returns:
+            np.ndarray: elements x modes array of distances in miles, NaN for unknown materials
+        """
+        distances = self.distances.dropna(
+            subset=['Name_Tally Material']
+        ).drop_duplicates('Name_Tally Material')
+        distance_table = np.vstack([
+            distances[list(self.distance_columns.values())].to_numpy(dtype=float),
+            np.full((1, len(self.distance_columns)), np.nan)
+        ])
+        material_codes = sch.lookup_positions(
+            pd.Index(distances['Name_Tally Material']),
+            tally_materials
+        )
+        return distance_table[material_codes]
+
+    def return_factors(self, tally_materials: pd.Series, distances: np.ndarray) -> np.ndarray:
+        """Evaluate the return factor rules for every element and mode.
+
+        Args:
+            tally_materials (pd.Series): Tally material of every element
+            distances (np.ndarray): elements x modes array of distances in miles, optionally
+                with leading sample axes, e.g. samples x elements x modes
+
+        Returns:
+            np.ndarray: return factors in the shape of distances
+        """
+        modes = list(self.distance_columns)
+        return_factors = np.ones(distances.shape)
+        unmatched = np.ones(distances.shape, dtype=bool)
+        for rule in self.return_factor_rules:
+            mode_mask = np.array(
+                [rule['modes'] is None or mode in rule['modes'] for mode in modes]
+            )
+            if rule['material_pattern'] is None:
+                material_mask = np.ones(len(tally_materials), dtype=bool)
+            else:
+                material_mask = tally_materials.str.contains(
+                    rule['material_pattern'],
+                    regex=True,
+                    na=False
+                ).to_numpy()
+            with np.errstate(invalid='ignore'):
+                distance_mask = distances < rule['max_distance']
+            rule_mask = (
+                unmatched
+                & mode_mask[np.newaxis, :]
+                & material_mask[:, np.newaxis]
+                & distance_mask
+            )
+            return_factors[rule_mask] = rule['return_factor']
+            unmatched &= ~rule_mask
+        return return_factors
+
+    def tonne_kilometers(self, tally_materials: pd.Series, tonnes: np.ndarray,
+                         distances: np.ndarray) -> np.ndarray:
+        """Calculate the tonne-kilometers of every element by every mode, return trips included.
+
+        Args:
+            tally_materials (pd.Series): Tally material of every element
+            tonnes (np.ndarray): mass of every element in tonnes
+            distances (np.ndarray): elements x modes array of distances in miles, optionally
+                with leading sample axes
+
+        Returns:
+            np.ndarray: tonne-kilometers in the shape of distances
+        """
+        return (
+            tonnes[:, np.newaxis]
+            * distances * MI_TO_KM_CONVERSION
+            * self.return_factors(tally_materials, distances)
+        )
+
+    def calculate(self, bill_of_materials: pd.DataFrame) -> pd.DataFrame:
+        """Calculate the transportation impacts of every element.
+
+        Args:
+            bill_of_materials (pd.DataFrame): bill of materials with Tally material and
+                Weight (kg) columns
+
+        Returns:
+            pd.DataFrame: impacts of every element by impact category, on the bill of
+                materials index
+        """
+        tally_materials = bill_of_materials['Tally material']
+        tonne_kilometers = self.tonne_kilometers(
+            tally_materials,
+            bill_of_materials['Weight (kg)'].to_numpy(dtype=float) / 1000,
+            self.element_distances(tally_materials)
+        )
+        return pd.DataFrame(
+            tonne_kilometers @ self.emission_factors(),
+            index=bill_of_materials.index,
+            columns=list(self.impacts_map.keys())
+        )
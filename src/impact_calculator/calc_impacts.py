@@ -1,8 +1,40 @@
+import argparse
 from pathlib import Path
+import sys
 import src.impact_calculator.ImpactCalculator as ic
+from src.impact_calculator.StageGraph import LifeCycleStage, StageGraph
+import src.utils.background_data as bgd
+from src.utils.parallel import run_template_models
 
+IMPACT_STAGE_GRAPH = StageGraph(
+    stages=[
+        LifeCycleStage('product', ic.ProductImpactCalculator),
+        LifeCycleStage('transportation', ic.TransportationImpactCalculator),
+        LifeCycleStage('end-of-life', ic.EndOfLifeImpactCalculator),
+        LifeCycleStage('operational', ic.OperationalImpactCalculator),
+        LifeCycleStage('construction', ic.ConstructionImpactCalculator),
+        LifeCycleStage('replacement', ic.ReplacementImpactCalculator),
+        # LifeCycleStage('module D', ic.ModuleDImpactCalculator),
+    ]
+)
 
-def calculate_impacts():
+
+def calculate_template_model_impacts(template_model: str, tm_directory: Path) -> dict:
+    """Calculate and write the impacts of every life cycle stage of one template model.
+
+    Args:
+        template_model (str): name of template model
+        tm_directory (Path): directory holding the template model directories
+
+    Returns:
+        dict: impacts DataFrame of every life cycle stage, keyed by stage name
+    """
+    impacts = IMPACT_STAGE_GRAPH.run(template_model)
+    IMPACT_STAGE_GRAPH.write(template_model, impacts, tm_directory)
+    return impacts
+
+
+def calculate_impacts(max_workers: int = 1) -> dict:
     """
     Implementation of ImpactCalculator for creation of impacts.
     """
@@ -14,28 +46,25 @@ def calculate_impacts():
         if '.gitkeep' not in temp_model.name:
             template_model_list.append(temp_model.name)
 
-    for template_model in template_model_list:
-        impact_directory = tm_directory.joinpath(f'{template_model}/impacts')
-        # order is important, replacement is last, construction is second last
-        dict_of_impact_calculators = {
-            'product': ic.ProductImpactCalculator(template_model),
-            'transportation': ic.TransportationImpactCalculator(template_model),
-            'end-of-life': ic.EndOfLifeImpactCalculator(template_model),
-            'operational': ic.OperationalImpactCalculator(template_model),
-            'construction': ic.ConstructionImpactCalculator(template_model),
-            'replacement': ic.ReplacementImpactCalculator(template_model),
-            # 'module D': ic.ModuleDImpactCalculator(template_model),
-        }
-
-        for lcs, impact_calculator in dict_of_impact_calculators.items():
-            temp_calculator = impact_calculator
-            temp_calculator.load_bill_of_materials()
-            temp_calculator.calculate_impacts()
-            temp_calculator.write_impacts_to_csv(
-                file_path=impact_directory,
-                impacts_name=f'{template_model}_{lcs}_impacts'
-            )
+    return run_template_models(
+        calculate_template_model_impacts,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=tm_directory
+    )
 
 
 if __name__ == '__main__':
-    calculate_impacts()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes'
+    )
+    args = parser.parse_args()
+    failures = calculate_impacts(max_workers=args.workers)
+    print(f'Background data cache: {bgd.registry.stats()}')
+    if failures:
+        print(f'Failed template models: {", ".join(failures)}')
+        sys.exit(1)
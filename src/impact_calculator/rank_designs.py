@@ -0,0 +1,55 @@
+import argparse
+from pathlib import Path
+from src.impact_calculator.DesignSpace import load_design_space
+
+
+def rank_designs(impact_category: str, stages: list = None, top: int = None,
+                 output_path: Path = None):
+    """Rank every combination of building system options by one impact category.
+
+    Args:
+        impact_category (str): impact category to rank by
+        stages (list, optional): life cycle stages to add up. Defaults to every bill of
+            materials driven stage.
+        top (int, optional): number of lowest impact template models to keep. Defaults to
+            every template model.
+        output_path (Path, optional): csv file the ranking is written to. Defaults to None.
+
+    Returns:
+        pd.DataFrame: template_model and impact, lowest impact first
+    """
+    design_space = load_design_space()
+    print(f'{design_space.n_combinations} template models from options {design_space.shape}')
+    ranking = design_space.rank(impact_category, stages=stages, top=top)
+    if output_path is not None:
+        ranking.to_csv(output_path, index=False)
+    return ranking
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--category',
+        default='Global Warming Potential_fossil',
+        help='impact category to rank by'
+    )
+    parser.add_argument(
+        '--stages',
+        nargs='+',
+        default=None,
+        help='life cycle stages to add up, e.g. product replacement. Defaults to all'
+    )
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=20,
+        help='number of lowest impact template models to list'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=None,
+        help='csv file the ranking is written to'
+    )
+    args = parser.parse_args()
+    print(rank_designs(args.category, args.stages, args.top, args.output).to_string(index=False))
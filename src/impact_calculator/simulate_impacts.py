@@ -0,0 +1,86 @@
+import argparse
+from pathlib import Path
+import sys
+from src.impact_calculator.ElementVectors import load_element_vectors
+from src.impact_calculator.MonteCarlo import MonteCarloSimulator
+import src.utils.general as gen
+from src.utils.parallel import run_template_models
+
+
+def simulate_template_model_impacts(template_model: str, tm_directory: Path,
+                                    simulator: MonteCarloSimulator) -> None:
+    """Simulate one template model and write its Monte Carlo summary.
+
+    Args:
+        template_model (str): name of template model
+        tm_directory (Path): directory holding the template model directories
+        simulator (MonteCarloSimulator): simulator with sample size, seed and uncertainty
+    """
+    summary = simulator.summarize(load_element_vectors(template_model))
+    write_directory = tm_directory.joinpath(f'{template_model}/monte_carlo')
+    write_directory.mkdir(parents=True, exist_ok=True)
+    gen.write_to_csv(
+        df=summary.set_index('template_model'),
+        write_directory=write_directory,
+        file_name=f'{template_model}_monte_carlo_summary'
+    )
+
+
+def simulate_impacts(n_samples: int = 1000, chunk_size: int = 1000, seed: int = None,
+                     max_workers: int = 1) -> dict:
+    """
+    Implementation of MonteCarloSimulator for uncertainty summaries of every template model.
+    """
+    main_directory = Path(__file__).parents[2]
+    tm_directory = main_directory.joinpath('data/template_models')
+
+    template_model_list = []
+    for temp_model in tm_directory.glob("*"):
+        if '.gitkeep' not in temp_model.name:
+            template_model_list.append(temp_model.name)
+
+    return run_template_models(
+        simulate_template_model_impacts,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=tm_directory,
+        simulator=MonteCarloSimulator(n_samples=n_samples, chunk_size=chunk_size, seed=seed)
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--samples',
+        type=int,
+        default=1000,
+        help='number of samples per template model'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=1000,
+        help='number of samples evaluated at once, bounds memory use'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='seed of the random number generators, fixed so that runs are reproducible'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes'
+    )
+    args = parser.parse_args()
+    failures = simulate_impacts(
+        n_samples=args.samples,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        max_workers=args.workers
+    )
+    if failures:
+        print(f'Failed template models: {", ".join(failures)}')
+        sys.exit(1)
@@ -0,0 +1,109 @@
+import argparse
+from pathlib import Path
+import sys
+import src.impact_calculator.ImpactCalculator as ic
+from src.p_scenario_builder.PrebuiltScenarioBuilder import ReplacementScenarioBuilder
+import src.utils.general as gen
+from src.utils.parallel import run_template_models
+
+# replacement calculator of every service life dataset
+SERVICE_LIFE_CALCULATORS = {
+    'b2-b5': ic.ReplacementImpactCalculator,
+    'RICS': ReplacementScenarioBuilder,
+}
+
+
+def sweep_template_model_rsp(template_model: str, tm_directory: Path, RSPs: list,
+                             service_lives: str = 'b2-b5') -> None:
+    """Sweep the Reference Study Period of one template model and write its B2-B5 totals.
+
+    Args:
+        template_model (str): name of template model
+        tm_directory (Path): directory holding the template model directories
+        RSPs (list): Reference Study Periods to evaluate
+        service_lives (str, optional): service life dataset, a key of SERVICE_LIFE_CALCULATORS.
+            Defaults to 'b2-b5'.
+    """
+    Calculator = SERVICE_LIFE_CALCULATORS[service_lives](template_model)
+    Calculator.load_bill_of_materials()
+    element_impacts = Calculator.sweep_impacts(RSPs)
+
+    rsp_totals = element_impacts.groupby(
+        ['RSP', 'impact_category'],
+        sort=False
+    )['impact'].sum().reset_index()
+    rsp_totals.insert(0, 'template_model', template_model)
+    rsp_totals.insert(1, 'service_life_dataset', service_lives)
+
+    write_directory = tm_directory.joinpath(f'{template_model}/rsp_sweep')
+    write_directory.mkdir(parents=True, exist_ok=True)
+    gen.write_to_csv(
+        df=rsp_totals.set_index('template_model'),
+        write_directory=write_directory,
+        file_name=f'{template_model}_{service_lives}_rsp_sweep'
+    )
+
+
+def sweep_rsp(RSPs: list, service_lives: str = 'b2-b5', max_workers: int = 1) -> dict:
+    """
+    Implementation of ReplacementImpactCalculator.sweep_impacts for every template model.
+    """
+    main_directory = Path(__file__).parents[2]
+    tm_directory = main_directory.joinpath('data/template_models')
+
+    template_model_list = []
+    for temp_model in tm_directory.glob("*"):
+        if '.gitkeep' not in temp_model.name:
+            template_model_list.append(temp_model.name)
+
+    return run_template_models(
+        sweep_template_model_rsp,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=tm_directory,
+        RSPs=RSPs,
+        service_lives=service_lives
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--rsp-start',
+        type=int,
+        default=30,
+        help='first Reference Study Period of the sweep'
+    )
+    parser.add_argument(
+        '--rsp-stop',
+        type=int,
+        default=100,
+        help='last Reference Study Period of the sweep, included'
+    )
+    parser.add_argument(
+        '--rsp-step',
+        type=int,
+        default=1,
+        help='years between Reference Study Periods'
+    )
+    parser.add_argument(
+        '--service-lives',
+        choices=list(SERVICE_LIFE_CALCULATORS),
+        default='b2-b5',
+        help='service life dataset'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes'
+    )
+    args = parser.parse_args()
+    failures = sweep_rsp(
+        RSPs=list(range(args.rsp_start, args.rsp_stop + 1, args.rsp_step)),
+        service_lives=args.service_lives,
+        max_workers=args.workers
+    )
+    if failures:
+        print(f'Failed template models: {", ".join(failures)}')
+        sys.exit(1)
@@ -0,0 +1,252 @@
+"""Definition of user-defined scenarios evaluated in memory from the base arrays of a template model.
+
+Overrides only change the stages downstream of them, e.g. a wastage override recomputes the
+construction and replacement stages and reuses the base product, transportation and
+end-of-life impacts.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.impact_calculator.ElementVectors import (
+    ELEMENT_STAGES, ElementVectors, load_element_vectors
+)
+import src.impact_calculator.ImpactCalculator as ic
+import src.utils.background_data as bgd
+
+# element driven stages recomputed when an override is set
+OVERRIDE_STAGES = {
+    'distances': ['transportation', 'construction', 'replacement'],
+    'mode_split': ['transportation', 'construction', 'replacement'],
+    'wastage': ['construction', 'replacement'],
+    'service_lives': ['replacement'],
+    'RSP': ['replacement'],
+}
+STAGE_LABELS = {
+    'product': 'A1-A3: Product',
+    'transportation': 'A4: Transportation',
+    'end-of-life': 'C2-C4: End-of-life',
+    'construction': 'A5: Construction',
+    'replacement': 'B2-B5: Replacement',
+}
+
+# background workbooks the base arrays of an evaluator are computed from
+EVALUATOR_BACKGROUND_DATASETS = sorted({
+    background_dataset
+    for calculator in [
+        ic.ProductImpactCalculator,
+        ic.TransportationImpactCalculator,
+        ic.EndOfLifeImpactCalculator,
+        ic.ConstructionImpactCalculator,
+        ic.ReplacementImpactCalculator,
+    ]
+    for background_dataset in calculator.background_datasets
+})
+
+_evaluator_cache = {}
+
+
+@dataclass
+class ScenarioOverrides:
+    """User-defined changes to the parameters of the template model calculation.
+
+    Values of materials or assemblies that are not in a template model are ignored, so the same
+    overrides can be evaluated for every template model.
+
+    Attr:
+        distances (dict): distance in miles by mode, e.g. {'truck': 100}, keyed by Tally
+            material. Modes left out keep their base distance.
+        mode_split (dict): share of the total distance of every element travelled by each mode,
+            e.g. {'truck': 0.5, 'rail': 0.5}. Applied after distances.
+        wastage (dict): construction wastage rate keyed by Building Material_name
+        service_lives (dict): service life in years keyed by Assembly
+        RSP (int): Reference Study Period
+    """
+    distances: dict = None
+    mode_split: dict = None
+    wastage: dict = None
+    service_lives: dict = None
+    RSP: int = None
+
+    def __post_init__(self):
+        if self.mode_split is not None and not np.isclose(sum(self.mode_split.values()), 1):
+            raise ValueError(f'Mode split shares must add up to 1, got {self.mode_split}')
+        if any(value < 0 for value in (self.wastage or {}).values()):
+            raise ValueError('wastage overrides must not be negative')
+        # a service life of 0 would replace an element infinitely often
+        if any(value <= 0 for value in (self.service_lives or {}).values()):
+            raise ValueError('service_lives overrides must be positive')
+        if any(
+            distance < 0
+            for material_distances in (self.distances or {}).values()
+            for distance in material_distances.values()
+        ):
+            raise ValueError('distances overrides must not be negative')
+        if self.RSP is not None and self.RSP <= 0:
+            raise ValueError(f'RSP must be positive, got {self.RSP}')
+
+    @property
+    def affected_stages(self) -> list:
+        """Element driven stages changed by the overrides, in ELEMENT_STAGES order."""
+        stages = {
+            stage
+            for name, override_stages in OVERRIDE_STAGES.items()
+            if getattr(self, name) is not None
+            for stage in override_stages
+        }
+        return [stage for stage in ELEMENT_STAGES if stage in stages]
+
+
+def _override_values(base_values: np.ndarray, groups: pd.Series, overrides: dict) -> np.ndarray:
+    """Replace the base value of every element whose group has an override."""
+    override_values = np.array(
+        [overrides.get(group, np.nan) for group in groups],
+        dtype=float
+    )
+    return np.where(np.isnan(override_values), base_values, override_values)
+
+
+@dataclass
+class CustomScenarioEvaluator:
+    """Evaluation of custom scenarios of one template model.
+
+    The base impacts of every stage are computed once, a scenario then only recomputes the
+    stages its overrides affect. Nothing is read from or written to disk.
+
+    Attr:
+        vectors (ElementVectors): base arrays of template model
+        base_impacts (dict): elements x impact categories base impacts keyed by stage name
+    """
+    vectors: ElementVectors
+    base_impacts: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.base_impacts = self.vectors.stage_impacts()
+
+    def scenario_distances(self, overrides: ScenarioOverrides) -> np.ndarray:
+        """Apply the distance and mode split overrides to the base distances.
+
+        Raises:
+            ValueError: Raised if an override names a mode the transport engine does not use
+
+        Returns:
+            np.ndarray: elements x modes distances in miles
+        """
+        modes = self.vectors.transport_modes
+        override_modes = set(overrides.mode_split or {}).union(*[
+            material_distances for material_distances in (overrides.distances or {}).values()
+        ])
+        unknown_modes = override_modes - set(modes)
+        if unknown_modes:
+            raise ValueError(f'Unknown transport modes {sorted(unknown_modes)}, use {modes}')
+
+        distances = self.vectors.distances
+        if overrides.distances is not None:
+            distances = np.column_stack([
+                _override_values(
+                    distances[:, mode_position],
+                    self.vectors.tally_materials,
+                    {
+                        material: material_distances[mode]
+                        for material, material_distances in overrides.distances.items()
+                        if mode in material_distances
+                    }
+                )
+                for mode_position, mode in enumerate(modes)
+            ])
+        if overrides.mode_split is not None:
+            shares = np.array([overrides.mode_split.get(mode, 0) for mode in modes])
+            # elements of unknown materials keep NaN distances
+            total_distances = distances.sum(axis=1)
+            distances = total_distances[:, np.newaxis] * shares[np.newaxis, :]
+        return distances
+
+    def evaluate(self, overrides: ScenarioOverrides) -> dict:
+        """Evaluate the element impacts of a custom scenario.
+
+        Args:
+            overrides (ScenarioOverrides): changes to the base parameters
+
+        Returns:
+            dict: elements x impact categories impacts keyed by stage name. Stages the overrides
+                do not affect are the base arrays and must not be modified.
+        """
+        affected_stages = overrides.affected_stages
+        impacts = dict(self.base_impacts)
+        if 'transportation' in affected_stages:
+            impacts['transportation'] = self.vectors.transportation_impacts(
+                self.scenario_distances(overrides)
+            )
+        if 'construction' in affected_stages:
+            wastage = None
+            if overrides.wastage is not None:
+                wastage = _override_values(
+                    self.vectors.wastage,
+                    self.vectors.building_materials,
+                    overrides.wastage
+                )
+            impacts['construction'] = self.vectors.construction_impacts(impacts, wastage)
+        if 'replacement' in affected_stages:
+            service_lives = None
+            if overrides.service_lives is not None:
+                service_lives = _override_values(
+                    self.vectors.service_lives,
+                    self.vectors.assemblies,
+                    overrides.service_lives
+                )
+            impacts['replacement'] = self.vectors.replacement_impacts(
+                impacts,
+                service_lives,
+                overrides.RSP
+            )
+        return impacts
+
+    def totals(self, overrides: ScenarioOverrides = None) -> pd.DataFrame:
+        """Evaluate the template model totals of a custom scenario.
+
+        Args:
+            overrides (ScenarioOverrides, optional): changes to the base parameters. Defaults to
+                the base scenario.
+
+        Returns:
+            pd.DataFrame: impact categories by life_cycle_stage. Elements with unknown materials
+                are skipped.
+        """
+        impacts = self.evaluate(overrides or ScenarioOverrides())
+        return pd.DataFrame(
+            np.vstack([np.nansum(impacts[stage], axis=0) for stage in ELEMENT_STAGES]),
+            index=pd.Index([STAGE_LABELS[stage] for stage in ELEMENT_STAGES],
+                           name='life_cycle_stage'),
+            columns=self.vectors.impact_categories
+        )
+
+
+def load_custom_scenario_evaluator(template_model_name: str) -> CustomScenarioEvaluator:
+    """Load the evaluator of a template model, built once per bill of materials file.
+
+    The evaluator is rebuilt when the bill of materials of the template model or one of the
+    background workbooks it is computed from is rewritten.
+
+    Args:
+        template_model_name (str): name of template model
+
+    Returns:
+        CustomScenarioEvaluator: evaluator shared between callers
+    """
+    main_directory = Path(__file__).parents[2]
+    bom_file_path = main_directory.joinpath(
+        f'data/template_models/{template_model_name}/bom/{template_model_name}_bom.csv'
+    )
+    key = (
+        template_model_name,
+        bom_file_path.stat().st_mtime_ns,
+        tuple(
+            bgd.BACKGROUND_DATA_DIRECTORY.joinpath(background_dataset).stat().st_mtime_ns
+            for background_dataset in EVALUATOR_BACKGROUND_DATASETS
+        )
+    )
+    if key not in _evaluator_cache:
+        for stale_key in [k for k in _evaluator_cache if k[0] == template_model_name]:
+            del _evaluator_cache[stale_key]
+        _evaluator_cache[key] = CustomScenarioEvaluator(load_element_vectors(template_model_name))
+    return _evaluator_cache[key]
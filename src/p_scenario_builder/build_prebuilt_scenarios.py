@@ -1,8 +1,48 @@
+import argparse
 from pathlib import Path
+import sys
+from src.impact_calculator.StageGraph import LifeCycleStage, StageGraph
 import src.p_scenario_builder.PrebuiltScenarioBuilder as psc
+import src.utils.background_data as bgd
+from src.utils.parallel import run_template_models
 
+# prebuilt scenarios are alternatives to the template model stages, so each one builds on
+# the template model impacts rather than on the other scenarios
+PREBUILT_SCENARIO_STAGE_GRAPH = StageGraph(
+    stages=[
+        # LifeCycleStage('product', psc.ProductImpactCalculator),
+        LifeCycleStage('transportation', psc.TransportationScenarioBuilder),
+        LifeCycleStage('construction', psc.ConstructionScenarioBuilder),
+        LifeCycleStage('replacement', psc.ReplacementScenarioBuilder),
+        # LifeCycleStage('operational', ic.OperationalImpactCalculator),
+        # LifeCycleStage('end-of-life', ic.EndOfLifeImpactCalculator),
+        # LifeCycleStage('module D', ic.ModuleDImpactCalculator),
+    ],
+    chain_stages=False,
+    output_directory_name='prebuilt_scenarios',
+    file_suffix='prebuilt_scenarios'
+)
 
-def build_prebuilt_scenarios():
+
+def build_template_model_scenarios(template_model: str, tm_directory: Path,
+                                   upstream_impacts: dict = None) -> dict:
+    """Build and write the prebuilt scenarios of one template model.
+
+    Args:
+        template_model (str): name of template model
+        tm_directory (Path): directory holding the template model directories
+        upstream_impacts (dict, optional): template model impacts keyed by stage name. Impacts
+            that are missing are read from the template model impacts directory.
+
+    Returns:
+        dict: impacts DataFrame of every prebuilt scenario, keyed by stage name
+    """
+    scenarios = PREBUILT_SCENARIO_STAGE_GRAPH.run(template_model, upstream_impacts=upstream_impacts)
+    PREBUILT_SCENARIO_STAGE_GRAPH.write(template_model, scenarios, tm_directory)
+    return scenarios
+
+
+def build_prebuilt_scenarios(max_workers: int = 1) -> dict:
     """placeholder for implementation of prebuilt scenario"""
     main_directory = Path(__file__).parents[2]
     tm_directory = main_directory.joinpath('data/template_models')
@@ -12,27 +52,25 @@ def build_prebuilt_scenarios():
         if '.gitkeep' not in temp_model.name:
             template_model_list.append(temp_model.name)
 
-    for template_model in template_model_list:
-        impact_directory = tm_directory.joinpath(f'{template_model}/prebuilt_scenarios')
-        dict_of_impact_calculators = {
-            # 'product': psc.ProductImpactCalculator(template_model),
-            'transportation': psc.TransportationScenarioBuilder(template_model),
-            'construction': psc.ConstructionScenarioBuilder(template_model),
-            'replacement': psc.ReplacementScenarioBuilder(template_model),
-            # 'operational': ic.OperationalImpactCalculator(template_model),
-            # 'end-of-life': ic.EndOfLifeImpactCalculator(template_model),
-            # 'module D': ic.ModuleDImpactCalculator(template_model),
-        }
-
-        for lcs, impact_calculator in dict_of_impact_calculators.items():
-            temp_calculator = impact_calculator
-            temp_calculator.load_bill_of_materials()
-            temp_calculator.calculate_impacts()
-            temp_calculator.write_impacts_to_csv(
-                file_path=impact_directory,
-                impacts_name=f'{template_model}_{lcs}_prebuilt_scenarios'
-            )
+    return run_template_models(
+        build_template_model_scenarios,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=tm_directory
+    )
 
 
 if __name__ == '__main__':
-    build_prebuilt_scenarios()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes'
+    )
+    args = parser.parse_args()
+    failures = build_prebuilt_scenarios(max_workers=args.workers)
+    print(f'Background data cache: {bgd.registry.stats()}')
+    if failures:
+        print(f'Failed template models: {", ".join(failures)}')
+        sys.exit(1)
@@ -0,0 +1,108 @@
+"""Definition of the build manifest recording input fingerprints of pipeline outputs."""
+from dataclasses import dataclass, field
+from hashlib import sha256
+import json
+from pathlib import Path
+
+
+def hash_file(file_path: Path) -> str:
+    """Fingerprint the content of a file.
+
+    Args:
+        file_path (Path): file path of file to fingerprint
+
+    Returns:
+        str: sha256 hex digest of the file content
+    """
+    file_hash = sha256()
+    with open(file_path, mode='rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def hash_values(*values) -> str:
+    """Fingerprint a combination of json serializable values, e.g. other fingerprints.
+
+    Returns:
+        str: sha256 hex digest of the values
+    """
+    return sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+@dataclass
+class BuildManifest:
+    """Record of the inputs every (target, stage) output was last built from.
+
+    Targets are template model names, or 'frontend' for the combined files. Stages are named
+    after the directory and stage of the output, e.g. 'bom' or 'impacts/replacement'.
+
+    Attr:
+        file_path (Path): file path of manifest json
+        entries (dict): input and output fingerprints keyed by target, then stage
+    """
+    file_path: Path
+    entries: dict = field(default_factory=dict)
+
+    def load(self) -> None:
+        """Read the manifest, starting from an empty manifest if none was written yet."""
+        if self.file_path.exists():
+            with open(self.file_path, mode='r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+
+    def write(self) -> None:
+        """Write the manifest, replacing the previous one only once it is complete."""
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file_path = self.file_path.with_suffix('.tmp')
+        with open(temp_file_path, mode='w', encoding='utf-8') as file:
+            json.dump(self.entries, file, indent=1, sort_keys=True)
+        temp_file_path.replace(self.file_path)
+
+    def is_fresh(self, target: str, stage: str, input_fingerprint: str,
+                 output_path: Path) -> bool:
+        """Check whether an output was built from the given inputs and is unchanged since.
+
+        Args:
+            target (str): template model name or 'frontend'
+            stage (str): stage name, e.g. 'impacts/product'
+            input_fingerprint (str): fingerprint of the current inputs of the stage
+            output_path (Path): file path of stage output
+
+        Returns:
+            bool: True if the output does not need to be rebuilt
+        """
+        entry = self.entries.get(target, {}).get(stage)
+        return (
+            entry is not None
+            and entry['inputs'] == input_fingerprint
+            and output_path.exists()
+            and entry['output'] == hash_file(output_path)
+        )
+
+    def record(self, target: str, stage: str, input_fingerprint: str,
+               output_path: Path) -> None:
+        """Record the inputs an output was built from.
+
+        Args:
+            target (str): template model name or 'frontend'
+            stage (str): stage name, e.g. 'impacts/product'
+            input_fingerprint (str): fingerprint of the inputs the output was built from
+            output_path (Path): file path of stage output
+        """
+        self.entries.setdefault(target, {})[stage] = {
+            'inputs': input_fingerprint,
+            'output': hash_file(output_path)
+        }
+
+    def output_fingerprint(self, target: str, stage: str) -> str:
+        """Find the recorded fingerprint of an output.
+
+        Args:
+            target (str): template model name or 'frontend'
+            stage (str): stage name, e.g. 'impacts/product'
+
+        Returns:
+            str: fingerprint of the output, None if the output was never recorded
+        """
+        entry = self.entries.get(target, {}).get(stage)
+        return None if entry is None else entry['output']
@@ -0,0 +1,121 @@
+"""Definition of the pipeline stages and their scheduling as a dependency graph."""
+from dataclasses import dataclass, field
+import time
+from src.utils.profiling import span
+
+
+@dataclass
+class PipelineStage:
+    """Stage of the data processing workflow, e.g. the extraction of the bills of materials.
+
+    Attr:
+        name (str): stage name used on the command line, e.g. 'impacts'
+        task (callable): function called as task(template_model_list, max_workers), returning
+            the formatted traceback of every failed template model keyed by template model
+        dependencies (list): names of the stages whose outputs the stage reads
+        per_template_model (bool): whether the stage runs for the selected template models
+            only. Stages that are not, e.g. the combination of frontend datasets, cover every
+            template model on disk.
+    """
+    name: str
+    task: callable
+    dependencies: list = field(default_factory=list)
+    per_template_model: bool = True
+
+
+@dataclass
+class PipelineDAG:
+    """Run the stages of the data processing workflow in dependency order within one process.
+
+    Imports, the template model list and the background data registry are shared by every
+    stage, so their cost is paid once per run instead of once per stage.
+
+    Attr:
+        stages (list): PipelineStage objects of the workflow, in any order
+    """
+    stages: list = field(default_factory=list)
+
+    @property
+    def stage_names(self) -> list:
+        """Names of the stages in dependency order."""
+        return [stage.name for stage in self.ordered_stages()]
+
+    def ordered_stages(self) -> list:
+        """Order the stages so that every stage follows the stages it depends on.
+
+        Raises:
+            ValueError: Raised if the stages depend on each other in a cycle
+
+        Returns:
+            list: PipelineStage objects in run order
+        """
+        ordered = []
+        remaining = list(self.stages)
+        while remaining:
+            ordered_names = {stage.name for stage in ordered}
+            ready = [
+                stage for stage in remaining
+                if all(dependency in ordered_names for dependency in stage.dependencies)
+            ]
+            if not ready:
+                raise ValueError(
+                    f'Stages {[stage.name for stage in remaining]} depend on each other in a cycle'
+                )
+            ordered.extend(ready)
+            remaining = [stage for stage in remaining if stage not in ready]
+        return ordered
+
+    def run(self, template_model_list: list, stage_names: list = None,
+            max_workers: int = 1) -> dict:
+        """Run the stages for a list of template models.
+
+        Stages that are not selected are not run, their outputs are read from disk by the
+        stages depending on them. Template models failing in a stage are left out of the
+        stages downstream of it.
+
+        Args:
+            template_model_list (list): names of template models to run the stages for
+            stage_names (list, optional): names of the stages to run, all stages when not
+                provided
+            max_workers (int, optional): number of worker processes of the template model
+                stages. Defaults to 1.
+
+        Raises:
+            ValueError: Raised if stage_names holds a stage that is not part of the graph
+
+        Returns:
+            dict: wall_time_s, template_models and failures of every stage that ran, keyed by
+                stage name
+        """
+        ordered_stages = self.ordered_stages()
+        if stage_names is not None:
+            unknown_stages = set(stage_names) - {stage.name for stage in ordered_stages}
+            if unknown_stages:
+                raise ValueError(
+                    f'Unknown stages {sorted(unknown_stages)}, choose from {self.stage_names}'
+                )
+
+        report = {}
+        failed = {}
+        for stage in ordered_stages:
+            if stage_names is not None and stage.name not in stage_names:
+                continue
+            # a template model failing upstream is not run downstream
+            upstream_failures = set()
+            for dependency in stage.dependencies:
+                upstream_failures.update(failed.get(dependency, set()))
+            stage_template_models = [
+                template_model for template_model in template_model_list
+                if template_model not in upstream_failures
+            ]
+            print(f'Running {stage.name}', flush=True)
+            start = time.perf_counter()
+            with span('pipeline_stage', stage=stage.name):
+                failures = stage.task(stage_template_models, max_workers) or {}
+            failed[stage.name] = set(failures) | upstream_failures
+            report[stage.name] = {
+                'wall_time_s': time.perf_counter() - start,
+                'template_models': len(stage_template_models) if stage.per_template_model else None,
+                'failures': failures,
+            }
+        return report
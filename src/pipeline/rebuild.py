@@ -0,0 +1,329 @@
+"""Incremental rebuild of template model outputs driven by input fingerprints.
+
+Every (template model, stage) output is rebuilt only when the fingerprint of its inputs differs
+from the one recorded in the build manifest, or when one of its upstream stages is rebuilt.
+The inputs of a stage are the raw bill of materials rows of its options, the background
+workbooks its calculator reads and the outputs of its upstream stages.
+"""
+import argparse
+from pathlib import Path
+import pandas as pd
+from src.combine.combine import create_data_for_frontend, frontend_store
+from src.impact_calculator.calc_impacts import IMPACT_STAGE_GRAPH
+from src.p_scenario_builder.build_prebuilt_scenarios import PREBUILT_SCENARIO_STAGE_GRAPH
+from src.pipeline.BuildManifest import BuildManifest, hash_file, hash_values
+from src.tm_extractor.TemplateModelExtractor import TemplateModelExtractor
+import src.utils.background_data as bgd
+
+MAIN_DIRECTORY = Path(__file__).parents[2]
+MANIFEST_PATH = MAIN_DIRECTORY.joinpath('data/interim/build_manifest.json')
+# stage graphs writing the outputs of the template model directories of the same name
+STAGE_GRAPHS = {
+    graph.output_directory_name: graph
+    for graph in [IMPACT_STAGE_GRAPH, PREBUILT_SCENARIO_STAGE_GRAPH]
+}
+
+
+def _bom_fingerprint(Extractor: TemplateModelExtractor, template_model: str) -> str:
+    """Fingerprint the raw bill of materials rows of the options of a template model."""
+    option_fingerprints = []
+    for option_name in template_model.split('_')[:4]:
+        option_bom = Extractor.option_groups.get(option_name)
+        if option_bom is None:
+            option_fingerprints.append(None)
+        else:
+            option_fingerprints.append(hash_values(
+                pd.util.hash_pandas_object(option_bom).tolist(),
+                list(option_bom.columns)
+            ))
+    return hash_values('bom', Extractor.element_id_format, option_fingerprints)
+
+
+def _stage_fingerprint(stage_key: str, stage, bom_path: Path, upstream_paths: list,
+                       background_hashes: dict) -> str:
+    """Fingerprint the bill of materials, background workbooks and upstream outputs of a stage."""
+    for background_dataset in stage.calculator.background_datasets:
+        if background_dataset not in background_hashes:
+            background_hashes[background_dataset] = hash_file(
+                bgd.BACKGROUND_DATA_DIRECTORY.joinpath(background_dataset)
+            )
+    return hash_values(
+        stage_key,
+        hash_file(bom_path),
+        [background_hashes[name] for name in stage.calculator.background_datasets],
+        [hash_file(path) if path.exists() else None for path in upstream_paths]
+    )
+
+
+def _sparse_fingerprint(sparse_key: str, graph, template_model: str, tm_directory: Path) -> str:
+    """Fingerprint the stage csvs the sparse impacts of a graph are built from.
+
+    The elements file is fingerprinted along with them, as the manifest records the values
+    file only.
+    """
+    elements_path, _ = graph.sparse_paths(template_model, tm_directory)
+    stage_paths = [
+        graph.output_path(template_model, stage.name, tm_directory) for stage in graph.stages
+    ]
+    return hash_values(
+        sparse_key,
+        [hash_file(path) if path.exists() else None for path in stage_paths],
+        hash_file(elements_path) if elements_path.exists() else None
+    )
+
+
+def _record_stage(template_model: str, graph, stage, manifest: BuildManifest,
+                  tm_directory: Path, background_hashes: dict) -> None:
+    """Record the fingerprint of a written stage output, once the upstream outputs are written."""
+    bom_path = tm_directory.joinpath(f'{template_model}/bom/{template_model}_bom.csv')
+    upstream_paths = [
+        IMPACT_STAGE_GRAPH.output_path(template_model, dependency, tm_directory)
+        for dependency in stage.dependencies
+    ]
+    stage_key = f'{graph.output_directory_name}/{stage.name}'
+    manifest.record(
+        template_model,
+        stage_key,
+        _stage_fingerprint(stage_key, stage, bom_path, upstream_paths, background_hashes),
+        graph.output_path(template_model, stage.name, tm_directory)
+    )
+
+
+def _record_sparse(template_model: str, graph, manifest: BuildManifest,
+                   tm_directory: Path) -> None:
+    """Record the fingerprint of written sparse impacts, once the stage csvs are written."""
+    sparse_key = f'{graph.output_directory_name}/sparse'
+    _, values_path = graph.sparse_paths(template_model, tm_directory)
+    if values_path.exists():
+        manifest.record(
+            template_model,
+            sparse_key,
+            _sparse_fingerprint(sparse_key, graph, template_model, tm_directory),
+            values_path
+        )
+
+
+def _frontend_fingerprint(manifest: BuildManifest, template_model_list: list) -> str:
+    """Fingerprint the combined frontend files by the manifest entries of every template model."""
+    return hash_values(
+        'frontend',
+        {
+            template_model: manifest.entries.get(template_model)
+            for template_model in sorted(template_model_list)
+        }
+    )
+
+
+def rebuild_template_model(template_model: str, Extractor: TemplateModelExtractor,
+                           manifest: BuildManifest, tm_directory: Path,
+                           background_hashes: dict, dry_run: bool = False) -> list:
+    """Rebuild the stale outputs of one template model.
+
+    Args:
+        template_model (str): name of template model
+        Extractor (TemplateModelExtractor): extractor with grouped raw bill of materials
+        manifest (BuildManifest): build manifest, updated with every rebuilt output
+        tm_directory (Path): directory holding the template model directories
+        background_hashes (dict): fingerprints of background workbooks, filled as needed
+        dry_run (bool, optional): only report stale stages. Defaults to False.
+
+    Returns:
+        list: stale stages of the template model, e.g. 'impacts/replacement'
+    """
+    stale_stages = []
+
+    bom_path = tm_directory.joinpath(f'{template_model}/bom/{template_model}_bom.csv')
+    bom_fingerprint = _bom_fingerprint(Extractor, template_model)
+    if not manifest.is_fresh(template_model, 'bom', bom_fingerprint, bom_path):
+        stale_stages.append('bom')
+        if not dry_run:
+            Extractor.write_bill_of_materials(
+                bom_path.parent,
+                f'{template_model}_bom',
+                bill_of_materials=Extractor.get_bill_of_materials(template_model)
+            )
+            manifest.record(template_model, 'bom', bom_fingerprint, bom_path)
+
+    # prebuilt scenarios build on the template model impacts, never on each other
+    rebuilt_impacts = {}
+    for graph in STAGE_GRAPHS.values():
+        graph_stale_stages = []
+        for stage in graph.ordered_stages():
+            stage_key = f'{graph.output_directory_name}/{stage.name}'
+            upstream_paths = [
+                IMPACT_STAGE_GRAPH.output_path(template_model, dependency, tm_directory)
+                for dependency in stage.dependencies
+            ]
+            stage_fingerprint = _stage_fingerprint(
+                stage_key, stage, bom_path, upstream_paths, background_hashes
+            )
+            output_path = graph.output_path(template_model, stage.name, tm_directory)
+            upstream_stale = any(
+                f'impacts/{dependency}' in stale_stages for dependency in stage.dependencies
+            )
+            if upstream_stale or 'bom' in stale_stages or not manifest.is_fresh(
+                template_model, stage_key, stage_fingerprint, output_path
+            ):
+                stale_stages.append(stage_key)
+                graph_stale_stages.append(stage)
+        if not dry_run and graph_stale_stages:
+            results = graph.run(
+                template_model,
+                upstream_impacts=rebuilt_impacts,
+                stage_names=[stage.name for stage in graph_stale_stages]
+            )
+            graph.write(template_model, results, tm_directory)
+            if graph is IMPACT_STAGE_GRAPH:
+                rebuilt_impacts = results
+            # fingerprints are recorded once the upstream outputs they include are written
+            for stage in graph_stale_stages:
+                _record_stage(
+                    template_model, graph, stage, manifest, tm_directory, background_hashes
+                )
+
+        # sparse impacts are built from the stage csvs, which are all written at this point
+        sparse_key = f'{graph.output_directory_name}/sparse'
+        _, values_path = graph.sparse_paths(template_model, tm_directory)
+        if graph_stale_stages or not manifest.is_fresh(
+            template_model,
+            sparse_key,
+            _sparse_fingerprint(sparse_key, graph, template_model, tm_directory),
+            values_path
+        ):
+            stale_stages.append(sparse_key)
+            if dry_run:
+                continue
+            if not graph_stale_stages:
+                graph.write_sparse(template_model, {}, tm_directory)
+            _record_sparse(template_model, graph, manifest, tm_directory)
+
+    return stale_stages
+
+
+def rebuild(dry_run: bool = False) -> dict:
+    """Rebuild the stale outputs of every template model and the combined frontend files.
+
+    Args:
+        dry_run (bool, optional): only report stale stages. Defaults to False.
+
+    Returns:
+        dict: stale stages keyed by template model, or 'frontend' for the combined files
+    """
+    tm_directory = MAIN_DIRECTORY.joinpath('data/template_models')
+    raw_bom_path = MAIN_DIRECTORY.joinpath('data/raw/raw_boms.xlsx')
+    frontend_directory = MAIN_DIRECTORY.joinpath('data/frontend')
+
+    manifest = BuildManifest(MANIFEST_PATH)
+    manifest.load()
+
+    template_model_list = []
+    for temp_model in tm_directory.glob("*"):
+        if '.gitkeep' not in temp_model.name:
+            template_model_list.append(temp_model.name)
+
+    Extractor = TemplateModelExtractor()
+    Extractor.load_template_model(
+        file_path=raw_bom_path
+    )
+    Extractor.group_options()
+
+    background_hashes = {}
+    stale = {}
+    for template_model in template_model_list:
+        stale_stages = rebuild_template_model(
+            template_model,
+            Extractor,
+            manifest,
+            tm_directory,
+            background_hashes,
+            dry_run=dry_run
+        )
+        if stale_stages:
+            stale[template_model] = stale_stages
+
+    frontend_fingerprint = _frontend_fingerprint(manifest, template_model_list)
+    frontend_output_path = frontend_store('combined_impacts', frontend_directory).dataset_info_path
+    if stale or not manifest.is_fresh(
+        'frontend', 'combine', frontend_fingerprint, frontend_output_path
+    ):
+        stale['frontend'] = ['combine']
+        if not dry_run:
+            create_data_for_frontend()
+            manifest.record('frontend', 'combine', frontend_fingerprint, frontend_output_path)
+
+    if not dry_run:
+        manifest.write()
+    return stale
+
+
+def record_build(template_model_list: list, output_directories: list,
+                 combined: bool = False) -> None:
+    """Record outputs built outside of rebuild, e.g. by pod-lca, in the build manifest.
+
+    The fingerprints of the current outputs are recorded as they are written, so the next
+    rebuild only rebuilds what changed since.
+
+    Args:
+        template_model_list (list): names of template models whose outputs were built
+        output_directories (list): outputs built for every template model, 'bom' and the
+            output_directory_name of STAGE_GRAPHS
+        combined (bool, optional): whether the combined frontend files were built from every
+            template model on disk. Defaults to False.
+    """
+    tm_directory = MAIN_DIRECTORY.joinpath('data/template_models')
+    manifest = BuildManifest(MANIFEST_PATH)
+    manifest.load()
+
+    Extractor = None
+    if 'bom' in output_directories:
+        Extractor = TemplateModelExtractor()
+        Extractor.load_template_model(
+            file_path=MAIN_DIRECTORY.joinpath('data/raw/raw_boms.xlsx')
+        )
+        Extractor.group_options()
+
+    background_hashes = {}
+    for template_model in template_model_list:
+        if Extractor is not None:
+            manifest.record(
+                template_model,
+                'bom',
+                _bom_fingerprint(Extractor, template_model),
+                tm_directory.joinpath(f'{template_model}/bom/{template_model}_bom.csv')
+            )
+        for output_directory, graph in STAGE_GRAPHS.items():
+            if output_directory not in output_directories:
+                continue
+            for stage in graph.ordered_stages():
+                _record_stage(
+                    template_model, graph, stage, manifest, tm_directory, background_hashes
+                )
+            _record_sparse(template_model, graph, manifest, tm_directory)
+
+    if combined:
+        manifest.record(
+            'frontend',
+            'combine',
+            _frontend_fingerprint(manifest, [
+                temp_model.name for temp_model in tm_directory.glob("*")
+                if '.gitkeep' not in temp_model.name
+            ]),
+            frontend_store(
+                'combined_impacts', MAIN_DIRECTORY.joinpath('data/frontend')
+            ).dataset_info_path
+        )
+    manifest.write()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='only report stale template model stages'
+    )
+    args = parser.parse_args()
+    stale_outputs = rebuild(dry_run=args.dry_run)
+    for target, stages in stale_outputs.items():
+        print(f'{target}: {", ".join(stages)}')
+    print(f'{sum(len(stages) for stages in stale_outputs.values())} stale outputs')
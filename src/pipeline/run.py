@@ -0,0 +1,181 @@
+"""Single entry point running the data processing workflow as a dependency graph of stages.
+
+    pod-lca [--models 'STR1_*'] [--stages impacts prebuilt_scenarios] [--workers 4]
+
+runs the selected stages in one process, so imports, the template model list and the
+background datasets are loaded once for every stage, and reports the wall time of each stage.
+"""
+import argparse
+from fnmatch import fnmatch
+from pathlib import Path
+import sys
+from src.combine.combine import create_data_for_frontend
+from src.impact_calculator.calc_impacts import calculate_template_model_impacts
+from src.p_scenario_builder.build_prebuilt_scenarios import build_template_model_scenarios
+from src.pipeline.PipelineDAG import PipelineDAG, PipelineStage
+from src.pipeline.rebuild import record_build
+from src.tm_extractor.extract import extract_bills_of_materials
+import src.utils.background_data as bgd
+import src.utils.columnar_cache as cc
+import src.utils.general as gen
+from src.utils.parallel import run_template_models
+
+MAIN_DIRECTORY = Path(__file__).parents[2]
+TM_DIRECTORY = MAIN_DIRECTORY.joinpath('data/template_models')
+RAW_BOM_PATH = MAIN_DIRECTORY.joinpath('data/raw/raw_boms.xlsx')
+# template model outputs written by the pipeline stages, as recorded in the build manifest
+STAGE_OUTPUTS = {
+    'extract': 'bom',
+    'impacts': 'impacts',
+    'prebuilt_scenarios': 'prebuilt_scenarios',
+}
+
+
+def find_template_models(patterns: list = None) -> list:
+    """Find the template models whose name matches any of a list of glob patterns.
+
+    Args:
+        patterns (list, optional): glob patterns on template model names, e.g. 'STR1_*' or
+            '*_ENCO2_*'. Every template model matches when not provided.
+
+    Returns:
+        list: names of matching template models, sorted
+    """
+    return sorted(
+        temp_model.name for temp_model in TM_DIRECTORY.glob("*")
+        if '.gitkeep' not in temp_model.name
+        and (not patterns or any(fnmatch(temp_model.name, pattern) for pattern in patterns))
+    )
+
+
+def compile_cache(template_model_list: list, max_workers: int) -> dict:
+    """Compile the reference and raw workbooks into the columnar cache."""
+    cc.compile_all_workbooks()
+    return {}
+
+
+def extract(template_model_list: list, max_workers: int) -> dict:
+    """Extract the bills of materials of the template models."""
+    extract_bills_of_materials(
+        template_model_list=template_model_list,
+        raw_bom_path=RAW_BOM_PATH,
+        tm_directory=TM_DIRECTORY
+    )
+    return {}
+
+
+def calculate_impacts(template_model_list: list, max_workers: int) -> dict:
+    """Calculate the impacts of every life cycle stage of the template models."""
+    return run_template_models(
+        calculate_template_model_impacts,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=TM_DIRECTORY
+    )
+
+
+def build_prebuilt_scenarios(template_model_list: list, max_workers: int) -> dict:
+    """Build the prebuilt scenarios of the template models."""
+    return run_template_models(
+        build_template_model_scenarios,
+        template_model_list,
+        max_workers=max_workers,
+        tm_directory=TM_DIRECTORY
+    )
+
+
+def combine(template_model_list: list, max_workers: int) -> dict:
+    """Combine the outputs of every template model on disk into the frontend datasets."""
+    for dataset_name, rows in create_data_for_frontend(streaming=True).items():
+        unit = 'values' if dataset_name in ['impact_tensor', 'sparse_impacts'] else 'rows'
+        print(f'{dataset_name}: {rows} {unit} written')
+    return {}
+
+
+PIPELINE = PipelineDAG(
+    stages=[
+        PipelineStage('cache', compile_cache, per_template_model=False),
+        PipelineStage('extract', extract, dependencies=['cache']),
+        PipelineStage('impacts', calculate_impacts, dependencies=['extract']),
+        PipelineStage('prebuilt_scenarios', build_prebuilt_scenarios, dependencies=['impacts']),
+        PipelineStage(
+            'combine',
+            combine,
+            dependencies=['extract', 'impacts', 'prebuilt_scenarios'],
+            per_template_model=False
+        ),
+    ]
+)
+
+
+def print_report(report: dict) -> None:
+    """Print the wall time, template models and failures of every stage that ran."""
+    print('\nstage                wall_time_s  template_models  failures')
+    for stage_name, stage_report in report.items():
+        template_models = stage_report['template_models']
+        print(
+            f'{stage_name:<20} {stage_report["wall_time_s"]:>11.2f}  '
+            f'{"all" if template_models is None else template_models:>15}  '
+            f'{len(stage_report["failures"]):>8}'
+        )
+    print(f'total                {sum(r["wall_time_s"] for r in report.values()):>11.2f}')
+    peak_memory = gen.peak_memory_mb()
+    if peak_memory is not None:
+        print(f'Peak memory: {peak_memory:.1f} MB')
+
+
+def main(argv: list = None) -> int:
+    """Run the pipeline from the command line.
+
+    Args:
+        argv (list, optional): command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: exit code, 1 if any template model failed
+    """
+    parser = argparse.ArgumentParser(prog='pod-lca', description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--models',
+        nargs='+',
+        default=None,
+        help="glob patterns of template models to run, e.g. 'STR1_*' '*_ENCO2_*'"
+    )
+    parser.add_argument(
+        '--stages',
+        nargs='+',
+        default=None,
+        choices=PIPELINE.stage_names,
+        help='stages to run, in dependency order whatever the order given. Defaults to all'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='number of worker processes of the template model stages'
+    )
+    args = parser.parse_args(argv)
+
+    template_model_list = find_template_models(args.models)
+    if not template_model_list:
+        parser.error(f'No template model matches {args.models}')
+    print(f'{len(template_model_list)} template models')
+
+    report = PIPELINE.run(template_model_list, stage_names=args.stages, max_workers=args.workers)
+    print_report(report)
+    print(f'Background data cache: {bgd.registry.stats()}')
+
+    # outputs of template models that failed a stage are left for the next rebuild
+    failed = set()
+    for stage_report in report.values():
+        failed.update(stage_report['failures'])
+    record_build(
+        [template_model for template_model in template_model_list
+         if template_model not in failed],
+        [STAGE_OUTPUTS[stage_name] for stage_name in report if stage_name in STAGE_OUTPUTS],
+        combined='combine' in report and not failed
+    )
+    return int(bool(failed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
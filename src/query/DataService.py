@@ -0,0 +1,228 @@
+"""Definition of the asyncio data service serving the combined frontend artifacts.
+
+The service loads the impact cubes and impact tensors written by combine into an immutable
+snapshot and watches the files marking them complete. Once a rebuild has finished and the
+files have stopped changing, a new snapshot is loaded in a worker thread and swapped in with a
+single reference assignment. Queries run against the snapshot current when they start, so a
+rebuild never exposes half-written data and never blocks the event loop.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+import time
+import pandas as pd
+from src.query.ImpactCubes import ImpactCubes
+from src.query.ImpactTensor import ImpactTensor
+
+FRONTEND_DIRECTORY = Path(__file__).parents[2].joinpath('data/frontend')
+# combined datasets whose _dataset.json marks a finished rebuild
+COMBINED_DATASETS = ['combined_bom', 'combined_impacts', 'combined_prebuilt_scenarios']
+TENSOR_NAMES = ['combined_impacts', 'combined_prebuilt_scenarios']
+
+
+def artifact_paths(frontend_directory: Path) -> list:
+    """List the files marking the combined artifacts complete.
+
+    Args:
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Returns:
+        list: file paths of the dataset jsons, impact cubes and impact tensor sidecars
+    """
+    return (
+        [frontend_directory.joinpath(f'{name}/_dataset.json') for name in COMBINED_DATASETS]
+        + sorted(frontend_directory.joinpath('impact_cubes').glob('*.parquet'))
+        + [frontend_directory.joinpath(f'impact_tensor/{name}.json') for name in TENSOR_NAMES]
+    )
+
+
+def artifact_version(frontend_directory: Path) -> tuple:
+    """Fingerprint the combined artifacts by the modification time and size of their markers.
+
+    Args:
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Returns:
+        tuple: (file name, modification time, size) of every marker, None for missing markers
+    """
+    version = []
+    for path in artifact_paths(frontend_directory):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            version.append((str(path), None, None))
+        else:
+            version.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Combined artifacts loaded together, never modified once loaded.
+
+    Attr:
+        version (tuple): artifact_version the snapshot was loaded at
+        cubes (ImpactCubes): impact rollup cubes
+        tensors (dict): memory-mapped ImpactTensor of every combined dataset, keyed by name
+        loaded_at (float): time the snapshot was loaded, as time.time()
+    """
+    version: tuple
+    cubes: ImpactCubes
+    tensors: dict
+    loaded_at: float
+
+
+def load_snapshot(frontend_directory: Path) -> DataSnapshot:
+    """Load the combined artifacts of the frontend directory.
+
+    Args:
+        frontend_directory (Path): directory holding the frontend datasets
+
+    Raises:
+        FileNotFoundError: Raised if an artifact is missing, e.g. while combine replaces it
+        ValueError: Raised if an impact tensor does not match its sidecar
+
+    Returns:
+        DataSnapshot: artifacts with the version they were loaded at
+    """
+    version = artifact_version(frontend_directory)
+    missing = [path for path, mtime, _ in version if mtime is None]
+    if missing:
+        raise FileNotFoundError(f'Combined artifacts are missing: {missing}')
+    snapshot = DataSnapshot(
+        version=version,
+        cubes=ImpactCubes.read(frontend_directory.joinpath('impact_cubes')),
+        tensors={
+            name: ImpactTensor.open(frontend_directory.joinpath('impact_tensor'), name)
+            for name in TENSOR_NAMES
+        },
+        loaded_at=time.time()
+    )
+    # a rebuild that replaced files while they were read is loaded again on the next poll
+    if artifact_version(frontend_directory) != version:
+        raise FileNotFoundError('Combined artifacts changed while they were loaded')
+    return snapshot
+
+
+@dataclass
+class DataService:
+    """Serve aggregate queries from the latest complete combined artifacts.
+
+    Attr:
+        frontend_directory (Path): directory holding the frontend datasets
+        poll_interval (float): seconds between checks of the artifact markers
+        reloads (int): number of snapshots swapped in
+        last_error (Exception): latest failure to load a snapshot, None after a success
+    """
+    frontend_directory: Path = FRONTEND_DIRECTORY
+    poll_interval: float = 1.0
+    reloads: int = 0
+    last_error: Exception = None
+    _snapshot: DataSnapshot = field(default=None, init=False, repr=False)
+    _watcher: asyncio.Task = field(default=None, init=False, repr=False)
+    _reload_lock: asyncio.Lock = field(default=None, init=False, repr=False)
+
+    @property
+    def snapshot(self) -> DataSnapshot:
+        """Snapshot queries are served from.
+
+        Raises:
+            RuntimeError: Raised if no snapshot has been loaded yet
+        """
+        if self._snapshot is None:
+            raise RuntimeError('No combined artifacts loaded, start the service first')
+        return self._snapshot
+
+    async def start(self) -> None:
+        """Load the current artifacts and start watching them for rebuilds.
+
+        Raises:
+            FileNotFoundError: Raised if the combined artifacts have not been built yet
+        """
+        self._reload_lock = asyncio.Lock()
+        if not await self.reload():
+            raise self.last_error
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop watching the artifacts."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def __aenter__(self) -> 'DataService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback) -> None:
+        await self.stop()
+
+    async def reload(self) -> bool:
+        """Load the artifacts in a worker thread and swap them in if they are complete.
+
+        Returns:
+            bool: whether a new snapshot was swapped in
+        """
+        async with self._reload_lock:
+            try:
+                snapshot = await asyncio.to_thread(load_snapshot, self.frontend_directory)
+            except (OSError, ValueError) as error:
+                # the previous snapshot keeps serving until the rebuild is complete
+                self.last_error = error
+                return False
+            self._snapshot = snapshot
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    async def _watch(self) -> None:
+        """Reload once the artifact markers changed and then held still for a poll interval."""
+        pending_version = None
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            version = await asyncio.to_thread(artifact_version, self.frontend_directory)
+            if version == self._snapshot.version:
+                pending_version = None
+            elif version != pending_version:
+                # combine is still writing, wait until the markers settle
+                pending_version = version
+            else:
+                await self.reload()
+
+    async def lookup(self, cube: str, **keys) -> pd.Series:
+        """Look up the impacts of one row of a cube, see ImpactCubes.lookup."""
+        return self.snapshot.cubes.lookup(cube, **keys)
+
+    async def select(self, cube: str, **filters) -> pd.DataFrame:
+        """Select rows of a cube, see ImpactCubes.select."""
+        return self.snapshot.cubes.select(cube, **filters)
+
+    async def query(self, function, *args, **kwargs):
+        """Run an aggregate query in a worker thread against the current snapshot.
+
+        Args:
+            function (callable): called as function(snapshot, *args, **kwargs)
+            *args: positional arguments of function
+            **kwargs: keyword arguments of function
+
+        Returns:
+            result of function
+        """
+        return await asyncio.to_thread(function, self.snapshot, *args, **kwargs)
+
+    async def tensor_select(self, name: str, **labels):
+        """Select impacts of an impact tensor in a worker thread, see ImpactTensor.select.
+
+        Args:
+            name (str): name of tensor, e.g. 'combined_impacts'
+            **labels: label, or list of labels, of any axis of the tensor
+
+        Returns:
+            np.ndarray: selected impacts, copied out of the memory-mapped file
+        """
+        tensor = self.snapshot.tensors[name]
+        return await asyncio.to_thread(lambda: tensor.select(**labels).copy())
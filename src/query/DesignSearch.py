@@ -0,0 +1,238 @@
+"""Definition of the search for the lowest impact combinations of building system options.
+
+Constraints on project metadata columns, e.g. structural_material or glazing_type, are
+translated into the options of the subsystem that sets the column, so infeasible options are
+removed before the search. The remaining combinations are searched branch and bound: options
+are tried from lowest to highest impact, and a branch is cut as soon as the impact of its
+options so far plus the lowest impact of the remaining subsystems cannot beat the k-th best
+combination found.
+"""
+from dataclasses import dataclass, field
+import heapq
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.impact_calculator.DesignSpace import DesignSpace
+
+PROJECT_METADATA_PATH = Path(__file__).parents[2].joinpath('data/frontend/project_metadata.csv')
+
+
+def option_attributes(project_metadata: pd.DataFrame, design_space: DesignSpace) -> dict:
+    """Find the metadata columns set by the option of a single subsystem.
+
+    A column is set by a subsystem when all template models sharing an option of the subsystem
+    share its value, e.g. glazing_type is set by the translucent enclosure option.
+
+    Args:
+        project_metadata (pd.DataFrame): project metadata with a template_model column
+        design_space (DesignSpace): options of every subsystem
+
+    Returns:
+        dict: subsystem and value of every option, keyed by metadata column
+    """
+    template_model_options = project_metadata['template_model'].str.split('_', expand=True)
+    attributes = {}
+    for column in project_metadata.columns.drop('template_model'):
+        for position, subsystem in enumerate(design_space.subsystems):
+            option_values = project_metadata.groupby(
+                template_model_options[position]
+            )[column].unique()
+            if (option_values.str.len() == 1).all():
+                attributes[column] = (subsystem, option_values.str[0].to_dict())
+                break
+    return attributes
+
+
+@dataclass
+class DesignSearch:
+    """Top-k search of the lowest impact template models of a design space under constraints.
+
+    Attr:
+        design_space (DesignSpace): impacts of the options of every subsystem
+        project_metadata (pd.DataFrame): project metadata of the built template models
+        nodes_visited (int): partial combinations expanded by the latest search
+    """
+    design_space: DesignSpace
+    project_metadata: pd.DataFrame
+    nodes_visited: int = 0
+    _attributes: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._attributes = option_attributes(self.project_metadata, self.design_space)
+
+    @property
+    def constraint_columns(self) -> list:
+        """Metadata columns that can constrain the search."""
+        return list(self._attributes.keys())
+
+    def constraint_values(self, column: str, values) -> set:
+        """Read the allowed values of a constraint as values of the metadata column.
+
+        Values of numeric columns may be given as strings, e.g. '6' from the command line.
+
+        Args:
+            column (str): metadata column, e.g. 'stories_above_grade'
+            values: allowed value, or list of allowed values
+
+        Raises:
+            ValueError: Raised if a value of a numeric column is not a number
+
+        Returns:
+            set: allowed values, comparable with the values of the column
+        """
+        if isinstance(values, str) or np.ndim(values) == 0:
+            values = [values]
+        if pd.api.types.is_numeric_dtype(self.project_metadata[column]):
+            values = pd.to_numeric(pd.Series(list(values), dtype=object)).tolist()
+        return set(values)
+
+    def allowed_options(self, constraints: dict) -> dict:
+        """Find the options of every subsystem meeting metadata constraints.
+
+        Options that appear in no built template model have no metadata, and are only allowed
+        when their subsystem is unconstrained.
+
+        Args:
+            constraints (dict): allowed value, or list of allowed values, keyed by metadata
+                column, e.g. {'structural_material': 'Mass timber'}
+
+        Raises:
+            KeyError: Raised if a constraint column is not set by the option of one subsystem
+            ValueError: Raised if a value of a numeric column is not a number
+
+        Returns:
+            dict: positions of the allowed options of every subsystem, keyed by subsystem
+        """
+        allowed = {
+            subsystem: np.ones(len(options), dtype=bool)
+            for subsystem, options in self.design_space.options.items()
+        }
+        for column, values in constraints.items():
+            if column not in self._attributes:
+                raise KeyError(
+                    f'{column} is not set by a single subsystem, '
+                    f'choose from {self.constraint_columns}'
+                )
+            subsystem, option_values = self._attributes[column]
+            values = self.constraint_values(column, values)
+            allowed[subsystem] &= np.array([
+                option_values.get(option) in values
+                for option in self.design_space.options[subsystem]
+            ])
+        return {
+            subsystem: np.flatnonzero(subsystem_allowed)
+            for subsystem, subsystem_allowed in allowed.items()
+        }
+
+    def top_k(self, k: int = 10, impact_category: str = 'Global Warming Potential_fossil',
+              stages: list = None, max_replacements: float = None,
+              **constraints) -> pd.DataFrame:
+        """Find the k lowest impact template models meeting the constraints.
+
+        Args:
+            k (int, optional): number of template models to find. Defaults to 10.
+            impact_category (str, optional): impact category to minimize. Defaults to
+                'Global Warming Potential_fossil'.
+            stages (list, optional): life cycle stages to add up. Defaults to every stage.
+            max_replacements (float, optional): maximum number of element replacements within
+                the reference study period. Defaults to no maximum.
+            **constraints: allowed value, or list of allowed values, of metadata columns, e.g.
+                structural_material='Mass timber'
+
+        Returns:
+            pd.DataFrame: template_model, impact and number_of_replacements of the template
+                models, lowest impact first
+        """
+        option_totals = self.design_space.subsystem_totals(impact_category, stages)
+        replacements = self.design_space.option_replacements
+        if replacements is None:
+            replacements = {
+                subsystem: np.zeros(len(options))
+                for subsystem, options in self.design_space.options.items()
+            }
+
+        # options of every subsystem from lowest to highest impact, subsystems with the widest
+        # spread of impacts first so that bounds tighten early
+        branches = []
+        for subsystem, positions in self.allowed_options(constraints).items():
+            if len(positions) == 0:
+                return pd.DataFrame(
+                    columns=['template_model', impact_category, 'number_of_replacements']
+                )
+            order = positions[np.argsort(option_totals[subsystem][positions], kind='stable')]
+            branches.append((
+                subsystem,
+                np.asarray(self.design_space.options[subsystem])[order],
+                option_totals[subsystem][order],
+                replacements[subsystem][order]
+            ))
+        branches.sort(key=lambda branch: -np.ptp(branch[2]))
+
+        # lowest impact and fewest replacements the subsystems after every depth can add
+        remaining_impact = np.append(
+            np.cumsum([branch[2][0] for branch in branches][::-1])[::-1], 0
+        )
+        remaining_replacements = np.append(
+            np.cumsum([branch[3].min() for branch in branches][::-1])[::-1], 0
+        )
+
+        # max-heap of the best combinations found, holding (-impact, counter, options, replacements)
+        best = []
+        self.nodes_visited = 0
+
+        def expand(depth: int, impact: float, n_replacements: float, chosen: tuple) -> None:
+            if depth == len(branches):
+                entry = (-impact, self.nodes_visited, chosen, n_replacements)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heappushpop(best, entry)
+                return
+            _, option_names, option_impacts, option_replacements = branches[depth]
+            for option_name, option_impact, option_replacement in zip(
+                option_names, option_impacts, option_replacements
+            ):
+                bound = impact + option_impact + remaining_impact[depth + 1]
+                if len(best) == k and bound >= -best[0][0]:
+                    # options are sorted, so no later option of this subsystem does better
+                    break
+                if max_replacements is not None and (
+                    n_replacements + option_replacement + remaining_replacements[depth + 1]
+                    > max_replacements
+                ):
+                    continue
+                self.nodes_visited += 1
+                expand(
+                    depth + 1,
+                    impact + option_impact,
+                    n_replacements + option_replacement,
+                    chosen + (option_name,)
+                )
+
+        if k > 0:
+            expand(0, 0.0, 0.0, ())
+        subsystem_positions = [
+            self.design_space.subsystems.index(branch[0]) for branch in branches
+        ]
+        rows = []
+        for negative_impact, _, chosen, n_replacements in sorted(best, reverse=True):
+            option_names = [None] * len(chosen)
+            for position, option_name in zip(subsystem_positions, chosen):
+                option_names[position] = option_name
+            rows.append(('_'.join(option_names), -negative_impact, n_replacements))
+        return pd.DataFrame(
+            rows,
+            columns=['template_model', impact_category, 'number_of_replacements']
+        )
+
+
+def load_design_search(design_space: DesignSpace) -> DesignSearch:
+    """Set up the search of a design space with the project metadata of the frontend.
+
+    Args:
+        design_space (DesignSpace): impacts of the options of every subsystem
+
+    Returns:
+        DesignSearch: search constrained by the columns of project_metadata.csv
+    """
+    return DesignSearch(design_space, pd.read_csv(PROJECT_METADATA_PATH))
@@ -0,0 +1,216 @@
+"""Definition of the precomputed impact rollups answering dashboard queries.
+
+Rollup cubes are built once at combine time from the combined impacts, so dashboard callbacks
+look totals up by key instead of grouping the element level rows on every request.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# impact categories written by the impact calculators
+IMPACT_CATEGORIES = [
+    'Global Warming Potential_fossil',
+    'Global Warming Potential_biogenic',
+    'Global Warming Potential_luluc',
+    'Stored Biogenic Carbon',
+    'Acidification Potential',
+    'Eutrophication Potential',
+    'Smog Formation Potential',
+    'Ozone Depletion Potential',
+]
+# dimensions of the finest rollup, every template model cube is rolled up from it
+ROLLUP_DIMENSIONS = ['template_model', 'life_cycle_stage', 'L1', 'L2', 'L3']
+# dimensions of every cube, in key order
+CUBE_DIMENSIONS = {
+    'model': ['template_model'],
+    'stage': ['template_model', 'life_cycle_stage'],
+    'omniclass_l1': ['template_model', 'life_cycle_stage', 'L1'],
+    'omniclass_l2': ['template_model', 'life_cycle_stage', 'L1', 'L2'],
+    'omniclass_l3': ['template_model', 'life_cycle_stage', 'L1', 'L2', 'L3'],
+    'structural_material': ['structural_material', 'life_cycle_stage'],
+}
+
+
+def rollup(impacts: pd.DataFrame, dimensions: list) -> pd.DataFrame:
+    """Sum the impact categories of every combination of dimension values.
+
+    Args:
+        impacts (pd.DataFrame): element level impacts, or a finer rollup
+        dimensions (list): columns to group by
+
+    Returns:
+        pd.DataFrame: dimension columns and summed impact categories, one row per combination
+            present in impacts
+    """
+    return impacts.groupby(
+        dimensions,
+        observed=True,
+        dropna=False,
+        sort=True
+    )[IMPACT_CATEGORIES].sum().reset_index()
+
+
+def template_model_rollup(impacts: pd.DataFrame) -> pd.DataFrame:
+    """Roll the impacts of one or more template models up to the finest cube.
+
+    Rollups of separate template models can be concatenated and handed to
+    ImpactCubes.from_rollup, so the combined impacts never have to be in memory at once.
+
+    Args:
+        impacts (pd.DataFrame): element level impacts with template_model column
+
+    Returns:
+        pd.DataFrame: impacts summed by ROLLUP_DIMENSIONS
+    """
+    return rollup(impacts, ROLLUP_DIMENSIONS)
+
+
+@dataclass
+class ImpactCubes:
+    """Rollup cubes of the combined impacts with a constant time lookup by key.
+
+    The template model cubes hold summed impacts. The structural_material cube holds the mean
+    of the template model stage totals of every structural material of the project metadata,
+    with the number of template models averaged in column template_models.
+
+    Attr:
+        cubes (dict): DataFrame of every cube keyed by the names of CUBE_DIMENSIONS
+    """
+    cubes: dict
+    _row_positions: dict = field(init=False, repr=False)
+    _value_positions: dict = field(init=False, repr=False)
+    _values: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._row_positions = {}
+        self._value_positions = {}
+        self._values = {}
+        for name, cube in self.cubes.items():
+            dimensions = CUBE_DIMENSIONS[name]
+            keys = cube[dimensions].astype(object).itertuples(index=False, name=None)
+            self._row_positions[name] = {key: position for position, key in enumerate(keys)}
+            self._value_positions[name] = {
+                dimension: {
+                    value: np.flatnonzero(cube[dimension].to_numpy() == value)
+                    for value in pd.unique(cube[dimension])
+                }
+                for dimension in dimensions
+            }
+            self._values[name] = cube[IMPACT_CATEGORIES].to_numpy(dtype=float)
+
+    @classmethod
+    def from_rollup(cls, finest_rollup: pd.DataFrame,
+                    project_metadata: pd.DataFrame) -> 'ImpactCubes':
+        """Build every cube from the finest rollup.
+
+        Args:
+            finest_rollup (pd.DataFrame): impacts summed by ROLLUP_DIMENSIONS, see
+                template_model_rollup
+            project_metadata (pd.DataFrame): project metadata with template_model and
+                structural_material columns. Template models missing from it are left out of
+                the structural_material cube.
+
+        Returns:
+            ImpactCubes: cubes of every template model in finest_rollup
+        """
+        cubes = {}
+        for name, dimensions in CUBE_DIMENSIONS.items():
+            if dimensions[0] == 'template_model':
+                cubes[name] = rollup(finest_rollup, dimensions)
+
+        stage_totals = cubes['stage'].astype({'template_model': str}).merge(
+            project_metadata[['template_model', 'structural_material']].astype(str),
+            on='template_model'
+        )
+        structural_material = stage_totals.groupby(
+            ['structural_material', 'life_cycle_stage'],
+            observed=True,
+            sort=True
+        )
+        cubes['structural_material'] = structural_material[IMPACT_CATEGORIES].mean().join(
+            structural_material['template_model'].nunique().rename('template_models')
+        ).reset_index()
+        return cls(cubes)
+
+    @classmethod
+    def read(cls, directory: Path) -> 'ImpactCubes':
+        """Read cubes written by ImpactCubes.write.
+
+        Args:
+            directory (Path): directory holding one parquet file per cube
+
+        Returns:
+            ImpactCubes: cubes found in directory
+        """
+        # pyarrow is imported on first use, so importing the query path stays cheap
+        import pyarrow.parquet as pq
+
+        return cls({
+            name: pq.read_table(directory.joinpath(f'{name}.parquet')).to_pandas()
+            for name in CUBE_DIMENSIONS
+            if directory.joinpath(f'{name}.parquet').exists()
+        })
+
+    def write(self, directory: Path) -> None:
+        """Write every cube to its own parquet file, replacing the file only once it is written.
+
+        Args:
+            directory (Path): directory to write the cubes to
+        """
+        import pyarrow.parquet as pq
+        from src.combine.PartitionedStore import to_table
+
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, cube in self.cubes.items():
+            temp_path = directory.joinpath(f'{name}.parquet.tmp')
+            pq.write_table(to_table(cube), temp_path)
+            temp_path.replace(directory.joinpath(f'{name}.parquet'))
+
+    def lookup(self, cube: str, **keys) -> pd.Series:
+        """Look up the impacts of one row of a cube.
+
+        Args:
+            cube (str): name of cube, e.g. 'stage'
+            **keys: value of every dimension of the cube, e.g.
+                template_model='STR1_ENCO1_ENCT1_ENCR1', life_cycle_stage='A1-A3: Product'
+
+        Raises:
+            KeyError: Raised if the cube or the row does not exist
+
+        Returns:
+            pd.Series: impact categories of the row
+        """
+        key = tuple(keys.get(dimension) for dimension in CUBE_DIMENSIONS[cube])
+        position = self._row_positions[cube][key]
+        return pd.Series(self._values[cube][position], index=IMPACT_CATEGORIES, name=key)
+
+    def select(self, cube: str, **filters) -> pd.DataFrame:
+        """Select the rows of a cube matching a value, or list of values, per dimension.
+
+        Args:
+            cube (str): name of cube, e.g. 'omniclass_l1'
+            **filters: value, or list of values, to keep for a dimension, e.g.
+                template_model='STR1_ENCO1_ENCT1_ENCR1'. Dimensions left out are not filtered.
+
+        Raises:
+            KeyError: Raised if the cube or a filtered dimension does not exist
+
+        Returns:
+            pd.DataFrame: matching rows of the cube, in cube order
+        """
+        positions = None
+        for dimension, values in filters.items():
+            value_positions = self._value_positions[cube][dimension]
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            dimension_positions = np.concatenate(
+                [value_positions.get(value, np.empty(0, dtype=np.intp)) for value in values]
+                + [np.empty(0, dtype=np.intp)]
+            )
+            positions = dimension_positions if positions is None else np.intersect1d(
+                positions, dimension_positions
+            )
+        if positions is None:
+            return self.cubes[cube]
+        return self.cubes[cube].iloc[np.sort(positions)]
@@ -0,0 +1,240 @@
+"""Definition of the memory-mapped impact tensor shared by the frontend worker processes.
+
+The impacts of every template model, life cycle stage and element group are stored as one
+fixed-layout float64 .npy array, next to a small json sidecar holding the labels of every
+axis and the generation of the array it describes. Workers open the array with
+np.load(mmap_mode='r'), so its pages are read from the OS page cache and shared between
+processes instead of copied into every worker.
+"""
+from dataclasses import dataclass, field
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.query.ImpactCubes import IMPACT_CATEGORIES
+
+# element groups are the Omniclass hierarchy of the elements
+ELEMENT_GROUP_COLUMNS = ['L1', 'L2', 'L3']
+TENSOR_AXES = ['template_model', 'life_cycle_stage', 'element_group', 'impact_category']
+
+
+@dataclass
+class ImpactTensor:
+    """Template models x life cycle stages x element groups x impact categories impacts.
+
+    Combinations without elements hold 0.
+
+    Attr:
+        values (np.ndarray): float64 array with one axis per entry of TENSOR_AXES, read-only
+            and memory-mapped when opened from disk
+        labels (dict): labels of every axis keyed by axis name. Element groups are lists of
+            their ELEMENT_GROUP_COLUMNS values.
+    """
+    values: np.ndarray
+    labels: dict
+    _positions: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._positions = {
+            axis: {
+                tuple(label) if isinstance(label, list) else label: position
+                for position, label in enumerate(axis_labels)
+            }
+            for axis, axis_labels in self.labels.items()
+        }
+
+    @classmethod
+    def from_rollup(cls, finest_rollup: pd.DataFrame) -> 'ImpactTensor':
+        """Lay the finest rollup of the impacts out as a tensor.
+
+        Args:
+            finest_rollup (pd.DataFrame): impacts summed by template_model, life_cycle_stage
+                and ELEMENT_GROUP_COLUMNS, see template_model_rollup
+
+        Returns:
+            ImpactTensor: tensor of every template model in finest_rollup
+        """
+        keys = finest_rollup[
+            ['template_model', 'life_cycle_stage'] + ELEMENT_GROUP_COLUMNS
+        ].astype(object).fillna('')
+        element_groups = pd.MultiIndex.from_frame(keys[ELEMENT_GROUP_COLUMNS])
+        axis_indexes = {
+            'template_model': pd.Index(sorted(keys['template_model'].unique())),
+            'life_cycle_stage': pd.Index(sorted(keys['life_cycle_stage'].unique())),
+            'element_group': element_groups.unique().sort_values(),
+            'impact_category': pd.Index(IMPACT_CATEGORIES),
+        }
+        positions = (
+            axis_indexes['template_model'].get_indexer(keys['template_model']),
+            axis_indexes['life_cycle_stage'].get_indexer(keys['life_cycle_stage']),
+            axis_indexes['element_group'].get_indexer(element_groups),
+        )
+        values = np.zeros(tuple(len(axis_index) for axis_index in axis_indexes.values()))
+        np.add.at(values, positions, finest_rollup[IMPACT_CATEGORIES].to_numpy(dtype=float))
+        return cls(
+            values,
+            {
+                axis: [list(label) if isinstance(label, tuple) else label for label in axis_index]
+                for axis, axis_index in axis_indexes.items()
+            }
+        )
+
+    def generation(self) -> str:
+        """Fingerprint the values and labels of the tensor.
+
+        Returns:
+            str: hexadecimal digest naming the array file the tensor is written to
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(np.ascontiguousarray(self.values, dtype=np.float64).tobytes())
+        digest.update(json.dumps(self.labels, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def paths(directory: Path, name: str, generation: str) -> tuple:
+        """Find the array and sidecar file paths of a tensor.
+
+        Args:
+            directory (Path): directory holding the tensors
+            name (str): name of tensor, e.g. 'combined_impacts'
+            generation (str): generation of the array, see ImpactTensor.generation
+
+        Returns:
+            tuple: file path of the .npy array, file path of the json sidecar
+        """
+        return directory.joinpath(f'{name}.{generation}.npy'), directory.joinpath(f'{name}.json')
+
+    def write(self, directory: Path, name: str) -> None:
+        """Write the array and its sidecar, replacing each file only once it is written.
+
+        Every generation of the array is written to a file of its own, named by the generation
+        recorded in the sidecar, so a reader always opens the array its sidecar describes. The
+        sidecar is replaced last, and arrays of earlier generations are removed after it.
+
+        Args:
+            directory (Path): directory to write the tensor to
+            name (str): name of tensor, e.g. 'combined_impacts'
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        generation = self.generation()
+        array_path, sidecar_path = self.paths(directory, name, generation)
+        temp_array_path = array_path.with_name(f'{array_path.name}.tmp')
+        with open(temp_array_path, mode='wb') as file:
+            np.lib.format.write_array(file, np.ascontiguousarray(self.values, dtype=np.float64))
+        temp_array_path.replace(array_path)
+
+        temp_sidecar_path = sidecar_path.with_name(f'{sidecar_path.name}.tmp')
+        with open(temp_sidecar_path, mode='w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'axes': TENSOR_AXES,
+                    'shape': list(self.values.shape),
+                    'dtype': 'float64',
+                    'generation': generation,
+                    'labels': self.labels,
+                },
+                file
+            )
+        temp_sidecar_path.replace(sidecar_path)
+
+        for stale_path in [directory.joinpath(f'{name}.npy'), *directory.glob(f'{name}.*.npy')]:
+            if stale_path == array_path:
+                continue
+            try:
+                stale_path.unlink(missing_ok=True)
+            except OSError:
+                # arrays still memory-mapped by a reader cannot be removed on Windows, they are
+                # removed by the next write instead
+                pass
+
+    @classmethod
+    def open(cls, directory: Path, name: str) -> 'ImpactTensor':
+        """Open a tensor written by ImpactTensor.write without copying it into memory.
+
+        Args:
+            directory (Path): directory holding the tensors
+            name (str): name of tensor, e.g. 'combined_impacts'
+
+        Raises:
+            FileNotFoundError: Raised if the array the sidecar describes was already replaced
+                by a newer generation, e.g. while combine is rewriting the tensor
+            ValueError: Raised if the array does not have the shape recorded in the sidecar
+
+        Returns:
+            ImpactTensor: tensor with a read-only memory-mapped array
+        """
+        sidecar_path = directory.joinpath(f'{name}.json')
+        with open(sidecar_path, mode='r', encoding='utf-8') as file:
+            sidecar = json.load(file)
+        array_path, _ = cls.paths(directory, name, sidecar['generation'])
+        values = np.load(array_path, mmap_mode='r')
+        if list(values.shape) != sidecar['shape']:
+            raise ValueError(
+                f'{array_path} has shape {values.shape}, its sidecar describes {sidecar["shape"]}'
+            )
+        return cls(values, sidecar['labels'])
+
+    def positions(self, axis: str, labels) -> np.ndarray:
+        """Find the positions of labels along an axis.
+
+        Args:
+            axis (str): axis name, one of TENSOR_AXES
+            labels: label, or list of labels. Element groups are (L1, L2, L3) tuples.
+
+        Raises:
+            KeyError: Raised if a label is not on the axis
+
+        Returns:
+            np.ndarray: positions of the labels, a single position for a single label
+        """
+        axis_positions = self._positions[axis]
+        if isinstance(labels, list):
+            return np.array([axis_positions[label] for label in labels], dtype=np.intp)
+        return axis_positions[labels]
+
+    def select(self, **labels) -> np.ndarray:
+        """Select impacts by axis labels, e.g. template_model='STR1_ENCO1_ENCT1_ENCR1'.
+
+        Axes that are not selected are kept whole. Selecting single labels of leading axes
+        returns a view of the memory-mapped array.
+
+        Args:
+            **labels: label, or list of labels, of any axis of TENSOR_AXES
+
+        Raises:
+            KeyError: Raised if an axis or a label is unknown
+
+        Returns:
+            np.ndarray: impacts with one axis per axis selected by a list or not selected
+        """
+        unknown_axes = set(labels) - set(TENSOR_AXES)
+        if unknown_axes:
+            raise KeyError(f'Unknown axes {sorted(unknown_axes)}, choose from {TENSOR_AXES}')
+        selected = self.values
+        # axes are selected last to first, so the positions of earlier axes stay valid
+        for axis_position in reversed(range(len(TENSOR_AXES))):
+            axis = TENSOR_AXES[axis_position]
+            if axis not in labels:
+                continue
+            positions = self.positions(axis, labels[axis])
+            if isinstance(positions, np.ndarray):
+                selected = np.take(selected, positions, axis=axis_position)
+            else:
+                selected = selected[(slice(None),) * axis_position + (positions,)]
+        return selected
+
+    def stage_totals(self, template_model: str) -> pd.DataFrame:
+        """Add up the impacts of the element groups of every stage of a template model.
+
+        Args:
+            template_model (str): name of template model
+
+        Returns:
+            pd.DataFrame: impact categories indexed by life_cycle_stage
+        """
+        return pd.DataFrame(
+            self.select(template_model=template_model).sum(axis=1),
+            index=pd.Index(self.labels['life_cycle_stage'], name='life_cycle_stage'),
+            columns=self.labels['impact_category']
+        )
@@ -0,0 +1,70 @@
+import argparse
+from src.impact_calculator.DesignSpace import load_design_space
+from src.query.DesignSearch import load_design_search
+
+
+def parse_constraints(where: list) -> dict:
+    """Read column=value constraints, repeated columns allowing any of their values.
+
+    Args:
+        where (list): constraints, e.g. ['structural_material=Mass timber']
+
+    Raises:
+        ValueError: Raised if a constraint is not of the form column=value
+
+    Returns:
+        dict: list of allowed values keyed by metadata column
+    """
+    constraints = {}
+    for constraint in where or []:
+        column, separator, value = constraint.partition('=')
+        if not separator:
+            raise ValueError(f'Constraint {constraint} is not of the form column=value')
+        constraints.setdefault(column.strip(), []).append(value.strip())
+    return constraints
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--k',
+        type=int,
+        default=10,
+        help='number of lowest impact template models to find'
+    )
+    parser.add_argument(
+        '--category',
+        default='Global Warming Potential_fossil',
+        help='impact category to minimize'
+    )
+    parser.add_argument(
+        '--stages',
+        nargs='+',
+        default=None,
+        help='life cycle stages to add up, e.g. product replacement. Defaults to all'
+    )
+    parser.add_argument(
+        '--max-replacements',
+        type=float,
+        default=None,
+        help='maximum number of element replacements within the reference study period'
+    )
+    parser.add_argument(
+        '--where',
+        action='append',
+        default=None,
+        help="project metadata constraint, e.g. 'structural_material=Mass timber'. "
+             "Repeat a column to allow several values"
+    )
+    args = parser.parse_args()
+    design_search = load_design_search(load_design_space())
+    top_designs = design_search.top_k(
+        args.k,
+        impact_category=args.category,
+        stages=args.stages,
+        max_replacements=args.max_replacements,
+        **parse_constraints(args.where)
+    )
+    print(top_designs.to_string(index=False))
+    print(f'{design_search.nodes_visited} search nodes expanded, '
+          f'{design_search.design_space.n_combinations} combinations in the design space')
@@ -6,12 +6,19 @@ import src.utils.general as gen
 
 @dataclass
 class TemplateModelExtractor:
-    """Methods for extracting bill of materials from template model"""
+    """Methods for extracting bill of materials from template model
+
+    Attr:
+        element_id_format (str): format of element ids, one of 'string' (Element_N),
+            'integer' or 'categorical'
+    """
     all_str_bom: pd.DataFrame = None
     all_enc_o_bom: pd.DataFrame = None
     all_enc_t_bom: pd.DataFrame = None
     all_enc_r_bom: pd.DataFrame = None
     t_model_df: pd.DataFrame = None
+    option_groups: dict = None
+    element_id_format: str = 'string'
 
     def load_template_model(self, file_path: Path) -> None:
         """_summary_
@@ -19,54 +26,100 @@ class TemplateModelExtractor:
         Args:
             file_path (Path): _description_
         """
-        self.all_str_bom = pd.read_excel(file_path, sheet_name='Structure')
-        self.all_enc_o_bom = pd.read_excel(file_path, sheet_name='Enclosure - Opaque')
-        self.all_enc_t_bom = pd.read_excel(file_path, sheet_name='Enclosure - Translucent')
-        self.all_enc_r_bom = pd.read_excel(file_path, sheet_name='Enclosure - Roofing')
+        self.all_str_bom = gen.read_excel(file_path, sheet_name='Structure')
+        self.all_enc_o_bom = gen.read_excel(file_path, sheet_name='Enclosure - Opaque')
+        self.all_enc_t_bom = gen.read_excel(file_path, sheet_name='Enclosure - Translucent')
+        self.all_enc_r_bom = gen.read_excel(file_path, sheet_name='Enclosure - Roofing')
 
-    def create_bill_of_materials(self, template_model_name: str) -> None:
-        """_summary_
+    def group_options(self) -> None:
+        """Group every sheet of the raw bill of materials by Option.
 
-        Args:
-            cols_to_drop_list (list): _description_
+        Options are unique across sheets (STR, ENCO, ENCT and ENCR prefixes), so the groups of
+        all four sheets are stored in a single dictionary keyed by option name.
         """
-        template_model_name_split = template_model_name.split('_')
+        self.option_groups = {}
+        for all_option_bom in [
+            self.all_str_bom,
+            self.all_enc_o_bom,
+            self.all_enc_t_bom,
+            self.all_enc_r_bom
+        ]:
+            self.option_groups.update(dict(tuple(all_option_bom.groupby('Option', sort=False))))
+
+    def get_bill_of_materials(self, template_model_name: str) -> pd.DataFrame:
+        """Build the bill of materials of a template model from its option groups.
 
-        str_bom_option_name = template_model_name_split[0]
-        enc_o_option_name = template_model_name_split[1]
-        enc_t_option_name = template_model_name_split[2]
-        enc_r_option_name = template_model_name_split[3]
+        Args:
+            template_model_name (str): template model name, e.g. STR1_ENCO1_ENCT1_ENCR1
 
-        str_bom_option = self.all_str_bom[self.all_str_bom['Option'] == str_bom_option_name]
-        enc_o_bom_option = self.all_enc_o_bom[self.all_enc_o_bom['Option'] == enc_o_option_name]
-        enc_t_bom_option = self.all_enc_t_bom[self.all_enc_t_bom['Option'] == enc_t_option_name]
-        enc_r_bom_option = self.all_enc_r_bom[self.all_enc_r_bom['Option'] == enc_r_option_name]
+        Returns:
+            pd.DataFrame: bill of materials indexed by element_index
+        """
+        if self.option_groups is None:
+            self.group_options()
 
+        # options that are missing from the raw bill of materials contribute no elements
+        empty_option = self.all_str_bom.iloc[:0]
         template_model_bom = pd.concat(
             [
-                str_bom_option,
-                enc_o_bom_option,
-                enc_t_bom_option,
-                enc_r_bom_option
+                self.option_groups.get(option_name, empty_option)
+                for option_name in template_model_name.split('_')[:4]
             ]
         )
 
-        template_model_bom['element_index'] = None
-        template_model_bom.reset_index(inplace=True)
-        for row_index in template_model_bom.iterrows():
-            template_model_bom.loc[row_index[0], 'element_index'] = f'Element_{row_index[0]}'
+        template_model_bom = template_model_bom.reset_index()
+        template_model_bom.index = self.create_element_index(len(template_model_bom))
+
+        return template_model_bom
 
-        template_model_bom = template_model_bom.set_index('element_index')
+    def create_element_index(self, number_of_elements: int) -> pd.Index:
+        """Create stable element ids for a bill of materials in a single operation.
 
-        self.t_model_df = template_model_bom
+        Ids follow the position of each element in the bill of materials. The format is set by
+        element_id_format: 'string' gives Element_0, Element_1, ..., 'integer' gives 0, 1, ...
+        and 'categorical' gives the Element_N strings as a categorical index.
+
+        Args:
+            number_of_elements (int): number of elements in the bill of materials
+
+        Raises:
+            ValueError: Raised if element_id_format is not a supported format
+
+        Returns:
+            pd.Index: element ids named element_index
+        """
+        element_numbers = pd.RangeIndex(number_of_elements, name='element_index')
+        if self.element_id_format == 'integer':
+            return element_numbers
+        element_ids = 'Element_' + element_numbers.astype(str)
+        if self.element_id_format == 'string':
+            return element_ids
+        if self.element_id_format == 'categorical':
+            return pd.CategoricalIndex(element_ids, categories=element_ids, name='element_index')
+        raise ValueError(
+            f"element_id_format must be 'string', 'integer' or 'categorical', "
+            f"not '{self.element_id_format}'"
+        )
+
+    def create_bill_of_materials(self, template_model_name: str) -> None:
+        """Build the bill of materials of a template model and store it in t_model_df.
+
+        Args:
+            template_model_name (str): template model name, e.g. STR1_ENCO1_ENCT1_ENCR1
+        """
+        self.t_model_df = self.get_bill_of_materials(template_model_name)
 
-    def write_bill_of_materials(self, file_path: Path, bill_of_materials_name: str) -> None:
+    def write_bill_of_materials(self, file_path: Path, bill_of_materials_name: str,
+                                bill_of_materials: pd.DataFrame = None) -> None:
         """_summary_
 
         Args:
             file_path (Path): _description_
+            bill_of_materials_name (str): file name of bill of materials, without extension
+            bill_of_materials (pd.DataFrame, optional): bill of materials to write.
+                Defaults to t_model_df.
         """
-        df_to_write = self.t_model_df
+        df_to_write = self.t_model_df if bill_of_materials is None else bill_of_materials
         gen.write_to_csv(
             df=df_to_write,
             write_directory=file_path,
@@ -1,5 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from src.tm_extractor.TemplateModelExtractor import TemplateModelExtractor
+from src.utils.profiling import span
+
+
+def extract_bills_of_materials(template_model_list: list, raw_bom_path: Path,
+                               tm_directory: Path, max_workers: int = 4,
+                               element_id_format: str = 'string') -> None:
+    """Extract the bill of materials of many template models in a single pass.
+
+    The raw bill of materials workbook is read and grouped by option once. Every template
+    model bill of materials is then assembled from those groups and written in parallel.
+
+    Args:
+        template_model_list (list): names of template models to extract
+        raw_bom_path (Path): file path of raw bill of materials workbook
+        tm_directory (Path): directory holding the template model directories
+        max_workers (int, optional): number of threads writing bills of materials. Defaults to 4.
+        element_id_format (str, optional): format of element ids, 'string', 'integer' or
+            'categorical'. Defaults to 'string'.
+    """
+    Extractor = TemplateModelExtractor(element_id_format=element_id_format)
+    Extractor.load_template_model(
+        file_path=raw_bom_path
+    )
+    Extractor.group_options()
+
+    def extract_template_model(template_model: str) -> None:
+        with span('template_model', template_model=template_model, task='extract'):
+            Extractor.write_bill_of_materials(
+                tm_directory.joinpath(f'{template_model}/bom'),
+                f'{template_model}_bom',
+                bill_of_materials=Extractor.get_bill_of_materials(template_model)
+            )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # consume the results so that errors raised in worker threads are not swallowed
+        list(executor.map(extract_template_model, template_model_list))
 
 
 def create_bill_of_materials():
@@ -15,20 +52,11 @@ def create_bill_of_materials():
         if '.gitkeep' not in temp_model.name:
             template_model_list.append(temp_model.name)
 
-    for template_model in template_model_list:
-        bom_directory = main_directory.joinpath(f'data/template_models/{template_model}/bom')
-
-        Extractor = TemplateModelExtractor()
-        Extractor.load_template_model(
-            file_path=raw_bom_path
-        )
-        Extractor.create_bill_of_materials(
-            template_model_name=template_model
-        )
-        Extractor.write_bill_of_materials(
-            bom_directory,
-            f'{template_model}_bom'
-        )
+    extract_bills_of_materials(
+        template_model_list=template_model_list,
+        raw_bom_path=raw_bom_path,
+        tm_directory=tm_directory
+    )
 
 
 if __name__ == '__main__':
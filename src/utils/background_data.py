@@ -0,0 +1,142 @@
+"""In-process registry of background datasets shared by every impact calculator."""
+from dataclasses import dataclass, field
+from pathlib import Path
+import pandas as pd
+import src.utils.general as gen
+
+BACKGROUND_DATA_DIRECTORY = Path(__file__).parents[2].joinpath('references/background_data')
+BACKGROUND_DATASETS = [
+    'a1-a3.xlsx',
+    'a4_distances.xlsx',
+    'a4_emissions.xlsx',
+    'a5_wastage.xlsx',
+    'b2-b5.xlsx',
+    'c2-c4.xlsx',
+    'RICS_service_life.xlsx',
+]
+
+
+@dataclass
+class BackgroundDataRegistry:
+    """Load each background workbook once per process.
+
+    Entries are keyed by the resolved file path plus its modification time, so an edited
+    workbook is re-read on the next request while unchanged workbooks are served from memory.
+
+    Attr:
+        datasets (dict): cached DataFrames keyed by (file path, modification time)
+        derived (dict): objects built from cached DataFrames, keyed by (file path,
+            modification time, name)
+        hits (int): number of requests served from the cache
+        misses (int): number of requests that required reading the workbook or building a
+            derived object
+    """
+    datasets: dict = field(default_factory=dict)
+    derived: dict = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def _dataset(self, file_path: Path) -> tuple:
+        """Find the cached DataFrame of a workbook, reading the workbook if it is not cached.
+
+        Args:
+            file_path (Path): resolved file path of background workbook
+
+        Returns:
+            tuple: cached DataFrame, whether the workbook was read
+        """
+        key = (file_path, file_path.stat().st_mtime_ns)
+        if key in self.datasets:
+            return self.datasets[key], False
+        # drop any stale copy of the same workbook before caching the new one
+        for stale_key in [k for k in self.datasets if k[0] == file_path]:
+            del self.datasets[stale_key]
+        self.datasets[key] = gen.read_excel(file_path)
+        return self.datasets[key], True
+
+    def load(self, file_path: Path) -> pd.DataFrame:
+        """Return a copy of the background dataset stored at file_path.
+
+        The copy does not share its values with the cached DataFrame, so callers may modify it
+        in place without affecting later requests. Background datasets have a few hundred rows
+        at most, so copying costs far less than reading the workbook.
+
+        Args:
+            file_path (Path): file path of background workbook to load
+
+        Returns:
+            pd.DataFrame: copy of the cached background dataset
+        """
+        dataset, read = self._dataset(Path(file_path).resolve())
+        if read:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return dataset.copy()
+
+    def derive(self, file_path: Path, name: str, builder) -> object:
+        """Return an object derived from a background dataset, building it once per workbook.
+
+        Derived objects, e.g. factor matrices, are cached alongside the dataset they are built
+        from and are rebuilt when the workbook changes. Building counts as a miss, whether or
+        not the dataset itself was cached.
+
+        Args:
+            file_path (Path): file path of background workbook the object is derived from
+            name (str): name identifying the derived object
+            builder (callable): function building the derived object from a copy of the dataset
+
+        Returns:
+            object: derived object, shared between callers and not to be modified
+        """
+        file_path = Path(file_path).resolve()
+        key = (file_path, file_path.stat().st_mtime_ns, name)
+        if key in self.derived:
+            self.hits += 1
+        else:
+            self.misses += 1
+            for stale_key in [k for k in self.derived if k[0] == file_path and k[2] == name]:
+                del self.derived[stale_key]
+            dataset, _ = self._dataset(file_path)
+            self.derived[key] = builder(dataset.copy())
+        return self.derived[key]
+
+    def stats(self) -> dict:
+        """Report cache usage.
+
+        Returns:
+            dict: hit count, miss count and number of cached workbooks
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.datasets)
+        }
+
+    def clear(self) -> None:
+        """Drop all cached workbooks and reset the hit/miss counters."""
+        self.datasets.clear()
+        self.derived.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+registry = BackgroundDataRegistry()
+
+
+def load_background_dataset(file_path: Path) -> pd.DataFrame:
+    """Load a background dataset through the shared process-wide registry.
+
+    Args:
+        file_path (Path): file path of background workbook to load
+
+    Returns:
+        pd.DataFrame: copy of the cached background dataset
+    """
+    return registry.load(file_path)
+
+
+def preload_background_datasets() -> None:
+    """Load every background dataset used by the calculators into the shared registry."""
+    for background_dataset in BACKGROUND_DATASETS:
+        registry.load(BACKGROUND_DATA_DIRECTORY.joinpath(background_dataset))
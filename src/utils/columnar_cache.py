@@ -0,0 +1,181 @@
+"""Compiled columnar (Parquet) cache of Excel workbooks used in the data processing workflow.
+
+Every sheet of a workbook is compiled into its own Parquet file under CACHE_DIRECTORY. A cached
+workbook is used only while it is newer than its source, so editing a workbook automatically
+invalidates its compiled copy.
+"""
+from functools import partial
+from hashlib import sha1
+import json
+import os
+from pathlib import Path
+import tempfile
+import pandas as pd
+
+CACHE_DIRECTORY = Path(__file__).parents[2].joinpath('data/interim/columnar_cache')
+WORKBOOK_DIRECTORIES = ['references/background_data', 'data/raw']
+
+
+def workbook_cache_directory(file_path: Path) -> Path:
+    """Find the cache directory of a workbook.
+
+    Args:
+        file_path (Path): file path of source workbook
+
+    Returns:
+        Path: directory holding the compiled sheets of the workbook
+    """
+    file_path = Path(file_path).resolve()
+    path_hash = sha1(str(file_path).encode('utf-8')).hexdigest()[:8]
+    return CACHE_DIRECTORY.joinpath(f'{file_path.stem}-{path_hash}')
+
+
+def is_fresh(file_path: Path) -> bool:
+    """Check whether the compiled copy of a workbook is newer than the workbook itself.
+
+    Args:
+        file_path (Path): file path of source workbook
+
+    Returns:
+        bool: True if the compiled copy can be used in place of the workbook
+    """
+    sheet_index_path = workbook_cache_directory(file_path).joinpath('sheets.json')
+    if not sheet_index_path.exists():
+        return False
+    return sheet_index_path.stat().st_mtime_ns > Path(file_path).stat().st_mtime_ns
+
+
+def _to_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """Store object columns holding mixed value types (e.g. '242?' next to 239) as strings.
+
+    Missing values of object columns are None, as read back from parquet.
+    """
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        values = df[column].dropna()
+        if values.map(type).nunique() > 1:
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+        df[column] = df[column].where(df[column].notna(), None)
+    df.columns = [str(column) for column in df.columns]
+    return df
+
+
+def _write_replacing(file_path: Path, write) -> None:
+    """Write a file to a temporary file in the same directory and move it into place.
+
+    Readers, and other processes compiling the same workbook, see either the previous or the
+    new file, never a partly written one.
+
+    Args:
+        file_path (Path): file path to write
+        write (callable): function writing the file, called with the temporary file path
+    """
+    file_descriptor, temp_name = tempfile.mkstemp(
+        dir=file_path.parent, prefix=f'{file_path.name}.', suffix='.tmp'
+    )
+    os.close(file_descriptor)
+    temp_path = Path(temp_name)
+    try:
+        write(temp_path)
+        os.replace(temp_path, file_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def _write_sheet_index(file_path: Path, sheet_index: dict) -> None:
+    with open(file_path, mode='w', encoding='utf-8') as file:
+        json.dump(sheet_index, file)
+
+
+def compile_workbook(file_path: Path, sheets: dict = None) -> bool:
+    """Compile every sheet of a workbook into the columnar cache.
+
+    Args:
+        file_path (Path): file path of source workbook
+        sheets (dict, optional): already parsed sheets of the workbook, keyed by sheet name.
+            The workbook is parsed when not provided.
+
+    Returns:
+        bool: True if the workbook was compiled, False if the cache could not be written
+    """
+    if sheets is None:
+        sheets = pd.read_excel(file_path, sheet_name=None)
+    cache_directory = workbook_cache_directory(file_path)
+    try:
+        cache_directory.mkdir(parents=True, exist_ok=True)
+        for sheet_position, df in enumerate(sheets.values()):
+            _write_replacing(
+                cache_directory.joinpath(f'sheet_{sheet_position}.parquet'),
+                partial(_to_columnar(df).to_parquet, index=False)
+            )
+        # the sheet index is written last, it marks the cache as complete
+        _write_replacing(
+            cache_directory.joinpath('sheets.json'),
+            partial(
+                _write_sheet_index,
+                sheet_index={'source': str(Path(file_path).resolve()), 'sheets': list(sheets)}
+            )
+        )
+    except (ImportError, OSError, TypeError, ValueError):
+        return False
+    return True
+
+
+def read_sheet(file_path: Path, sheet_name: str | int = 0) -> pd.DataFrame:
+    """Read one sheet of a workbook through the columnar cache.
+
+    The compiled sheet is read when it is fresh. Otherwise the whole workbook is parsed once,
+    recompiled, and the requested sheet is returned from the parsed workbook.
+
+    Args:
+        file_path (Path): file path of source workbook
+        sheet_name (str | int, optional): name or position of sheet to read. Defaults to 0.
+
+    Raises:
+        ValueError: Raised if the sheet does not exist in the workbook
+
+    Returns:
+        pd.DataFrame: DataFrame of the requested sheet
+    """
+    if is_fresh(file_path):
+        cache_directory = workbook_cache_directory(file_path)
+        with open(cache_directory.joinpath('sheets.json'), mode='r', encoding='utf-8') as file:
+            sheet_names = json.load(file)['sheets']
+        sheet_position = _sheet_position(sheet_names, sheet_name)
+        try:
+            return pd.read_parquet(cache_directory.joinpath(f'sheet_{sheet_position}.parquet'))
+        except (ImportError, OSError, ValueError):
+            # a truncated or corrupt sheet raises pyarrow.ArrowInvalid, a ValueError, and is
+            # recompiled from the workbook below
+            pass
+
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    compile_workbook(file_path, sheets)
+    # converted as the cached sheets are, so the result does not depend on the cache state
+    return _to_columnar(list(sheets.values())[_sheet_position(list(sheets), sheet_name)])
+
+
+def _sheet_position(sheet_names: list, sheet_name: str | int) -> int:
+    if isinstance(sheet_name, int):
+        if sheet_name >= len(sheet_names):
+            raise ValueError(f'Worksheet index {sheet_name} is invalid')
+        return sheet_name
+    if sheet_name not in sheet_names:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheet_names.index(sheet_name)
+
+
+def compile_all_workbooks() -> None:
+    """Compile every reference workbook and the raw bill of materials workbook."""
+    main_directory = Path(__file__).parents[2]
+    for workbook_directory in WORKBOOK_DIRECTORIES:
+        for workbook in main_directory.joinpath(workbook_directory).glob('*.xlsx'):
+            # skip lock files left behind by open workbooks
+            if workbook.name.startswith('~$'):
+                continue
+            if not is_fresh(workbook):
+                compile_workbook(workbook)
+
+
+if __name__ == '__main__':
+    compile_all_workbooks()
@@ -1,10 +1,14 @@
 """Utility functions for general use in the data processing workflow."""
 from pathlib import Path
+import sys
 import pandas as pd
-import yaml
+import src.utils.columnar_cache as cc
+from src.utils.profiling import profiled
+import src.utils.schema as sch
 # pylint: disable=W0703, W0719
 
 
+@profiled('gen.read_yaml')
 def read_yaml(file_path: Path) -> dict:
     """Read yaml files for general use.
 
@@ -20,6 +24,9 @@ def read_yaml(file_path: Path) -> dict:
         dict: dictionary with yaml information or None if error occurs
         str: Logged information in form of Exception or string
     """
+    # yaml is only needed by the few callers reading yaml files
+    import yaml
+
     try:
         with open(
             file=file_path,
@@ -37,11 +44,17 @@ def read_yaml(file_path: Path) -> dict:
     return yaml_dict
 
 
-def read_csv(file_path: Path) -> pd.DataFrame:
+@profiled('gen.read_csv')
+def read_csv(file_path: Path, apply_schema: bool = False,
+             float_precision: str = None) -> pd.DataFrame:
     """Read csv files for general use.
 
     Args:
         file_path (Path): file path of csv to read
+        apply_schema (bool, optional): convert the categorical columns of the schema to
+            categoricals, see schema.apply_schema. Defaults to False.
+        float_precision (str, optional): float converter of pd.read_csv. 'round_trip' reads
+            back exactly the floats written by write_to_csv. Defaults to None.
 
     Raises:
         PermissionError: Raised if function does not have permission to access file
@@ -54,7 +67,8 @@ def read_csv(file_path: Path) -> pd.DataFrame:
     try:
         df = pd.read_csv(
             file_path,
-            encoding='utf-8'
+            encoding='utf-8',
+            float_precision=float_precision
         )
     except PermissionError as pe:
         raise PermissionError('Try closing out the file you are trying to read') from pe
@@ -63,14 +77,23 @@ def read_csv(file_path: Path) -> pd.DataFrame:
     except Exception as e:
         raise Exception("An unknown error has occured") from e
 
+    if apply_schema:
+        df = sch.apply_schema(df)
     return df
 
 
-def read_excel(file_path: Path) -> pd.DataFrame:
+@profiled('gen.read_excel')
+def read_excel(file_path: Path, sheet_name: str | int = 0,
+               use_cache: bool = True) -> pd.DataFrame:
     """Read excel files for general use.
 
+    When use_cache is True, the sheet is read from the compiled columnar cache if that is newer
+    than the workbook, otherwise the workbook is parsed and the cache refreshed.
+
     Args:
         file_path (Path): file path of excel to read
+        sheet_name (str | int, optional): name or position of sheet to read. Defaults to 0.
+        use_cache (bool, optional): read through the columnar cache. Defaults to True.
 
     Raises:
         PermissionError: Raised if function does not have permission to access file
@@ -81,9 +104,13 @@ def read_excel(file_path: Path) -> pd.DataFrame:
         pd.DataFrame: DataFrame of read excel file
     """
     try:
-        df = pd.read_excel(
-            file_path,
-        )
+        if use_cache:
+            df = cc.read_sheet(file_path, sheet_name)
+        else:
+            df = pd.read_excel(
+                file_path,
+                sheet_name=sheet_name
+            )
     except PermissionError as pe:
         raise PermissionError('Try closing out the file you are trying to read') from pe
     except IOError as io:
@@ -94,6 +121,7 @@ def read_excel(file_path: Path) -> pd.DataFrame:
     return df
 
 
+@profiled('gen.write_to_csv')
 def write_to_csv(df: pd.DataFrame, write_directory: Path,
                  file_name: str):
     """Write to csv for general use.
@@ -126,6 +154,7 @@ def write_to_csv(df: pd.DataFrame, write_directory: Path,
         raise Exception("An unknown error has occured") from e
 
 
+@profiled('gen.write_to_pickle')
 def write_to_pickle(df: pd.DataFrame, write_directory: Path,
                     file_name: str):
     """Write to pickle for general use.
@@ -156,3 +185,26 @@ def write_to_pickle(df: pd.DataFrame, write_directory: Path,
         raise IOError("Trouble writing pickle file") from io
     except Exception as e:
         raise Exception("An unknown error has occured") from e
+
+
+def peak_memory_mb() -> float:
+    """Find the peak resident set size of this process.
+
+    Returns:
+        float: peak resident set size in MB, None if the platform does not report it
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak_rss / (1 << 20) if sys.platform == 'darwin' else peak_rss / (1 << 10)
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory_info = psutil.Process().memory_info()
+    # peak working set on Windows
+    return getattr(memory_info, 'peak_wset', memory_info.rss) / (1 << 20)
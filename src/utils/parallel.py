@@ -0,0 +1,85 @@
+"""Parallel execution of per template model tasks across a process pool."""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+import traceback
+import src.utils.background_data as bgd
+from src.utils.profiling import span
+
+
+def _run_isolated(task, template_model: str, task_kwargs: dict) -> str:
+    """Run a task for one template model, returning the traceback instead of raising.
+
+    Returns:
+        str: formatted traceback if the task failed, None otherwise
+    """
+    try:
+        with span('template_model', template_model=template_model, task=task.__name__):
+            task(template_model, **task_kwargs)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def _report_progress(done: int, total: int, template_model: str, error: str) -> None:
+    status = 'failed' if error is not None else 'done'
+    print(f'[{done}/{total}] {template_model} {status}', flush=True)
+
+
+def run_template_models(task, template_model_list: list, max_workers: int = 1,
+                        **task_kwargs) -> dict:
+    """Run a task for every template model, optionally fanned out across a process pool.
+
+    Background datasets are loaded into the shared registry before the pool starts. Where the
+    platform supports forking, workers inherit the loaded datasets instead of reading them
+    again. Errors are isolated per template model, so one bad bill of materials does not abort
+    the batch.
+
+    Args:
+        task (callable): module-level function called as task(template_model, **task_kwargs)
+        template_model_list (list): names of template models to run the task for
+        max_workers (int, optional): number of worker processes, 1 runs in this process.
+            Defaults to 1.
+        **task_kwargs: additional keyword arguments passed to task
+
+    Returns:
+        dict: formatted traceback of every failed template model, keyed by template model
+    """
+    bgd.preload_background_datasets()
+    total = len(template_model_list)
+    failures = {}
+
+    if max_workers <= 1:
+        for done, template_model in enumerate(template_model_list, start=1):
+            error = _run_isolated(task, template_model, task_kwargs)
+            if error is not None:
+                failures[template_model] = error
+            _report_progress(done, total, template_model, error)
+    else:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+        else:
+            mp_context = None
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=bgd.preload_background_datasets
+        ) as executor:
+            futures = {
+                executor.submit(_run_isolated, task, template_model, task_kwargs): template_model
+                for template_model in template_model_list
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                template_model = futures[future]
+                try:
+                    error = future.result()
+                except Exception:
+                    # the worker itself died, e.g. out of memory
+                    error = traceback.format_exc()
+                if error is not None:
+                    failures[template_model] = error
+                _report_progress(done, total, template_model, error)
+
+    for template_model, error in failures.items():
+        print(f'\n{template_model} failed:\n{error}')
+    print(f'{total - len(failures)} of {total} template models succeeded')
+    return failures
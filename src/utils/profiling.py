@@ -0,0 +1,292 @@
+"""Opt-in timing and memory spans of the data processing workflow.
+
+Profiling is off unless the POD_LCA_PROFILE environment variable is set, to the json lines
+file spans are appended to, or to 1 for DEFAULT_OUTPUT_PATH. POD_LCA_CPROFILE additionally
+dumps a cProfile of the process to the given file. Any pipeline module can be run with
+profiling enabled through
+
+    python -m src.utils.profiling [--output spans.jsonl] [--cprofile run.prof] <module> [args]
+
+Worker processes inherit the environment and append their spans to the same file, tagged with
+the run id of the process that enabled profiling. That process prints a summary of the slowest
+template models and stages of its run on exit.
+"""
+import argparse
+import atexit
+import cProfile
+from contextlib import contextmanager
+import functools
+import inspect
+import json
+import os
+from pathlib import Path
+import runpy
+import sys
+import threading
+import time
+import uuid
+import pandas as pd
+
+PROFILE_ENV_VAR = 'POD_LCA_PROFILE'
+CPROFILE_ENV_VAR = 'POD_LCA_CPROFILE'
+# process id of the process printing the summary, inherited by worker processes
+OWNER_ENV_VAR = 'POD_LCA_PROFILE_OWNER'
+# run id tagging the spans of the owning process and its workers, as the file is appended to
+RUN_ENV_VAR = 'POD_LCA_PROFILE_RUN'
+DEFAULT_OUTPUT_PATH = Path(__file__).parents[2].joinpath('reports/profiling/spans.jsonl')
+
+_state = {'output_path': None, 'profiler': None}
+_local = threading.local()
+
+
+def _resident_memory_mb() -> float:
+    """Read the current resident memory of the process, None where /proc is not available."""
+    try:
+        with open('/proc/self/statm', mode='r', encoding='utf-8') as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def is_enabled() -> bool:
+    """Check whether spans are recorded in this process."""
+    return _state['output_path'] is not None
+
+
+def _profiler_active() -> bool:
+    """Check whether a profiler, e.g. a cProfile started by another caller, is running."""
+    monitoring = getattr(sys, 'monitoring', None)
+    if monitoring is not None and monitoring.get_tool(monitoring.PROFILER_ID) is not None:
+        return True
+    return sys.getprofile() is not None
+
+
+def enable(output_path: Path = None, cprofile_path: Path = None) -> None:
+    """Start recording spans in this process and in the worker processes it starts.
+
+    Args:
+        output_path (Path, optional): json lines file spans are appended to. Defaults to
+            DEFAULT_OUTPUT_PATH.
+        cprofile_path (Path, optional): file the cProfile of this process is dumped to on exit.
+            Defaults to no cProfile.
+    """
+    output_path = Path(output_path or DEFAULT_OUTPUT_PATH)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    _state['output_path'] = output_path
+    os.environ[PROFILE_ENV_VAR] = str(output_path)
+    if OWNER_ENV_VAR not in os.environ:
+        os.environ[OWNER_ENV_VAR] = str(os.getpid())
+        os.environ[RUN_ENV_VAR] = uuid.uuid4().hex
+        atexit.register(_finish, output_path)
+    if cprofile_path is not None:
+        os.environ[CPROFILE_ENV_VAR] = str(cprofile_path)
+        # a second profiler would displace the one already running and overwrite its dump
+        if _state['profiler'] is None and not _profiler_active():
+            _state['profiler'] = cProfile.Profile()
+            _state['profiler'].enable()
+            atexit.register(_dump_cprofile, Path(cprofile_path))
+
+
+def _dump_cprofile(cprofile_path: Path) -> None:
+    _state['profiler'].disable()
+    if os.environ.get(OWNER_ENV_VAR) != str(os.getpid()):
+        cprofile_path = cprofile_path.with_name(
+            f'{cprofile_path.stem}.{os.getpid()}{cprofile_path.suffix}'
+        )
+    cprofile_path.parent.mkdir(parents=True, exist_ok=True)
+    _state['profiler'].dump_stats(cprofile_path)
+
+
+def _finish(output_path: Path) -> None:
+    if os.environ.get(OWNER_ENV_VAR) == str(os.getpid()) and output_path.exists():
+        print(summarize(output_path, run=os.environ.get(RUN_ENV_VAR)))
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record the wall time and memory of a block of code.
+
+    Nothing is recorded when profiling is off.
+
+    Args:
+        name (str): name of the span, e.g. 'calculate_impacts'
+        **attributes: values describing the span, e.g. template_model='STR1_ENCO1_ENCT1_ENCR1'
+    """
+    if not is_enabled():
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    start_memory = _resident_memory_mb()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        end_memory = _resident_memory_mb()
+        record = {
+            'name': name,
+            **attributes,
+            'parent': parent,
+            'depth': len(stack),
+            'start': time.time() - duration,
+            'duration_s': duration,
+            'rss_mb': end_memory,
+            'rss_delta_mb': None if start_memory is None else end_memory - start_memory,
+            'pid': os.getpid(),
+            'run': os.environ.get(RUN_ENV_VAR),
+        }
+        # one write per line keeps the lines of concurrent processes apart
+        with open(_state['output_path'], mode='a', encoding='utf-8') as file:
+            file.write(json.dumps(record, default=str) + '\n')
+
+
+def _span_attributes(signature: inspect.Signature, args: tuple, kwargs: dict) -> dict:
+    """Describe a call by its template model, file and calculator class."""
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return {}
+    attributes = {}
+    instance = arguments.get('self')
+    if instance is not None:
+        attributes['class'] = type(instance).__name__
+    template_model = arguments.get(
+        'template_model',
+        arguments.get('template_model_name', getattr(instance, 'template_model_name', None))
+    )
+    if template_model is not None:
+        attributes['template_model'] = str(template_model)
+    # names of written files take precedence over the directories they are written to
+    file_name = arguments.get(
+        'file_name', arguments.get('impacts_name', arguments.get('file_path'))
+    )
+    if file_name is not None:
+        attributes['file'] = Path(file_name).name
+    return attributes
+
+
+def profiled(name: str = None):
+    """Decorate a function to record a span for every call.
+
+    The span is described by the template model, file and calculator class the function is
+    called with, see _span_attributes.
+
+    Args:
+        name (str, optional): name of the spans. Defaults to the qualified function name.
+    """
+    def decorator(function):
+        span_name = name or function.__qualname__
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return function(*args, **kwargs)
+            with span(span_name, **_span_attributes(signature, args, kwargs)):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def read_spans(output_path: Path) -> pd.DataFrame:
+    """Read the spans of a json lines file.
+
+    Args:
+        output_path (Path): json lines file written by span
+
+    Returns:
+        pd.DataFrame: one row per span
+    """
+    with open(output_path, mode='r', encoding='utf-8') as file:
+        return pd.DataFrame([json.loads(line) for line in file if line.strip()])
+
+
+def summarize(output_path: Path, top: int = 10, run: str = None) -> str:
+    """Summarize the slowest template models and stages of a json lines file.
+
+    Args:
+        output_path (Path): json lines file written by span
+        top (int, optional): number of template models and stages to list. Defaults to 10.
+        run (str, optional): run id of the spans to summarize. Defaults to every span of the
+            file.
+
+    Returns:
+        str: summary tables
+    """
+    spans = read_spans(output_path)
+    if run is not None and 'run' in spans:
+        spans = spans[spans['run'] == run].copy()
+    if spans.empty:
+        return 'No spans recorded'
+    if 'class' in spans:
+        # calculator methods are reported per calculator class
+        spans['stage'] = spans['name'].where(
+            spans['class'].isna(),
+            spans['class'] + '.' + spans['name'].str.split('.').str[-1]
+        )
+    else:
+        spans['stage'] = spans['name']
+
+    def table(grouped) -> pd.DataFrame:
+        durations = grouped['duration_s']
+        return pd.DataFrame({
+            'calls': durations.count(),
+            'total_s': durations.sum(),
+            'mean_ms': durations.mean() * 1000,
+            'max_ms': durations.max() * 1000,
+            'max_rss_mb': grouped['rss_mb'].max(),
+        }).sort_values('total_s', ascending=False).head(top).round(3)
+
+    sections = [f'Slowest stages\n{table(spans.groupby("stage")).to_string()}']
+    template_model_spans = spans[spans['name'] == 'template_model']
+    if not template_model_spans.empty:
+        sections.append(
+            'Slowest template models\n'
+            f'{table(template_model_spans.groupby("template_model")).to_string()}'
+        )
+    return '\n\n'.join(sections)
+
+
+if os.environ.get(PROFILE_ENV_VAR):
+    enable(
+        None if os.environ[PROFILE_ENV_VAR] == '1' else os.environ[PROFILE_ENV_VAR],
+        os.environ.get(CPROFILE_ENV_VAR)
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=DEFAULT_OUTPUT_PATH,
+        help='json lines file spans are appended to'
+    )
+    parser.add_argument(
+        '--cprofile',
+        type=Path,
+        default=None,
+        help='file the cProfile of the run is dumped to'
+    )
+    parser.add_argument(
+        'module',
+        help='pipeline module to run, e.g. src.impact_calculator.calc_impacts'
+    )
+    parser.add_argument(
+        'module_args',
+        nargs=argparse.REMAINDER,
+        help='command line arguments of the module'
+    )
+    args = parser.parse_args()
+    # this file runs as __main__, while the pipeline modules import src.utils.profiling, so
+    # profiling is enabled on that module to keep a single state and a single profiler
+    from src.utils import profiling
+    profiling.enable(args.output, args.cprofile)
+    sys.argv = [args.module] + args.module_args
+    runpy.run_module(args.module, run_name='__main__', alter_sys=True)
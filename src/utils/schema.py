@@ -0,0 +1,299 @@
+"""Central schema of the categorical columns of bill of materials, impact and scenario frames.
+
+Category sets are fixed for a run: they are collected from the raw bill of materials, the
+background datasets and the project metadata, plus the values written by the calculators
+themselves. Frames sharing the schema share categories, so they concatenate and merge as
+categoricals instead of strings. Values outside of a category set, e.g. of a template model
+built outside of raw_boms.xlsx, are appended to the categories of the frame holding them; only
+validation rejects them.
+"""
+from itertools import product
+from pathlib import Path
+from typing import TYPE_CHECKING
+import numpy as np
+import pandas as pd
+import src.utils.columnar_cache as cc
+
+if TYPE_CHECKING:
+    import pandera.pandas as pa
+
+MAIN_DIRECTORY = Path(__file__).parents[2]
+RAW_BOM_PATH = MAIN_DIRECTORY.joinpath('data/raw/raw_boms.xlsx')
+PROJECT_METADATA_PATH = MAIN_DIRECTORY.joinpath('data/frontend/project_metadata.csv')
+BACKGROUND_DATA_DIRECTORY = MAIN_DIRECTORY.joinpath('references/background_data')
+
+BOM_COLUMNS = [
+    'Building Type',
+    'Omiclass',
+    'L1',
+    'L2',
+    'L3',
+    'Option',
+    'Assembly',
+    'Component',
+    'Building Material_name',
+    'Tally material',
+    'Data Source (Material Quantities)',
+]
+CATEGORICAL_COLUMNS = BOM_COLUMNS + ['life_cycle_stage', 'scenario', 'template_model']
+
+LIFE_CYCLE_STAGES = [
+    'A1-A3: Product',
+    'A4: Transportation',
+    'A5: Construction',
+    'B2-B5: Replacement',
+    'B6: Operational Energy',
+    'C2-C4: End-of-life',
+]
+SCENARIOS = [
+    'Regionally-Specific Distances',
+    'Enhanced Waste Management',
+    'RICS Replacement Rates',
+]
+# values of the row written by the operational energy calculator
+OPERATIONAL_ENERGY_VALUES = {
+    'Omiclass': ['21-04 50 20'],
+    'L1': ['Services'],
+    'L2': ['Electrical'],
+    'L3': ['Electrical Service and Distribution'],
+    'Option': ['OP1'],
+    'Assembly': ['Operational energy'],
+    'Component': ['Operational energy'],
+    'Building Material_name': ['NA'],
+    'Tally material': ['NA'],
+    'Data Source (Material Quantities)': ['TM'],
+}
+# background dataset columns whose values extend the category set of a column
+BACKGROUND_CATEGORIES = {
+    'Tally material': [('a1-a3.xlsx', 'Name_Tally Material')],
+    'Building Material_name': [('a5_wastage.xlsx', 'Building Material_name')],
+    'Assembly': [('b2-b5.xlsx', 'Assembly'), ('RICS_service_life.xlsx', 'Assembly')],
+}
+
+_dtype_cache = {}
+_schema_cache = {}
+_position_maps = {}
+
+
+def _unique_strings(values) -> list:
+    """Collect the distinct non-null values of a column as strings, in order of appearance."""
+    return [str(value) for value in pd.unique(pd.Series(values).dropna())]
+
+
+def collect_categories() -> dict:
+    """Collect the category set of every categorical column from the reference data.
+
+    Returns:
+        dict: list of categories keyed by column name
+    """
+    raw_sheets = [
+        cc.read_sheet(RAW_BOM_PATH, sheet_position)
+        for sheet_position in range(4)
+    ]
+    raw_bom = pd.concat(raw_sheets, ignore_index=True)
+
+    categories = {}
+    for column in BOM_COLUMNS:
+        values = list(raw_bom[column]) + OPERATIONAL_ENERGY_VALUES.get(column, [])
+        for workbook_name, background_column in BACKGROUND_CATEGORIES.get(column, []):
+            values += list(cc.read_sheet(
+                BACKGROUND_DATA_DIRECTORY.joinpath(workbook_name)
+            )[background_column])
+        categories[column] = _unique_strings(values)
+    categories['life_cycle_stage'] = list(LIFE_CYCLE_STAGES)
+    categories['scenario'] = list(SCENARIOS)
+
+    # every combination of the options of the four raw bill of materials sheets
+    template_models = [
+        '_'.join(options)
+        for options in product(*[_unique_strings(sheet['Option']) for sheet in raw_sheets])
+    ]
+    if PROJECT_METADATA_PATH.exists():
+        template_models += list(pd.read_csv(PROJECT_METADATA_PATH)['template_model'])
+    categories['template_model'] = _unique_strings(template_models)
+    return categories
+
+
+def categorical_dtypes(categories: dict) -> dict:
+    """Build the categorical dtype of every categorical column.
+
+    Args:
+        categories (dict): list of categories keyed by column name
+
+    Returns:
+        dict: pd.CategoricalDtype keyed by column name
+    """
+    return {
+        column: pd.CategoricalDtype(column_categories)
+        for column, column_categories in categories.items()
+    }
+
+
+def build_schema(column_dtypes: dict) -> 'pa.DataFrameSchema':
+    """Build the schema declaring every categorical column.
+
+    Columns are optional, so the same schema applies to bill of materials, impact and scenario
+    frames. Columns outside of the schema are left as they are. pandera is only imported here,
+    as converting frames needs the categorical dtypes alone.
+
+    Args:
+        column_dtypes (dict): pd.CategoricalDtype keyed by column name
+
+    Returns:
+        pa.DataFrameSchema: schema coercing the categorical columns
+    """
+    import pandera.pandas as pa
+
+    return pa.DataFrameSchema(
+        columns={
+            column: pa.Column(
+                categorical_dtype,
+                nullable=True,
+                required=False,
+                coerce=True
+            )
+            for column, categorical_dtype in column_dtypes.items()
+        },
+        strict=False
+    )
+
+
+def load_categorical_dtypes() -> dict:
+    """Load the categorical dtypes, rebuilt only when the reference data they come from changes.
+
+    Returns:
+        dict: pd.CategoricalDtype keyed by column name
+    """
+    source_paths = [RAW_BOM_PATH, PROJECT_METADATA_PATH] + [
+        BACKGROUND_DATA_DIRECTORY.joinpath(workbook_name)
+        for sources in BACKGROUND_CATEGORIES.values()
+        for workbook_name, _ in sources
+    ]
+    cache_key = tuple(
+        (str(path), path.stat().st_mtime_ns if path.exists() else None)
+        for path in source_paths
+    )
+    if cache_key not in _dtype_cache:
+        _dtype_cache.clear()
+        _schema_cache.clear()
+        _position_maps.clear()
+        _dtype_cache[cache_key] = categorical_dtypes(collect_categories())
+    return _dtype_cache[cache_key]
+
+
+def load_schema() -> 'pa.DataFrameSchema':
+    """Load the pandera schema of the current categorical dtypes.
+
+    Returns:
+        pa.DataFrameSchema: schema coercing the categorical columns
+    """
+    column_dtypes = load_categorical_dtypes()
+    if 'schema' not in _schema_cache:
+        _schema_cache['schema'] = build_schema(column_dtypes)
+    return _schema_cache['schema']
+
+
+def _has_dtype(dtype, categorical_dtype: pd.CategoricalDtype) -> bool:
+    """Check whether a column dtype is already a categorical dtype, without comparing to strings."""
+    return dtype is categorical_dtype or (
+        isinstance(dtype, pd.CategoricalDtype) and dtype == categorical_dtype
+    )
+
+
+def _category_positions(categorical_dtype: pd.CategoricalDtype, values: pd.Series) -> np.ndarray:
+    """Find the position of every value among the categories of a schema dtype.
+
+    Frames read from a template model have a few dozen rows, so values are looked up in a
+    dictionary built once per schema dtype rather than through index.get_indexer.
+    """
+    if id(categorical_dtype) not in _position_maps:
+        _position_maps[id(categorical_dtype)] = {
+            category: position for position, category in enumerate(categorical_dtype.categories)
+        }
+    position_map = _position_maps[id(categorical_dtype)]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # the code -1 of missing values picks the -1 appended after the category positions
+        category_positions = np.array(
+            [position_map.get(category, -1) for category in values.cat.categories] + [-1]
+        )
+        return category_positions[values.cat.codes.to_numpy()]
+    return np.fromiter(
+        (position_map.get(value, -1) for value in values),
+        dtype=np.intp,
+        count=len(values)
+    )
+
+
+def apply_schema(df: pd.DataFrame, validate: bool = False) -> pd.DataFrame:
+    """Convert the categorical columns of a frame to their fixed category sets.
+
+    Args:
+        df (pd.DataFrame): bill of materials, impact or scenario frame
+        validate (bool, optional): reject values outside of the category sets, and validate
+            the converted frame against the pandera schema. Validation has a fixed cost per
+            call, so it is meant for combined frames rather than every file read. Defaults to
+            False, appending values outside of a category set to the categories of the column.
+
+    Raises:
+        ValueError: Raised if validating and a categorical column holds values outside of its
+            category set
+
+    Returns:
+        pd.DataFrame: frame with categorical columns
+    """
+    column_dtypes = load_categorical_dtypes()
+    # dtypes are read once, looking up every column of a small frame costs more than converting
+    frame_dtypes = df.dtypes.to_dict()
+    conversions = {
+        column: categorical_dtype
+        for column, categorical_dtype in column_dtypes.items()
+        if column in frame_dtypes and not _has_dtype(frame_dtypes[column], categorical_dtype)
+    }
+    converted = {}
+    unknown_values = {}
+    for column, categorical_dtype in conversions.items():
+        values = df[column]
+        # values are compared as strings, e.g. an Omiclass read as a number
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if values.cat.categories.dtype != object:
+                values = values.cat.rename_categories(values.cat.categories.astype(str))
+        elif values.dtype != object:
+            values = values.where(values.isna(), values.astype(str))
+        positions = _category_positions(categorical_dtype, values)
+        unknown = (positions == -1) & values.notna().to_numpy()
+        if unknown.any():
+            unknown_categories = _unique_strings(values[unknown].astype(str))
+            unknown_values[column] = sorted(unknown_categories)
+            positions[unknown] = len(categorical_dtype.categories) + pd.Index(
+                unknown_categories
+            ).get_indexer(values[unknown].astype(str))
+            categorical_dtype = pd.CategoricalDtype(
+                list(categorical_dtype.categories) + unknown_categories
+            )
+        converted[column] = pd.Categorical.from_codes(positions, dtype=categorical_dtype)
+    if unknown_values and validate:
+        raise ValueError(f'Values outside of the schema categories: {unknown_values}')
+    if converted:
+        df = df.assign(**converted)
+    if validate:
+        df = load_schema().validate(df)
+    return df
+
+
+def lookup_positions(index: pd.Index, values: pd.Series) -> np.ndarray:
+    """Find the position of every value in an index, like index.get_indexer(values).
+
+    Categorical values are looked up once per category rather than once per element.
+
+    Args:
+        index (pd.Index): index to look values up in
+        values (pd.Series): values to look up
+
+    Returns:
+        np.ndarray: position of every value in index, -1 for values missing from index
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return index.get_indexer(values)
+    # the code -1 of missing values picks the -1 appended after the category positions
+    category_positions = np.append(index.get_indexer(values.cat.categories), -1)
+    return category_positions[values.cat.codes.to_numpy()]